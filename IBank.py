@@ -1,6 +1,71 @@
 # from generators import get_user_data
+import re
+import threading
+import time
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import nullcontext
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, DecimalException, InvalidOperation
+
+# Заглушка вместо блокировки, когда журнал работает без потоков
+NO_LOCK = nullcontext()
+
+KOPECKS = 100  # копеек в рубле
+
+PHONE_PATTERN = re.compile(r'\+7\d{3}-\d{3}-\d{2}-\d{2}')
+
+
+def to_kopecks(rubles, positive=False):
+    """
+    Переводит сумму в рублях (int, float, str или Decimal) в целое число копеек
+    :param positive: сумма операции - после округления до копеек должна быть больше нуля
+    """
+    if isinstance(rubles, int):
+        kopecks = rubles * KOPECKS
+    else:
+        try:
+            amount = Decimal(str(rubles)) * KOPECKS
+            if not amount.is_finite():
+                raise InvalidOperation
+            kopecks = int(amount.to_integral_value(ROUND_HALF_UP))
+        except DecimalException:
+            raise ValueError(f'Неверная сумма: {rubles!r}.') from None
+    if positive:
+        check_amount(kopecks)
+    return kopecks
+
+
+def check_amount(kopecks):
+    """
+    Проверяет сумму операции: в копейках, больше нуля
+    """
+    if kopecks <= 0:
+        raise ValueError('Сумма операции должна быть больше нуля.')
+
+
+def to_rubles(kopecks):
+    """
+    Переводит копейки в рубли (Decimal с двумя знаками после точки)
+    """
+    return Decimal(kopecks).scaleb(-2)
+
+
+def to_timestamp(date):
+    """
+    Переводит datetime во время журнала операций (наносекунды)
+    """
+    return round(date.timestamp() * 10 ** 6) * 1000
+
+
+def fee_amount(amount, fee_bp):
+    """
+    Комиссия в копейках с суммы amount (в копейках) по ставке fee_bp (в базисных пунктах),
+    с округлением до копейки
+    """
+    return (amount * fee_bp + 5000) // 10000
 
 
 class AccountBase(ABC):
@@ -55,34 +120,639 @@ class Operation:
     TRANSFER = "transfer"
     WITHDRAW = "withdraw"
     DEPOSIT = "deposit"
+    # Списания банка по кредитным счетам при закрытии дня, см. IBank_accrual
+    INTEREST = "interest"
+    PENALTY = "penalty"
+    # События счета, которые не попадают в историю операций, но пишутся в WAL
+    CREATE = "create"
+    CLOSE = "close"
+    ARCHIVE = "archive"
+    RESTORE = "restore"
+    CHANGE_PHONE = "change_phone"
 
-    def __init__(self, type, amount, target=None, fee=0):
-        self.date = datetime.now()
+    __slots__ = ('type', 'amount', 'target', 'fee', 'timestamp', '_date')
+
+    def __init__(self, type, amount, target=None, fee=0, date=None, timestamp=None):
         self.type = type
         self.amount = amount
         self.target = target
         self.fee = fee  # fee summ
+        # Время хранится целым числом наносекунд, datetime создается только при обращении к date
+        self._date = date
+        if timestamp is None:
+            timestamp = time.time_ns() if date is None else to_timestamp(date)
+        self.timestamp = timestamp
+
+    @property
+    def date(self):
+        if self._date is None:
+            self._date = datetime.fromtimestamp(self.timestamp / 10 ** 9)
+        return self._date
 
     def __repr__(self):
         target = self.target.name if self.target else ""
         return f"({self.date}) {self.type}: sum: {self.amount} {target}"
 
 
+class BankStats:
+    """
+    Сводные показатели по счетам журнала. Обновляются самими счетами при каждой операции за O(1).
+    Счета, балансы, должники и архив - по открытым счетам, то есть добавленным в AccountRegistry и не закрытым.
+    Суммы в копейках; deposited и fees - по всем операциям журнала с момента его создания
+    (после перезапуска - с момента восстановления).
+    """
+
+    def __init__(self, thread_safe=False):
+        self.accounts = 0  # открытых счетов
+        self.balances = 0  # деньги клиентов на счетах
+        self.deposited = 0  # внесено пополнениями
+        self.fees = 0  # получено комиссий и штрафов
+        self.negative = 0  # счетов с отрицательным балансом
+        self.archived = 0  # счетов в архиве
+        self._lock = threading.Lock() if thread_safe else NO_LOCK
+
+    def add_account(self, account):
+        with self._lock:
+            self.accounts += 1
+            self.balances += account.balance_kop
+            self.negative += account.balance_kop < 0
+            self.archived += account._archive
+
+    def remove_account(self, account):
+        with self._lock:
+            self.accounts -= 1
+            self.balances -= account.balance_kop
+            self.negative -= account.balance_kop < 0
+            self.archived -= account._archive
+
+    def balance_changed(self, old, new, deposited=0, fee=0):
+        """
+        :param old: баланс до операции
+        :param new: баланс после операции
+        :param deposited: сумма пополнения
+        :param fee: списанная комиссия (отрицательная - возврат комиссии)
+        """
+        with self._lock:
+            self.balances += new - old
+            self.deposited += deposited
+            self.fees += fee
+            if (old < 0) != (new < 0):
+                self.negative += 1 if new < 0 else -1
+
+    def add(self, balances=0, deposited=0, fees=0):
+        """
+        Пакетное изменение сумм, при котором ни один баланс не меняет знак
+        """
+        with self._lock:
+            self.balances += balances
+            self.deposited += deposited
+            self.fees += fees
+
+    def archive_changed(self, archived):
+        with self._lock:
+            self.archived += 1 if archived else -1
+
+    def as_dict(self):
+        """
+        Показатели для вывода: суммы в рублях
+        """
+        return {
+            'accounts': self.accounts,
+            'balances': to_rubles(self.balances),
+            'deposited': to_rubles(self.deposited),
+            'fees': to_rubles(self.fees),
+            'negative': self.negative,
+            'archived': self.archived,
+        }
+
+
+class RequestCache:
+    """
+    Результаты недавних операций по идентификатору запроса клиента (request_id).
+    Повтор запроса, например после таймаута, возвращает исходный результат и не меняет балансы.
+    Хранит не больше maxsize записей и не дольше ttl секунд.
+    :param policy: 'lru' - при переполнении вытесняется запись, к которой дольше всего не обращались,
+        'fifo' - самая старая запись
+    """
+    POLICIES = ('lru', 'fifo')
+
+    def __init__(self, maxsize=100000, ttl=24 * 3600, policy='lru', clock=time.monotonic):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Неизвестная политика вытеснения: {policy}')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.policy = policy
+        self._clock = clock
+        self._entries = OrderedDict()  # request_id -> (время записи, операция, результат, текст ошибки)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, request_id, operation):
+        """
+        :param operation: описание операции (тип, счет, контрагент, сумма) для проверки повтора
+        :return: (найдено, результат). Если исходная операция завершилась ошибкой, она выбрасывается снова.
+        """
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return False, None
+            created, cached_operation, result, error = entry
+            if self._clock() - created >= self.ttl:
+                del self._entries[request_id]
+                self.evicted += 1
+                return False, None
+            if cached_operation != operation:
+                raise ValueError('Идентификатор запроса уже использован для другой операции.')
+            if self.policy == 'lru':
+                self._entries.move_to_end(request_id)
+            self.hits += 1
+        if error is not None:
+            raise ValueError(error)
+        return True, result
+
+    def put(self, request_id, operation, result=None, error=None):
+        """
+        Запоминает результат операции и вытесняет лишние и устаревшие записи.
+        Записи упорядочены по времени записи (или обращения для 'lru'), поэтому вытеснение идет с начала словаря.
+        """
+        with self._lock:
+            now = self._clock()
+            self._entries[request_id] = (now, operation, result, error)
+            self._entries.move_to_end(request_id)
+            entries = self._entries
+            while entries and (len(entries) > self.maxsize or now - entries[next(iter(entries))][0] >= self.ttl):
+                entries.popitem(last=False)
+                self.evicted += 1
+
+
+class VelocityLimit:
+    """
+    Лимит операций за скользящее окно: не больше max_count операций и не больше max_amount копеек
+    за последние window секунд. Окно делится на buckets корзин, поэтому его граница определяется
+    с точностью до window / buckets.
+    :param operations: типы операций, на которые действует лимит (Operation.WITHDRAW, Operation.TRANSFER)
+    """
+
+    def __init__(self, operations, window, max_count=None, max_amount=None, buckets=60, clock=time.monotonic):
+        self.operations = tuple(operations)
+        self.window = window
+        self.max_count = max_count
+        self.max_amount = max_amount
+        self.buckets = buckets
+        self.bucket_width = window / buckets
+        self.clock = clock
+
+    def __repr__(self):
+        return (f"VelocityLimit({self.operations}, {self.window}, max_count={self.max_count}, "
+                f"max_amount={self.max_amount})")
+
+
+class SlidingWindow:
+    """
+    Счетчики одного лимита одного счета: кольцо корзин с числом и суммой операций.
+    При сдвиге окна обнуляются только истекшие корзины, поэтому проверка стоит амортизированно O(1).
+    """
+    __slots__ = ('limit', 'counts', 'amounts', 'count', 'amount', 'tick')
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.counts = [0] * limit.buckets
+        self.amounts = [0] * limit.buckets
+        self.count = 0  # операций в окне
+        self.amount = 0  # сумма операций в окне
+        self.tick = int(limit.clock() / limit.bucket_width)  # номер текущей корзины с начала отсчета
+
+    def _advance(self):
+        tick = int(self.limit.clock() / self.limit.bucket_width)
+        passed = tick - self.tick
+        if passed <= 0:
+            return
+        buckets = self.limit.buckets
+        if passed >= buckets:
+            self.counts = [0] * buckets
+            self.amounts = [0] * buckets
+            self.count = self.amount = 0
+        else:
+            counts, amounts = self.counts, self.amounts
+            for position in range(self.tick + 1, tick + 1):
+                position %= buckets
+                self.count -= counts[position]
+                self.amount -= amounts[position]
+                counts[position] = amounts[position] = 0
+        self.tick = tick
+
+    def allows(self, amount):
+        self._advance()
+        limit = self.limit
+        return ((limit.max_count is None or self.count + 1 <= limit.max_count) and
+                (limit.max_amount is None or self.amount + amount <= limit.max_amount))
+
+    def add(self, amount):
+        position = self.tick % self.limit.buckets
+        self.counts[position] += 1
+        self.amounts[position] += amount
+        self.count += 1
+        self.amount += amount
+
+
+class Ledger:
+    """
+    Общий журнал операций банка.
+    Операции хранятся по колонкам в типизированных массивах: одна строка журнала - одна операция одного счета.
+    Объекты Operation создаются только при чтении строки.
+    При thread_safe=True счета этого журнала получают собственные блокировки
+    и операции над ними можно выполнять из нескольких потоков.
+    """
+    TYPES = (Operation.DEPOSIT, Operation.WITHDRAW, Operation.TRANSFER, Operation.INTEREST, Operation.PENALTY)
+    TYPE_CODES = {type: code for code, type in enumerate(TYPES)}
+    NO_TARGET = -1
+
+    def __init__(self, thread_safe=False):
+        self.types = array('b')
+        self.amounts = array('q')  # в копейках
+        self.fees = array('q')  # в копейках
+        self.targets = array('q')  # id счета-контрагента или NO_TARGET
+        self.timestamps = array('q')  # время операции в наносекундах
+        self._accounts = []
+        self.wal = None  # журнал предзаписи, см. IBank_storage.Storage
+        self.cold = None  # хранилище архивных счетов, см. IBank_cold.ColdStore
+        self.thread_safe = thread_safe
+        self._lock = threading.Lock() if thread_safe else NO_LOCK
+        self.stats = BankStats(thread_safe)
+        self.requests = RequestCache()  # результаты операций по request_id, см. Account.transfer_kop()
+        self.changed = None  # id счетов, изменившихся с последнего обновления BalanceIndex (IBank_listing)
+        self.limits_enabled = True  # лимиты VelocityLimit; выключаются на время восстановления из WAL
+        self.replay_timestamp = None  # время операции, проигрываемой из WAL, см. IBank_storage.Storage.open()
+        self._last_timestamp = 0
+        self._released = bytearray()  # 1 - строка больше не нужна (история выгружена в ColdStore)
+        self._released_count = 0
+
+    def __len__(self):
+        return len(self.types)
+
+    def register(self, account):
+        """
+        Регистрирует счет в журнале
+        :return: id счета
+        """
+        with self._lock:
+            self._accounts.append(account)
+            return len(self._accounts) - 1
+
+    def now(self):
+        """
+        Текущее время журнала в наносекундах.
+        Не убывает, даже если системные часы переведут назад: история счета должна оставаться упорядоченной по времени.
+        При восстановлении из WAL - исходное время проигрываемой операции.
+        """
+        now = time.time_ns() if self.replay_timestamp is None else self.replay_timestamp
+        if now < self._last_timestamp:
+            return self._last_timestamp
+        self._last_timestamp = now
+        return now
+
+    def new_lock(self):
+        """
+        Блокировка для нового счета
+        """
+        return threading.RLock() if self.thread_safe else NO_LOCK
+
+    def account(self, account_id):
+        return self._accounts[account_id]
+
+    @property
+    def accounts(self):
+        """
+        Все зарегистрированные счета, индекс в списке - id счета
+        """
+        return self._accounts
+
+    def append(self, type, amount, fee=0, target=None, timestamp=None):
+        """
+        Добавляет операцию в журнал
+        :param type: тип операции (Operation.DEPOSIT/WITHDRAW/TRANSFER)
+        :param amount: сумма операции в копейках
+        :param fee: сумма комиссии в копейках
+        :param target: счет-контрагент
+        :param timestamp: время операции в наносекундах
+        :return: номер строки журнала
+        """
+        with self._lock:
+            self.types.append(self.TYPE_CODES[type])
+            self.amounts.append(amount)
+            self.fees.append(fee)
+            self.targets.append(self.NO_TARGET if target is None else target.id)
+            self.timestamps.append(self.now() if timestamp is None else timestamp)
+            return len(self.types) - 1
+
+    def append_transfer(self, amount, fee, source, target):
+        """
+        Добавляет обе половины перевода одним вызовом и с одним временем:
+        строку счета source (контрагент target) и следующую за ней строку счета target (контрагент source)
+        :return: номер строки счета source
+        """
+        code = self.TYPE_CODES[Operation.TRANSFER]
+        with self._lock:
+            timestamp = self.now()
+            self.types.extend((code, code))
+            self.amounts.extend((amount, amount))
+            self.fees.extend((fee, fee))
+            self.targets.extend((target.id, source.id))
+            self.timestamps.extend((timestamp, timestamp))
+            return len(self.types) - 2
+
+    def append_rows(self, types, amounts, fees, targets, timestamps):
+        """
+        Добавляет готовые строки журнала (например, историю, возвращенную из ColdStore)
+        :return: номер первой добавленной строки
+        """
+        with self._lock:
+            first = len(self.types)
+            self.types.extend(types)
+            self.amounts.extend(amounts)
+            self.fees.extend(fees)
+            self.targets.extend(targets)
+            self.timestamps.extend(timestamps)
+            return first
+
+    def release(self, rows):
+        """
+        Помечает строки как ненужные. Когда таких строк становится больше половины, журнал сжимается.
+        """
+        with self._lock:
+            released = self._released
+            if len(released) < len(self.types):
+                released.extend(bytes(len(self.types) - len(released)))
+            for row in rows:
+                released[row] = 1
+            self._released_count += len(rows)
+            # В многопоточном режиме номер строки может быть уже получен, но еще не записан в счет,
+            # поэтому сжатие там выполняется только явным вызовом compact()
+            if not self.thread_safe and self._released_count * 2 > len(self.types):
+                self._compact()
+
+    def compact(self):
+        """
+        Удаляет из журнала освобожденные строки и перенумеровывает строки счетов.
+        В многопоточном режиме вызывать, когда операции над счетами не выполняются.
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not self._released_count:
+            return
+        released = self._released
+        released.extend(bytes(len(self.types) - len(released)))
+        keep = [row for row, is_released in enumerate(released) if not is_released]
+        new_rows = array('q', bytes(8 * len(released)))
+        for new_row, row in enumerate(keep):
+            new_rows[row] = new_row
+        for name in ('types', 'amounts', 'fees', 'targets', 'timestamps'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[row] for row in keep]))
+        for account in self._accounts:
+            if account._history_rows:
+                account._history_rows = array('q', [new_rows[row] for row in account._history_rows])
+        self._released = bytearray()
+        self._released_count = 0
+
+    def extend(self, type, amounts, fees, targets, timestamp=None):
+        """
+        Добавляет в журнал пакет однотипных операций с общим временем
+        :param amounts: суммы операций в копейках
+        :param fees: суммы комиссий в копейках
+        :param targets: id счетов-контрагентов
+        :return: номер первой добавленной строки
+        """
+        count = len(amounts)
+        with self._lock:
+            first = len(self.types)
+            self.types.extend([self.TYPE_CODES[type]] * count)
+            self.amounts.extend(amounts)
+            self.fees.extend(fees)
+            self.targets.extend(targets)
+            self.timestamps.extend([self.now() if timestamp is None else timestamp] * count)
+            return first
+
+    def balance_changed(self, account, old, new, deposited=0, fee=0):
+        """
+        Учитывает изменение баланса счета в сводке и в индексе балансов, если он подключен
+        """
+        if account._counted:
+            self.stats.balance_changed(old, new, deposited, fee)
+        else:
+            # Баланс счета вне реестра в сводку не входит, а пополнения и комиссии по нему - входят
+            self.stats.add(deposited=deposited, fees=fee)
+        if self.changed is not None:
+            self.changed.add(account.id)
+
+    def set_counted(self, account, counted):
+        """
+        Включает счет в сводку (счет добавлен в реестр) или исключает из нее (счет закрыт)
+        """
+        with account._lock:
+            if account._counted == counted:
+                return
+            account._counted = counted
+            if counted:
+                self.stats.add_account(account)
+            else:
+                self.stats.remove_account(account)
+
+    def touch(self, account):
+        """
+        Отмечает счет для обновления в индексе балансов (открытие и закрытие счета)
+        """
+        if self.changed is not None:
+            self.changed.add(account.id)
+
+    def log(self, event, account, amount=0, target=None, row=None):
+        """
+        Передает событие счета в журнал предзаписи, если он подключен
+        :param row: строка журнала операции; ее время сохраняется в WAL, без строки - текущее время
+        """
+        if self.wal is not None:
+            with self._lock:
+                timestamp = self.now() if row is None else self.timestamps[row]
+                self.wal.append(event, account, amount, target, timestamp)
+
+    def operation(self, row):
+        """
+        Собирает объект Operation по строке журнала
+        """
+        return self.make_operation(self.types[row], self.amounts[row], self.fees[row], self.targets[row],
+                                   self.timestamps[row])
+
+    def make_operation(self, type, amount, fee, target, timestamp):
+        """
+        Собирает объект Operation по значениям столбцов журнала
+        """
+        return Operation(
+            self.TYPES[type],
+            to_rubles(amount),
+            target=None if target == self.NO_TARGET else self._accounts[target],
+            fee=to_rubles(fee),
+            timestamp=timestamp,
+        )
+
+
+class History:
+    """
+    История операций счета: представление над строками общего журнала.
+    Сжатие журнала (Ledger.compact()) заменяет столбцы журнала и строки счетов новыми массивами, поэтому
+    представление читает столбцы, взятые при создании: созданное до сжатия, оно продолжает показывать
+    историю на момент сжатия, а не чужие строки.
+    """
+
+    def __init__(self, ledger, rows):
+        self._ledger = ledger
+        self._rows = rows
+        self._columns = (ledger.types, ledger.amounts, ledger.fees, ledger.targets, ledger.timestamps)
+
+    def _operation(self, row):
+        return self._ledger.make_operation(*(column[row] for column in self._columns))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._operation(row) for row in self._rows[index]]
+        return self._operation(self._rows[index])
+
+    def __iter__(self):
+        for row in self._rows:
+            yield self._operation(row)
+
+    def _position(self, date):
+        """
+        Позиция первой операции не раньше date.
+        Операции добавляются в журнал в порядке времени, поэтому строки счета упорядочены по времени
+        и позицию можно найти двоичным поиском.
+        """
+        timestamps = self._columns[4]
+        return bisect_left(self._rows, to_timestamp(date), key=timestamps.__getitem__)
+
+    def between(self, start=None, end=None, types=None, limit=None, offset=0):
+        """
+        Операции за период [start, end)
+        :param start: начало периода (datetime), None - с первой операции
+        :param end: конец периода (datetime, не включается), None - до последней операции
+        :param types: типы операций (Operation.DEPOSIT/WITHDRAW/TRANSFER), None - все
+        :param limit: сколько операций вернуть, None - все
+        :param offset: сколько подходящих операций пропустить
+        :return: генератор Operation
+        """
+        first = 0 if start is None else self._position(start)
+        last = len(self._rows) if end is None else self._position(end)
+        codes = None if types is None else {self._ledger.TYPE_CODES[type] for type in types}
+        ledger_types = self._columns[0]
+        for i in range(first, last):
+            if limit is not None and limit <= 0:
+                return
+            row = self._rows[i]
+            if codes is not None and ledger_types[row] not in codes:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            if limit is not None:
+                limit -= 1
+            yield self._operation(row)
+
+
+default_ledger = Ledger()
+
+
+def bank_stats(ledger=default_ledger):
+    """
+    Сводка по банку за O(1): показатели, которые счета поддерживают при каждой операции
+    :return: словарь показателей BankStats.as_dict()
+    """
+    return ledger.stats.as_dict()
+
+
+def recompute_stats(ledger=default_ledger, registry=None):
+    """
+    Пересчитывает сводные показатели с нуля по счетам, журналу и ColdStore
+    :param registry: реестр открытых счетов; по умолчанию - счета журнала, учтенные в сводке
+    """
+    stats = BankStats()
+    accounts = [account for account in ledger.accounts if account._counted] if registry is None else registry
+    for account in accounts:
+        stats.add_account(account)
+    deposit, withdraw, transfer, penalty = (Ledger.TYPE_CODES[type] for type in
+                                            (Operation.DEPOSIT, Operation.WITHDRAW, Operation.TRANSFER,
+                                             Operation.PENALTY))
+    released = ledger._released
+    transfer_fees = 0
+    for row, (type, amount, fee) in enumerate(zip(ledger.types, ledger.amounts, ledger.fees)):
+        if row < len(released) and released[row]:
+            continue
+        if type == deposit:
+            stats.deposited += amount
+        elif type == withdraw:
+            stats.fees += fee
+        elif type == transfer:
+            transfer_fees += fee
+        elif type == penalty:
+            stats.fees += amount
+    if ledger.cold is not None:
+        deposited, cold_fees, cold_transfer_fees = ledger.cold.totals()
+        stats.deposited += deposited
+        stats.fees += cold_fees
+        transfer_fees += cold_transfer_fees
+    # Комиссия перевода записана в обеих строках перевода: у отправителя и у получателя
+    stats.fees += transfer_fees // 2
+    return stats
+
+
+def check_stats(ledger=default_ledger, registry=None):
+    """
+    Проверка согласованности сводных показателей
+    :param registry: реестр открытых счетов, см. recompute_stats()
+    :return: список расхождений (показатель, поддерживаемое значение, пересчитанное значение),
+             пустой - если все сходится
+    """
+    expected = recompute_stats(ledger, registry).as_dict()
+    actual = bank_stats(ledger)
+    return [(key, actual[key], expected[key]) for key in actual if actual[key] != expected[key]]
+
+
 class Account(AccountBase):
-    def __init__(self, *args, **kwargs):
+    # Комиссия в базисных пунктах (1/100 %): при неотрицательном и при отрицательном балансе
+    FEE_TABLE = (200, 200)  # 2%
+    negative_limit_kop = 0
+    balance_kop = 0
+    id = None  # id в журнале, назначается после проверки данных клиента
+    # Лимиты операций за период (VelocityLimit), например не больше 10 снятий и 100 000 руб. переводов за час:
+    # (VelocityLimit([Operation.WITHDRAW], 3600, max_count=10),
+    #  VelocityLimit([Operation.TRANSFER], 3600, max_amount=to_kopecks(100000)))
+    # Правила читаются при первой операции счета, на которую действуют лимиты
+    VELOCITY_LIMITS = ()
+    _windows = None
+    _counted = False  # счет учтен в сводке журнала (открыт в AccountRegistry), см. Ledger.set_counted()
+
+    def __init__(self, *args, ledger=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.history = []
-        self.__fee = 2  # 2%
+        self._ledger = default_ledger if ledger is None else ledger
+        self._lock = self._ledger.new_lock()
+        self._history_rows = array('q')
+        self._fee_table = self.FEE_TABLE
         # self.name = name
         self.passport8 = self._validate_passport(args[1])
         self.phone_number = self._validate_phone(args[2])
         self._archive = False
-
+        self._frozen = False  # история выгружена в ColdStore
+        self.id = self._ledger.register(self)
 
     def _validate_phone(self, phone):
-        import re
-        pattern = re.compile(r'\+7\d{3}-\d{3}-\d{2}-\d{2}')
-        if re.search(pattern, phone):
+        if PHONE_PATTERN.search(phone):
             return phone
         raise ValueError('Номер телефона указан в неверном формате.')
 
@@ -95,42 +765,196 @@ class Account(AccountBase):
             return passport
         raise ValueError('В номере паспорта должно быть 8 цифр.')
 
+    @property
+    def balance(self):
+        """
+        Баланс в рублях. Сам баланс хранится в копейках: balance_kop
+        """
+        return to_rubles(self.balance_kop)
+
+    @balance.setter
+    def balance(self, rubles):
+        self._set_balance_kop(to_kopecks(rubles))
+
+    def _set_balance_kop(self, balance):
+        """
+        Устанавливает баланс в обход операций, с учетом в сводных показателях журнала
+        """
+        if self.id is not None:
+            self._ledger.balance_changed(self, self.balance_kop, balance)
+        self.balance_kop = balance
+
+    def _set_archive(self, archived):
+        if self._counted and archived != self._archive:
+            self._ledger.stats.archive_changed(archived)
+        self._archive = archived
+
     @property
     def fee(self):
-        return self.__fee
+        """
+        Текущая комиссия в процентах
+        """
+        return self.fee_bp / 100
+
+    @property
+    def fee_bp(self):
+        """
+        Текущая комиссия в базисных пунктах
+        """
+        return self._fee_table[self.balance_kop < 0]
+
+    @property
+    def history(self):
+        if self._frozen:
+            return self._ledger.cold.history(self)
+        return History(self._ledger, self._history_rows)
+
+    def _record(self, type, amount, target=None, fee=0):
+        """
+        :return: номер строки журнала
+        """
+        row = self._ledger.append(type, amount, fee, target)
+        self._history_rows.append(row)
+        return row
 
     def _in_archive(self):
         return self._archive
 
-    def transfer(self, target_account, amount):
-        self.withdraw(amount, is_transfer=True)
-        target_account.deposit(amount, is_transfer=True)
-        op_transfer_to = Operation(Operation.TRANSFER, amount, target_account, amount * (self.fee / 100))
-        op_transfer_from = Operation(Operation.TRANSFER, amount, self, amount * (self.fee / 100))
-        self.history.append(op_transfer_to)
-        target_account.history.append(op_transfer_from)
-
-    def _check_balance(self, amount):
-        return amount * (1 + (self.fee / 100)) > self.balance
-
-    def withdraw(self, amount, is_transfer=False):
-        if self._check_balance(amount):
-            raise ValueError('Недостаточно средств на счете.')
-        if self._in_archive():
-            raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
-        self.balance -= amount * (1 + (self.fee / 100))
-        if not is_transfer:
-            self.history.append(
-                Operation(Operation.WITHDRAW, amount, fee=amount * (self.fee / 100))
-            )
-
-    def deposit(self, amount, is_transfer=False):
-        if self._in_archive():
-            raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
-        self.balance += amount
-        if not is_transfer:
-            op_deposit = Operation(Operation.DEPOSIT, amount)
-            self.history.append(op_deposit)
+    def transfer(self, target_account, amount, *, request_id=None):
+        self.transfer_kop(target_account, to_kopecks(amount, positive=True), request_id=request_id)
+
+    def withdraw(self, amount, is_transfer=False, *, request_id=None):
+        self.withdraw_kop(to_kopecks(amount, positive=True), is_transfer, request_id=request_id)
+
+    def deposit(self, amount, is_transfer=False, *, request_id=None):
+        self.deposit_kop(to_kopecks(amount, positive=True), is_transfer, request_id=request_id)
+
+    def _once(self, request_id, operation, perform, *args):
+        """
+        Выполняет операцию не больше одного раза на request_id. Вызывается под блокировкой счета.
+        """
+        requests = self._ledger.requests
+        found, result = requests.get(request_id, operation)
+        if found:
+            return result
+        try:
+            result = perform(*args)
+        except ValueError as error:
+            requests.put(request_id, operation, error=str(error))
+            raise
+        requests.put(request_id, operation, result)
+        return result
+
+    def transfer_kop(self, target_account, amount, *, request_id=None):
+        """
+        Перевод на счет другого клиента
+        :param amount: сумма перевода в копейках
+        :param request_id: идентификатор запроса клиента; повтор запроса с тем же идентификатором
+            возвращает результат первого выполнения и не проводит перевод снова
+        """
+        check_amount(amount)
+        # Блокировки двух счетов всегда берутся в порядке id, поэтому встречные переводы не блокируют друг друга
+        first, second = (self, target_account) if self.id <= target_account.id else (target_account, self)
+        with first._lock, second._lock:
+            if request_id is not None:
+                return self._once(request_id, (Operation.TRANSFER, self.id, target_account.id, amount),
+                                  self.transfer_kop, target_account, amount)
+            fee = self.withdraw_kop(amount, is_transfer=True)
+            try:
+                target_account.deposit_kop(amount, is_transfer=True)
+            except ValueError:
+                self._refund_kop(amount, fee)
+                raise
+            row = self._ledger.append_transfer(amount, fee, self, target_account)
+            self._history_rows.append(row)
+            target_account._history_rows.append(row + 1)
+            self._ledger.log(Operation.TRANSFER, self, amount, target_account, row=row)
+
+    def _check_velocity(self, operation, amount):
+        """
+        Проверяет лимиты операций за период и учитывает операцию в их окнах.
+        Перевод, который после этого не удалось зачислить получателю, остается учтенным.
+        """
+        windows = self._windows
+        if windows is None:
+            windows = self._windows = [SlidingWindow(limit) for limit in self.VELOCITY_LIMITS]
+        matched = [window for window in windows if operation in window.limit.operations]
+        for window in matched:
+            if not window.allows(amount):
+                raise ValueError('Превышен лимит операций за период.')
+        for window in matched:
+            window.add(amount)
+
+    def _refund_kop(self, amount, fee):
+        """
+        Возвращает списание перевода, который не удалось провести
+        """
+        with self._lock:
+            balance = self.balance_kop
+            self.balance_kop = balance + amount + fee
+            self._ledger.balance_changed(self, balance, self.balance_kop, fee=-fee)
+
+    def withdraw_kop(self, amount, is_transfer=False, *, request_id=None):
+        """
+        Снятие суммы с текущего счета
+        :param amount: сумма в копейках
+        :param request_id: идентификатор запроса клиента, см. transfer_kop()
+        :return: списанная комиссия в копейках
+        """
+        check_amount(amount)
+        with self._lock:
+            if request_id is not None:
+                return self._once(request_id, (Operation.WITHDRAW, self.id, None, amount),
+                                  self.withdraw_kop, amount, is_transfer)
+            fee = fee_amount(amount, self._fee_table[self.balance_kop < 0])
+            if amount + fee > self.balance_kop + self.negative_limit_kop:
+                raise ValueError('Недостаточно средств на счете.')
+            if self._archive:
+                raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
+            if self.VELOCITY_LIMITS and self._ledger.limits_enabled:
+                self._check_velocity(Operation.TRANSFER if is_transfer else Operation.WITHDRAW, amount)
+            balance = self.balance_kop
+            self.balance_kop = balance - amount - fee
+            self._ledger.balance_changed(self, balance, self.balance_kop, fee=fee)
+            if not is_transfer:
+                row = self._record(Operation.WITHDRAW, amount, fee=fee)
+                self._ledger.log(Operation.WITHDRAW, self, amount, row=row)
+            return fee
+
+    def deposit_kop(self, amount, is_transfer=False, *, request_id=None):
+        """
+        Внесение суммы на текущий счет
+        :param amount: сумма в копейках
+        :param request_id: идентификатор запроса клиента, см. transfer_kop()
+        """
+        check_amount(amount)
+        with self._lock:
+            if request_id is not None:
+                return self._once(request_id, (Operation.DEPOSIT, self.id, None, amount),
+                                  self.deposit_kop, amount, is_transfer)
+            if self._archive:
+                raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
+            balance = self.balance_kop
+            self.balance_kop = balance + amount
+            self._ledger.balance_changed(self, balance, self.balance_kop, 0 if is_transfer else amount)
+            if not is_transfer:
+                row = self._record(Operation.DEPOSIT, amount)
+                self._ledger.log(Operation.DEPOSIT, self, amount, row=row)
+
+    def charge_kop(self, type, amount):
+        """
+        Списание банком без проверки лимита: проценты или штраф
+        :param type: Operation.INTEREST или Operation.PENALTY
+        :param amount: сумма в копейках
+        """
+        check_amount(amount)
+        with self._lock:
+            balance = self.balance_kop
+            self.balance_kop = balance - amount
+            self._ledger.balance_changed(self, balance, self.balance_kop,
+                                         fee=amount if type == Operation.PENALTY else 0)
+            row = self._record(type, amount)
+            self._ledger.log(type, self, amount, row=row)
 
     def full_info(self):
 
@@ -142,32 +966,62 @@ class Account(AccountBase):
     def get_history(self):
         return "\n".join(map(str, self.history))
 
+    def history_between(self, start=None, end=None, types=None, limit=None, offset=0):
+        """
+        Операции счета за период [start, end), см. History.between()
+        """
+        return self.history.between(start, end, types, limit, offset)
+
     def to_archive(self):
-        if self.balance >= 0:
-            self.balance = 0
-            self._archive = True
-            return
+        with self._lock:
+            if self.balance_kop >= 0:
+                self._set_balance_kop(0)
+                self._set_archive(True)
+                self._ledger.log(Operation.ARCHIVE, self)
+                if self._ledger.cold is not None:
+                    self._ledger.cold.freeze(self)
+                return
         raise ValueError('Нельзя убрать счет с отрицательным балансом в архив.')
 
     def restore(self):
-        self._archive = False
+        with self._lock:
+            if self._frozen:
+                self._ledger.cold.thaw(self)
+            self._set_archive(False)
+            self._ledger.log(Operation.RESTORE, self)
 
 
 class CreditAccount(Account):
+    FEE_TABLE = (200, 500)  # 2%, при отрицательном балансе 5%
+    INTEREST_BP = 3650  # проценты на задолженность: 36.5% годовых, начисляются при закрытии дня
+
     def __init__(self, *args, negative_limit=1000, **kwargs):
         super().__init__(*args, **kwargs)
         self.negative_limit = negative_limit
-        self.base_transfer_fee = 2
-        self.negative_balance_transfer_fee = 5
 
     @property
-    def fee(self):
-        if self.balance < 0:
-            return self.negative_balance_transfer_fee
-        return self.base_transfer_fee
+    def negative_limit(self):
+        return to_rubles(self.negative_limit_kop)
+
+    @negative_limit.setter
+    def negative_limit(self, rubles):
+        self.negative_limit_kop = to_kopecks(rubles)
+
+    @property
+    def base_transfer_fee(self):
+        return self._fee_table[0] / 100
 
-    def _check_balance(self, amount):
-        return amount * (1 + (self.fee / 100)) > self.balance + self.negative_limit
+    @base_transfer_fee.setter
+    def base_transfer_fee(self, percent):
+        self._fee_table = (round(percent * 100), self._fee_table[1])
+
+    @property
+    def negative_balance_transfer_fee(self):
+        return self._fee_table[1] / 100
+
+    @negative_balance_transfer_fee.setter
+    def negative_balance_transfer_fee(self, percent):
+        self._fee_table = (self._fee_table[0], round(percent * 100))
 
     def __repr__(self):
         return '<K> ' + super().__repr__()
@@ -176,9 +1030,116 @@ class CreditAccount(Account):
         return '<K> ' + super().full_info()
 
 
-account_ivan = CreditAccount("Ivan", "12385498", "+7900-800-11-22", 3000, negative_limit=1000)
-account_petr = Account("Petr", 12345677, "+7900-800-11-33")
+class AccountRegistry:
+    """
+    Хранилище счетов банка.
+    Помимо самих счетов держит словари-индексы по номеру паспорта и номеру телефона,
+    поэтому поиск счета не требует перебора всех клиентов.
+    """
+
+    def __init__(self, accounts=()):
+        self._by_passport = {}
+        self._by_phone = {}
+        self._lock = threading.Lock()  # только для изменений, поиск блокировок не берет
+        for account in accounts:
+            self.add(account)
+
+    def __len__(self):
+        return len(self._by_passport)
+
+    def __iter__(self):
+        return iter(self._by_passport.values())
+
+    def __contains__(self, account):
+        return self._by_passport.get(account.passport8) is account
+
+    def add(self, account):
+        """
+        Добавляет счет в хранилище
+        :param account: новый счет
+        """
+        with self._lock:
+            if account.passport8 in self._by_passport:
+                raise ValueError('Счет с таким номером паспорта уже существует.')
+            if account.phone_number in self._by_phone:
+                raise ValueError('Счет с таким номером телефона уже существует.')
+            self._by_passport[account.passport8] = account
+            self._by_phone[account.phone_number] = account
+            account._ledger.set_counted(account, True)
+            account._ledger.touch(account)
+            account._ledger.log(Operation.CREATE, account)
+
+    def add_many(self, accounts):
+        """
+        Добавляет пачку счетов за один проход.
+        Счета с уже занятым паспортом или телефоном (в том числе внутри пачки) не добавляются.
+        :param accounts: новые счета
+        :return: список отклоненных (счет, причина)
+        """
+        rejected = []
+        with self._lock:
+            for account in accounts:
+                if account.passport8 in self._by_passport:
+                    rejected.append((account, 'Счет с таким номером паспорта уже существует.'))
+                elif account.phone_number in self._by_phone:
+                    rejected.append((account, 'Счет с таким номером телефона уже существует.'))
+                else:
+                    self._by_passport[account.passport8] = account
+                    self._by_phone[account.phone_number] = account
+                    account._ledger.set_counted(account, True)
+                    account._ledger.touch(account)
+                    account._ledger.log(Operation.CREATE, account)
+        return rejected
+
+    def remove(self, account):
+        """
+        Удаляет счет из хранилища (закрытие счета)
+        :param account: закрываемый счет
+        """
+        with self._lock:
+            if account not in self:
+                raise ValueError('Счет не найден.')
+            del self._by_passport[account.passport8]
+            del self._by_phone[account.phone_number]
+            account._ledger.set_counted(account, False)
+            account._ledger.touch(account)
+            account._ledger.log(Operation.CLOSE, account)
+
+    def change_phone(self, account, phone_number):
+        """
+        Меняет номер телефона клиента с обновлением индекса
+        :param account: счет клиента
+        :param phone_number: новый номер телефона
+        """
+        phone_number = account._validate_phone(phone_number)
+        with self._lock:
+            if account not in self:
+                raise ValueError('Счет не найден.')
+            owner = self._by_phone.get(phone_number)
+            if owner is not None and owner is not account:
+                raise ValueError('Счет с таким номером телефона уже существует.')
+            del self._by_phone[account.phone_number]
+            account.phone_number = phone_number
+            self._by_phone[phone_number] = account
+            account._ledger.log(Operation.CHANGE_PHONE, account)
+
+    def get_by_passport(self, passport8):
+        """
+        :return: счет с указанным номером паспорта или None
+        """
+        return self._by_passport.get(passport8)
+
+    def get_by_phone(self, phone_number):
+        """
+        :return: счет с указанным номером телефона или None
+        """
+        return self._by_phone.get(phone_number)
+
+
+if __name__ == "__main__":
+    account_ivan = CreditAccount("Ivan", "12385498", "+7900-800-11-22", 3000, negative_limit=1000)
+    account_petr = Account("Petr", 12345677, "+7900-800-11-33")
 
-account_ivan.deposit(300)
+    account_ivan.deposit(300)
 
-print(account_ivan.full_info())
+    print(account_ivan.full_info())
@@ -0,0 +1,160 @@
+"""
+Закрытие дня по кредитным счетам: проценты на задолженность и штраф за выход за кредитный лимит.
+Счета делятся на шарды по id, суммы считаются в процессах ProcessPoolExecutor, а результаты
+применяются к счетам в родительском процессе в порядке шардов - итог не зависит от порядка завершения процессов.
+Выполнять, когда операции над счетами не идут.
+    python IBank_accrual.py --workers 4 --shards 16
+"""
+import argparse
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from IBank import CreditAccount, Ledger, Operation, default_ledger, fee_amount, to_rubles
+
+DAYS_IN_YEAR = 365
+
+
+def daily_charges(balance, negative_limit, interest_bp, penalty_bp):
+    """
+    Начисления за день по одному счету
+    :param balance: баланс в копейках
+    :param negative_limit: кредитный лимит в копейках
+    :param interest_bp: годовая ставка в базисных пунктах
+    :param penalty_bp: штраф в базисных пунктах от суммы сверх лимита (ставка комиссии при отрицательном балансе)
+    :return: (проценты, штраф) в копейках
+    """
+    if balance >= 0:
+        return 0, 0
+    debt = -balance
+    interest = (debt * interest_bp + 5000 * DAYS_IN_YEAR) // (10000 * DAYS_IN_YEAR)
+    over_limit = debt + interest - negative_limit
+    penalty = fee_amount(over_limit, penalty_bp) if over_limit > 0 else 0
+    return interest, penalty
+
+
+def _accrue_shard(shard, balances, limits, interest_bps, penalty_bps):
+    """
+    Считает начисления для шарда. Выполняется в процессе-обработчике, поэтому получает и возвращает только числа.
+    :return: (номер шарда, проценты, штрафы, время расчета в секундах)
+    """
+    start = time.perf_counter()
+    interest, penalty = array('q'), array('q')
+    for charges in map(daily_charges, balances, limits, interest_bps, penalty_bps):
+        interest.append(charges[0])
+        penalty.append(charges[1])
+    return shard, interest, penalty, time.perf_counter() - start
+
+
+def _shards(accounts, count):
+    """
+    Делит счета (отсортированные по id) на count непрерывных шардов
+    :return: список (счета шарда, балансы, лимиты, ставки процентов, ставки штрафов)
+    """
+    size = -(-len(accounts) // count) if accounts else 0
+    shards = []
+    for start in range(0, len(accounts), size or 1):
+        part = accounts[start:start + size]
+        shards.append((
+            part,
+            array('q', [account.balance_kop for account in part]),
+            array('q', [account.negative_limit_kop for account in part]),
+            array('q', [account.INTEREST_BP for account in part]),
+            array('q', [account._fee_table[1] for account in part]),
+        ))
+    return shards
+
+
+def _apply(ledger, accounts, type, amounts):
+    """
+    Списывает начисления одного типа: строки журнала добавляются одним пакетом
+    :return: списанная сумма в копейках
+    """
+    # Индексы, а не пары (счет, сумма): на миллионах счетов создание кортежей заметно дороже самих списаний
+    charged = [index for index, amount in enumerate(amounts) if amount]
+    if not charged:
+        return 0
+    values = [amounts[index] for index in charged]
+    first = ledger.extend(type, values, [0] * len(charged), [Ledger.NO_TARGET] * len(charged))
+    log = ledger.wal is not None
+    counted = 0  # списано со счетов, учтенных в сводке
+    for row, index, amount in zip(range(first, first + len(charged)), charged, values):
+        account = accounts[index]
+        with account._lock:
+            account.balance_kop -= amount
+            account._history_rows.append(row)
+        if account._counted:
+            counted += amount
+        ledger.touch(account)
+        if log:
+            ledger.log(type, account, amount, row=row)
+    total = sum(values)
+    # Начисления идут только счетам с отрицательным балансом, поэтому число счетов в минусе не меняется
+    ledger.stats.add(balances=-counted, fees=total if type == Operation.PENALTY else 0)
+    return total
+
+
+def accrue(accounts, workers=None, shards=None, ledger=default_ledger):
+    """
+    Начисляет проценты и штрафы по кредитным счетам с отрицательным балансом
+    :param accounts: счета банка (AccountRegistry или любой итерируемый набор)
+    :param workers: число процессов (по умолчанию - по числу ядер); 0 - расчет в текущем процессе
+    :param shards: число шардов (не меньше 1), по умолчанию по одному на процесс
+    :return: отчет: число счетов, суммы процентов и штрафов в копейках,
+        время каждого шарда (номер, счетов, секунд) и общее время
+    """
+    if shards is not None and shards < 1:
+        raise ValueError('Число шардов должно быть не меньше 1.')
+    start = time.perf_counter()
+    debtors = sorted((account for account in accounts
+                      if isinstance(account, CreditAccount) and account.balance_kop < 0 and not account._archive),
+                     key=lambda account: account.id)
+    if shards is None:
+        shards = os.cpu_count() if workers is None else max(workers, 1)
+    parts = _shards(debtors, shards)
+
+    if workers == 0:
+        results = [_accrue_shard(shard, *part[1:]) for shard, part in enumerate(parts)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_accrue_shard, shard, *part[1:]) for shard, part in enumerate(parts)]
+            results = [future.result() for future in futures]
+
+    report = {'accounts': len(debtors), 'interest': 0, 'penalties': 0, 'shards': []}
+    for shard, interest, penalty, elapsed in sorted(results, key=lambda result: result[0]):
+        part = parts[shard][0]
+        report['interest'] += _apply(ledger, part, Operation.INTEREST, interest)
+        report['penalties'] += _apply(ledger, part, Operation.PENALTY, penalty)
+        report['shards'].append((shard, len(part), elapsed))
+    report['elapsed'] = time.perf_counter() - start
+    return report
+
+
+def main():
+    from IBank_menu import DATA_DIR
+    from IBank_storage import Storage
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию - по числу ядер)')
+    parser.add_argument('--shards', type=int, default=None)
+    parser.add_argument('--data', default=DATA_DIR)
+    args = parser.parse_args()
+    if args.shards is not None and args.shards < 1:
+        parser.error('--shards должно быть не меньше 1')
+
+    storage = Storage(args.data)
+    registry = storage.open()
+    try:
+        report = accrue(registry, args.workers, args.shards, storage.ledger)
+    finally:
+        storage.close()
+
+    for shard, count, elapsed in report['shards']:
+        print(f"шард {shard:>3}: счетов {count:>8}, {elapsed:.3f} сек.")
+    print(f"Счетов с начислениями: {report['accounts']}, проценты: {to_rubles(report['interest'])}, "
+          f"штрафы: {to_rubles(report['penalties'])}, всего {report['elapsed']:.2f} сек.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Пакетное проведение переводов.
+Балансы участвующих счетов (в копейках) собираются в массив NumPy (индекс - id счета в журнале),
+комиссии и проверки лимитов считаются векторно. Лимиты операций за период (Account.VELOCITY_LIMITS) проверяются
+по одному переводу окнами самих счетов - только для счетов, у которых они заданы.
+"""
+from contextlib import ExitStack
+
+import numpy as np
+
+from IBank import Operation, default_ledger
+
+# Коды результата перевода
+ACCEPTED = 0
+INSUFFICIENT_FUNDS = 1  # 'Недостаточно средств на счете.'
+ARCHIVED = 2  # 'Аккаунт в архиве. Все действия приостановлены.'
+VELOCITY_LIMIT = 3  # 'Превышен лимит операций за период.'
+
+
+def _split_into_waves(src, dst):
+    """
+    Разбивает переводы на волны: в одной волне каждый счет встречается не более одного раза,
+    а переводы одного счета идут в волнах в исходном порядке.
+    :return: индексы переводов, упорядоченные по волнам, и границы волн
+    """
+    last_wave = {}
+    waves = []
+    for s, t in zip(src.tolist(), dst.tolist()):
+        wave = max(last_wave.get(s, 0), last_wave.get(t, 0))
+        waves.append(wave)
+        last_wave[s] = last_wave[t] = wave + 1
+    waves = np.asarray(waves, dtype=np.int64)
+    order = np.argsort(waves, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(waves))))
+    return order, bounds
+
+
+def apply_transfers(batch, ledger=default_ledger):
+    """
+    Проводит пакет переводов.
+    Результат совпадает с последовательным вызовом source.transfer_kop(target, amount) для каждого перевода.
+    На все время пакета берутся блокировки всех участвующих счетов в порядке id, как в Account.transfer_kop(),
+    поэтому пакет можно проводить одновременно с операциями по одному из других потоков.
+    :param batch: последовательность (id счета отправителя, id счета получателя, сумма в копейках)
+    :param ledger: журнал, в котором зарегистрированы счета
+    :return: массив кодов результата (ACCEPTED, INSUFFICIENT_FUNDS, ARCHIVED, VELOCITY_LIMIT) по каждому переводу
+    :raises ValueError: в пакете есть неположительная сумма или несуществующий id счета; пакет тогда не проводится
+    """
+    data = np.asarray(batch, dtype=np.int64).reshape(-1, 3)
+    src, dst, amounts = data[:, 0], data[:, 1], data[:, 2]
+    codes = np.full(len(data), ACCEPTED, dtype=np.int8)
+    if not len(data):
+        return codes
+    if (amounts <= 0).any():
+        raise ValueError('Сумма операции должна быть больше нуля.')
+    if ((data[:, :2] < 0) | (data[:, :2] >= len(ledger.accounts))).any():
+        raise ValueError('Счет с таким id не найден.')
+
+    # Состояние только тех счетов, которые участвуют в пакете
+    ids, local = np.unique(np.concatenate((src, dst)), return_inverse=True)
+    src, dst = local[:len(data)], local[len(data):]
+    accounts = [ledger.account(account_id) for account_id in ids.tolist()]
+    with ExitStack() as locks:
+        # ids упорядочены np.unique()
+        for acc in accounts:
+            locks.enter_context(acc._lock)
+        balances = np.array([acc.balance_kop for acc in accounts], dtype=np.int64)
+        # Таблицы комиссий счетов (в базисных пунктах): столбец 0 - при балансе >= 0, столбец 1 - при балансе < 0
+        fee_table = np.array([acc._fee_table for acc in accounts], dtype=np.int64).reshape(-1, 2)
+        negative_limit = np.array([acc.negative_limit_kop for acc in accounts], dtype=np.int64)
+        archived = np.array([acc._in_archive() for acc in accounts], dtype=bool)
+        limited = np.array([bool(acc.VELOCITY_LIMITS) and ledger.limits_enabled for acc in accounts], dtype=bool)
+
+        fees = np.zeros(len(data), dtype=np.int64)
+        order, bounds = _split_into_waves(src, dst)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            idx = order[start:end]
+            s, t, amount = src[idx], dst[idx], amounts[idx]
+
+            fee = (amount * fee_table[s, (balances[s] < 0).astype(np.int64)] + 5000) // 10000  # IBank.fee_amount()
+            total = amount + fee
+            # Как и в Account.transfer_kop(): проверка средств, архива отправителя, лимитов за период,
+            # архива получателя. Перевод, отклоненный из-за архива получателя, остается учтенным в окнах лимитов
+            insufficient = total > balances[s] + negative_limit[s]
+            source_archived = ~insufficient & archived[s]
+            over_limit = np.zeros(len(idx), dtype=bool)
+            # В волне счет встречается один раз, а волны идут в порядке пакета - окна видят переводы в том же порядке
+            for i in np.flatnonzero(~(insufficient | source_archived) & limited[s]).tolist():
+                try:
+                    accounts[s[i]]._check_velocity(Operation.TRANSFER, int(amount[i]))
+                except ValueError:
+                    over_limit[i] = True
+            in_archive = source_archived | (~(insufficient | source_archived | over_limit) & archived[t])
+            ok = ~(insufficient | in_archive | over_limit)
+            codes[idx[insufficient]] = INSUFFICIENT_FUNDS
+            codes[idx[in_archive]] = ARCHIVED
+            codes[idx[over_limit]] = VELOCITY_LIMIT
+
+            balances[s[ok]] -= total[ok]
+            balances[t[ok]] += amount[ok]
+            fees[idx[ok]] = fee[ok]
+
+        for acc, balance in zip(accounts, balances.tolist()):
+            acc._set_balance_kop(balance)
+        ledger.stats.balance_changed(0, 0, fee=int(fees.sum()))
+        accepted = codes == ACCEPTED
+        first = _record_transfers(ledger, accounts, ids, src, dst, amounts, fees, accepted)
+        if ledger.wal is not None and first is not None:
+            # В WAL - по записи на перевод в порядке пакета: при восстановлении они проигрываются
+            # через transfer_kop(), результат которого совпадает с пакетом
+            for k, (s, t, amount) in enumerate(zip(src[accepted].tolist(), dst[accepted].tolist(),
+                                                   amounts[accepted].tolist())):
+                ledger.log(Operation.TRANSFER, accounts[s], amount, accounts[t], row=first + 2 * k)
+    return codes
+
+
+def _record_transfers(ledger, accounts, ids, src, dst, amounts, fees, accepted):
+    """
+    Записывает проведенные переводы в журнал: по две строки на перевод (отправителю и получателю),
+    в порядке переводов в пакете
+    :return: номер первой строки или None, если проведенных переводов нет
+    """
+    src, dst = src[accepted], dst[accepted]
+    if not len(src):
+        return None
+    owners = np.empty(2 * len(src), dtype=np.int64)
+    owners[0::2], owners[1::2] = src, dst
+    targets = np.empty_like(owners)
+    targets[0::2], targets[1::2] = ids[dst], ids[src]
+    first = ledger.extend(Operation.TRANSFER,
+                          np.repeat(amounts[accepted], 2).tolist(),
+                          np.repeat(fees[accepted], 2).tolist(),
+                          targets.tolist())
+
+    rows = first + np.argsort(owners, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(owners, minlength=len(accounts)))))
+    for acc, start, end in zip(accounts, bounds[:-1].tolist(), bounds[1:].tolist()):
+        if start != end:
+            acc._history_rows.frombytes(rows[start:end].astype(np.int64).tobytes())
+    return first
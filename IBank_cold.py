@@ -0,0 +1,155 @@
+"""
+Холодное хранилище архивных счетов.
+При to_archive() история счета переносится из журнала операций в sqlite, в памяти остается только сам объект
+счета без истории. restore() возвращает историю обратно в журнал. История архивного счета остается доступной
+через account.history / history_between() - она читается из sqlite.
+Хранилище разгружает память процесса и не заменяет Storage: при открытии оно очищается.
+    ledger.cold = ColdStore()
+"""
+import sqlite3
+import tempfile
+import threading
+from array import array
+
+from IBank import Ledger, Operation, to_timestamp
+
+COLUMNS = 'type, amount, fee, target, timestamp'
+
+
+class ColdStore:
+    FETCH_SIZE = 1000  # строк, читаемых из курсора за раз
+
+    def __init__(self, path=None):
+        if path is None:
+            self._tmp = tempfile.NamedTemporaryFile(prefix='ibank_cold_', suffix='.sqlite3')
+            path = self._tmp.name
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Хранилище пересоздается при каждом открытии, поэтому надежность записи на диск не нужна
+        self._db.executescript("""
+            PRAGMA synchronous = OFF;
+            PRAGMA journal_mode = MEMORY;
+            DROP TABLE IF EXISTS operations;
+            CREATE TABLE operations (
+                account INTEGER, seq INTEGER, type INTEGER, amount INTEGER, fee INTEGER,
+                target INTEGER, timestamp INTEGER,
+                PRIMARY KEY (account, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX operations_time ON operations (account, timestamp);
+        """)
+
+    def freeze(self, account):
+        """
+        Переносит историю счета в хранилище и освобождает ее строки в журнале
+        """
+        ledger = account._ledger
+        rows = account._history_rows
+        with self._lock, self._db:
+            self._db.executemany(
+                f'INSERT INTO operations (account, seq, {COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((account.id, seq, ledger.types[row], ledger.amounts[row], ledger.fees[row], ledger.targets[row],
+                  ledger.timestamps[row]) for seq, row in enumerate(rows))
+            )
+        account._history_rows = array('q')
+        account._frozen = True
+        ledger.release(rows)
+
+    def thaw(self, account):
+        """
+        Возвращает историю счета в журнал
+        """
+        with self._lock, self._db:
+            rows = self._db.execute(
+                f'SELECT {COLUMNS} FROM operations WHERE account = ? ORDER BY seq', (account.id,)
+            ).fetchall()
+            self._db.execute('DELETE FROM operations WHERE account = ?', (account.id,))
+        if rows:
+            first = account._ledger.append_rows(*zip(*rows))
+            account._history_rows = array('q', range(first, first + len(rows)))
+        account._frozen = False
+
+    def rows(self, account, start=None, end=None, types=None, limit=None, offset=0):
+        """
+        Строки истории архивного счета в виде кортежей значений столбцов журнала (type, amount, fee, target, timestamp)
+        :return: генератор; строки читаются из курсора пачками по FETCH_SIZE по мере обхода
+        """
+        sql = f'SELECT {COLUMNS} FROM operations WHERE account = ?'
+        params = [account.id]
+        if start is not None:
+            sql += ' AND timestamp >= ?'
+            params.append(to_timestamp(start))
+        if end is not None:
+            sql += ' AND timestamp < ?'
+            params.append(to_timestamp(end))
+        if types is not None:
+            codes = [account._ledger.TYPE_CODES[type] for type in types]
+            sql += f" AND type IN ({', '.join('?' * len(codes))})"
+            params += codes
+        sql += ' ORDER BY seq LIMIT ? OFFSET ?'
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def count(self, account):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM operations WHERE account = ?', (account.id,)).fetchone()[0]
+
+    def history(self, account):
+        return ColdHistory(self, account)
+
+    def totals(self):
+        """
+        Итоги по всей выгруженной истории для IBank.recompute_stats()
+        :return: (сумма пополнений, комиссии снятий и штрафы, комиссии в строках переводов) в копейках
+        """
+        codes = Ledger.TYPE_CODES
+        with self._lock:
+            return self._db.execute(
+                'SELECT COALESCE(SUM(CASE WHEN type = ? THEN amount END), 0),'
+                ' COALESCE(SUM(CASE WHEN type = ? THEN fee WHEN type = ? THEN amount END), 0),'
+                ' COALESCE(SUM(CASE WHEN type = ? THEN fee END), 0) FROM operations',
+                (codes[Operation.DEPOSIT], codes[Operation.WITHDRAW], codes[Operation.PENALTY],
+                 codes[Operation.TRANSFER])
+            ).fetchone()
+
+    def close(self):
+        self._db.close()
+
+
+class ColdHistory:
+    """
+    История архивного счета: то же, что IBank.History, но строки читаются из ColdStore
+    """
+
+    def __init__(self, store, account):
+        self._store = store
+        self._account = account
+
+    def _operations(self, rows):
+        make_operation = self._account._ledger.make_operation
+        return (make_operation(*row) for row in rows)
+
+    def __len__(self):
+        return self._store.count(self._account)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        for operation in self._operations(self._store.rows(self._account, limit=1, offset=index)):
+            return operation
+        raise IndexError('history index out of range')
+
+    def __iter__(self):
+        return self._operations(self._store.rows(self._account))
+
+    def between(self, start=None, end=None, types=None, limit=None, offset=0):
+        return self._operations(self._store.rows(self._account, start, end, types, limit, offset))
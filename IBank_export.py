@@ -0,0 +1,154 @@
+"""
+Потоковая выгрузка выписок: история счета или всего банка в CSV или JSONL.
+Строки читаются прямо из столбцов журнала операций и пишутся кусками по chunk_rows строк,
+поэтому память не зависит от длины истории.
+    python IBank_export.py statement.csv.gz --passport 12345678
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from IBank import Ledger
+
+FIELDS = ('passport', 'date', 'type', 'amount', 'fee', 'counterparty')
+
+
+def _money(kopecks):
+    # Суммы и комиссии в журнале неотрицательные
+    return f"{kopecks // 100}.{kopecks % 100:02d}"
+
+
+def _ledger_rows(account, start, end):
+    """
+    Значения столбцов журнала (type, amount, fee, target, timestamp) по строкам истории счета
+    """
+    if account._frozen:
+        # История архивного счета лежит в ColdStore
+        yield from account._ledger.cold.rows(account, start, end)
+        return
+    history = account.history
+    rows = history._rows
+    first = 0 if start is None else history._position(start)
+    last = len(rows) if end is None else history._position(end)
+    types, amounts, fees, targets, timestamps = history._columns
+    for i in range(first, last):
+        row = rows[i]
+        yield types[row], amounts[row], fees[row], targets[row], timestamps[row]
+
+
+def iter_rows(account, start=None, end=None):
+    """
+    Строки истории счета за период [start, end) без создания объектов Operation
+    :return: генератор кортежей в порядке FIELDS
+    """
+    ledger = account._ledger
+    # Дата до секунды форматируется один раз на секунду, микросекунды дописываются к ней
+    second, prefix = None, ''
+    for type, amount, fee, target, timestamp in _ledger_rows(account, start, end):
+        if timestamp // 10 ** 9 != second:
+            second = timestamp // 10 ** 9
+            prefix = datetime.fromtimestamp(second).isoformat()
+        yield (
+            account.passport8,
+            f"{prefix}.{timestamp % 10 ** 9 // 1000:06d}",
+            Ledger.TYPES[type],
+            _money(amount),
+            _money(fee),
+            '' if target == Ledger.NO_TARGET else ledger.account(target).passport8,
+        )
+
+
+def iter_bank_rows(registry):
+    """
+    Строки истории всех счетов банка, счет за счетом
+    """
+    for account in registry:
+        yield from iter_rows(account)
+
+
+def _chunks(rows, chunk_rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream(rows, format='csv', chunk_rows=10000):
+    """
+    Превращает строки выписки в текст кусками
+    :param rows: строки, например iter_rows() или iter_bank_rows()
+    :param format: 'csv' или 'jsonl'
+    :return: генератор строк (str), каждая - chunk_rows строк выписки
+    """
+    if format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(FIELDS)
+        for chunk in _chunks(rows, chunk_rows):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    elif format == 'jsonl':
+        for chunk in _chunks(rows, chunk_rows):
+            yield ''.join(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n' for row in chunk)
+    else:
+        raise ValueError(f'Неизвестный формат выписки: {format}')
+
+
+def write(rows, path, format=None, compress=None, chunk_rows=10000):
+    """
+    Записывает выписку в файл
+    :param format: 'csv' или 'jsonl', по умолчанию по расширению файла
+    :param compress: сжимать gzip, по умолчанию - если имя файла оканчивается на .gz
+    :return: количество записанных байт (до сжатия)
+    """
+    path = str(path)
+    name = path[:-3] if path.endswith('.gz') else path
+    format = format or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+    compress = path.endswith('.gz') if compress is None else compress
+    opener = gzip.open if compress else open
+    written = 0
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        for text in stream(rows, format, chunk_rows):
+            written += f.write(text)
+    return written
+
+
+def main():
+    from IBank_menu import DATA_DIR
+    from IBank_storage import Storage
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='файл выписки: .csv, .jsonl, можно с .gz')
+    parser.add_argument('--passport', type=int, help='номер паспорта; без него - выписка всего банка')
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--data', default=DATA_DIR)
+    args = parser.parse_args()
+
+    storage = Storage(args.data)
+    registry = storage.open()
+    try:
+        if args.passport is None:
+            rows = iter_bank_rows(registry)
+        else:
+            account = registry.get_by_passport(args.passport)
+            if account is None:
+                parser.error('Счет с таким номером паспорта не найден.')
+            rows = iter_rows(account)
+        write(rows, args.path, args.format)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
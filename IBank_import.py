@@ -0,0 +1,203 @@
+"""
+Массовое открытие счетов из файла CSV или JSONL.
+Поля клиента: name, passport, phone, balance (руб., необязательно),
+credit (1/true - кредитный счет, необязательно), negative_limit (руб., необязательно).
+Строки с ошибками не прерывают загрузку, а попадают в отчет об отклоненных строках.
+    python IBank_import.py clients.csv --rejects rejects.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+
+from IBank import PHONE_PATTERN, Account, CreditAccount, default_ledger, to_kopecks
+
+TRUE_VALUES = ('1', 'true', 'yes', 'да')
+
+
+def read_rows(path, format=None):
+    """
+    Читает клиентов из файла построчно
+    :param format: 'csv' или 'jsonl', по умолчанию по расширению файла
+    :return: генератор (номер строки, dict)
+    """
+    path = Path(path)
+    format = format or path.suffix.lstrip('.').lower()
+    with open(path, encoding='utf-8', newline='') as f:
+        if format == 'csv':
+            # Первая строка файла - заголовок
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        elif format in ('jsonl', 'ndjson'):
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+        else:
+            raise ValueError(f'Неизвестный формат файла: {format}')
+
+
+def _check_passport(passport):
+    try:
+        passport = int(passport)
+    except (TypeError, ValueError):
+        raise ValueError('Номер паспорта должен быть только из цифр.')
+    if 10000000 <= passport <= 99999999:
+        return passport
+    raise ValueError('В номере паспорта должно быть 8 цифр.')
+
+
+def _check_phone(phone):
+    if isinstance(phone, str) and PHONE_PATTERN.search(phone):
+        return phone
+    raise ValueError('Номер телефона указан в неверном формате.')
+
+
+def _parse_row(row, passport=None, phone=None):
+    """
+    Проверяет строку файла. Уже проверенные паспорт и телефон можно передать готовыми.
+    :return: (name, passport8, phone, balance_kop, credit, negative_limit_kop)
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Строка не является объектом клиента.')
+    name = row.get('name')
+    if not name:
+        raise ValueError('Не указано имя клиента.')
+    passport = _check_passport(row.get('passport')) if passport is None else passport
+    phone = _check_phone(row.get('phone')) if phone is None else phone
+    balance = to_kopecks(row.get('balance') or 0)
+    negative_limit = row.get('negative_limit')
+    negative_limit = None if negative_limit in (None, '') else to_kopecks(negative_limit)
+    credit = str(row.get('credit') or '').strip().lower() in TRUE_VALUES
+    return name, passport, phone, balance, credit, negative_limit
+
+
+def validate_rows(rows):
+    """
+    Проверка пачки строк
+    :param rows: список (номер строки, dict)
+    :return: список (номер строки, поля клиента) и список отклоненных (номер строки, причина)
+    """
+    valid, rejected = [], []
+    for line_no, row in rows:
+        try:
+            valid.append((line_no, _parse_row(row)))
+        except ValueError as e:
+            rejected.append((line_no, str(e)))
+    return valid, rejected
+
+
+def validate_rows_vectorized(rows):
+    """
+    То же, что validate_rows(), но паспорта и телефоны канонического вида проверяются NumPy сразу для всей пачки.
+    Строки, не прошедшие быструю проверку, перепроверяются как в validate_rows(), поэтому результат совпадает.
+    """
+    import numpy as np
+
+    if not rows:
+        return [], []
+    dicts = [row if isinstance(row, dict) else {} for _, row in rows]
+    passports = np.array([str(row.get('passport', '')).strip() for row in dicts])
+    phones = np.array([str(row.get('phone', '')) for row in dicts])
+
+    # Паспорт: ровно 8 цифр, первая не ноль
+    passport_ok = (np.char.str_len(passports) == 8) & np.char.isdigit(passports) & ~np.char.startswith(passports, '0')
+    # Телефон: ровно +7XXX-XXX-XX-XX
+    grid = phones.astype('U15').view('U1').reshape(len(phones), 15)
+    phone_ok = ((np.char.str_len(phones) == 15) & (grid[:, 0] == '+') & (grid[:, 1] == '7') &
+                np.all(grid[:, [5, 9, 12]] == '-', axis=1) &
+                np.all(np.char.isdigit(grid[:, [2, 3, 4, 6, 7, 8, 10, 11, 13, 14]]), axis=1))
+
+    valid, rejected = [], []
+    for (line_no, row), fast_passport, fast_phone in zip(rows, passport_ok.tolist(), phone_ok.tolist()):
+        try:
+            passport = int(row['passport']) if fast_passport else None
+            phone = row['phone'] if fast_phone else None
+            valid.append((line_no, _parse_row(row, passport, phone)))
+        except ValueError as e:
+            rejected.append((line_no, str(e)))
+    return valid, rejected
+
+
+def import_clients(rows, registry, batch_size=10000, vectorized=False, ledger=default_ledger):
+    """
+    Открывает счета для клиентов из rows
+    :param rows: итератор (номер строки, dict), например read_rows()
+    :param registry: AccountRegistry, куда добавляются счета
+    :param vectorized: проверять пачки через validate_rows_vectorized()
+    :return: количество открытых счетов и список отклоненных (номер строки, причина)
+    """
+    validate = validate_rows_vectorized if vectorized else validate_rows
+    imported, rejected = 0, []
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        valid, batch_rejected = validate(batch)
+        rejected += batch_rejected
+        accounts, line_numbers = [], {}
+        passports, phones = set(), set()
+        for line_no, (name, passport, phone, balance, credit, negative_limit) in valid:
+            # Дубликаты отсеиваются до создания счета: Account() сразу регистрирует счет в журнале
+            if passport in passports or registry.get_by_passport(passport) is not None:
+                rejected.append((line_no, 'Счет с таким номером паспорта уже существует.'))
+                continue
+            if phone in phones or registry.get_by_phone(phone) is not None:
+                rejected.append((line_no, 'Счет с таким номером телефона уже существует.'))
+                continue
+            passports.add(passport)
+            phones.add(phone)
+            account = (CreditAccount if credit else Account)(name, passport, phone, ledger=ledger)
+            account._set_balance_kop(balance)
+            if credit and negative_limit is not None:
+                account.negative_limit_kop = negative_limit
+            accounts.append(account)
+            line_numbers[id(account)] = line_no
+        batch_rejected = registry.add_many(accounts)
+        rejected += [(line_numbers[id(account)], reason) for account, reason in batch_rejected]
+        imported += len(accounts) - len(batch_rejected)
+    rejected.sort()
+    return imported, rejected
+
+
+def main():
+    from IBank_menu import DATA_DIR
+    from IBank_storage import Storage
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='файл клиентов .csv или .jsonl')
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--vectorized', action='store_true', help='проверка паспортов и телефонов через NumPy')
+    parser.add_argument('--rejects', help='файл CSV для отклоненных строк (по умолчанию - вывод в stderr)')
+    parser.add_argument('--data', default=DATA_DIR)
+    args = parser.parse_args()
+
+    storage = Storage(args.data)
+    storage.open()
+    try:
+        with storage.bulk_load() as registry:
+            imported, rejected = import_clients(read_rows(args.path, args.format), registry,
+                                                args.batch_size, args.vectorized, storage.ledger)
+    finally:
+        storage.close()
+
+    if args.rejects:
+        with open(args.rejects, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'error'])
+            writer.writerows(rejected)
+    else:
+        for line_no, reason in rejected:
+            print(f"строка {line_no}: {reason}", file=sys.stderr)
+    print(f"Открыто счетов: {imported}, отклонено строк: {len(rejected)}")
+
+
+if __name__ == "__main__":
+    main()
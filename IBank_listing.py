@@ -0,0 +1,165 @@
+"""
+Постраничный вывод счетов и топ-K для меню сотрудника.
+Страницы по балансу берутся из BalanceIndex - отсортированного списка, который обновляется только для изменившихся
+счетов (их id собирает Ledger.changed), без сортировки всех счетов на каждый запрос.
+Топ-K считается через heapq за O(n log k).
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+from IBank import CreditAccount, default_ledger
+
+
+class _SortedBuckets:
+    """
+    Отсортированный список, разбитый на куски по LOAD..2*LOAD элементов: вставка и удаление сдвигают
+    только один кусок, а не весь список
+    """
+    LOAD = 512
+
+    def __init__(self, ordered=()):
+        ordered = list(ordered)
+        self._lists = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self._maxes = [part[-1] for part in self._lists]
+        self._len = len(ordered)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value):
+        self._len += 1
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            return
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            self._maxes[i] = value
+        else:
+            insort(self._lists[i], value)
+        part = self._lists[i]
+        if len(part) > 2 * self.LOAD:
+            half = part[self.LOAD:]
+            del part[self.LOAD:]
+            self._lists.insert(i + 1, half)
+            self._maxes[i] = part[-1]
+            self._maxes.insert(i + 1, half[-1])
+
+    def remove(self, value):
+        self._len -= 1
+        i = bisect_left(self._maxes, value)
+        part = self._lists[i]
+        del part[bisect_left(part, value)]
+        if not part:
+            del self._lists[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = part[-1]
+
+    def slice(self, start, stop):
+        """
+        Элементы с позиции start по stop (не включая)
+        """
+        result = []
+        for part in self._lists:
+            if stop <= 0:
+                break
+            if start < len(part):
+                result += part[max(start, 0):stop]
+            start -= len(part)
+            stop -= len(part)
+        return result
+
+
+class BalanceIndex:
+    """
+    Счета реестра, упорядоченные по балансу. На один журнал - один индекс.
+    """
+    # Если изменилась больше чем 1/REBUILD_FRACTION часть счетов, индекс строится заново
+    REBUILD_FRACTION = 8
+
+    def __init__(self, registry, ledger=default_ledger):
+        self.registry = registry
+        self.ledger = ledger
+        self._lock = threading.Lock()
+        self._keys = _SortedBuckets()
+        self._indexed = {}  # id счета -> ключ, с которым он записан в _keys
+        ledger.changed = set()
+        self._rebuild()
+
+    def __len__(self):
+        self._sync()
+        return len(self._keys)
+
+    @staticmethod
+    def _key(account):
+        # Баланс и id в одном целом: сравнение чисел быстрее сравнения кортежей
+        return (account.balance_kop << 32) | account.id
+
+    def _rebuild(self):
+        self.ledger.changed.clear()
+        self._indexed = {account.id: self._key(account) for account in self.registry}
+        self._keys = _SortedBuckets(sorted(self._indexed.values()))
+
+    def _sync(self):
+        """
+        Переносит в индекс изменения счетов с прошлого обращения
+        """
+        changed = self.ledger.changed
+        with self._lock:
+            if len(changed) * self.REBUILD_FRACTION > len(self._keys):
+                self._rebuild()
+                return
+            keys, indexed = self._keys, self._indexed
+            while changed:
+                account_id = changed.pop()
+                old = indexed.pop(account_id, None)
+                if old is not None:
+                    keys.remove(old)
+                account = self.ledger.account(account_id)
+                if account in self.registry:
+                    key = indexed[account_id] = self._key(account)
+                    keys.add(key)
+
+    def page(self, number, size=20, descending=True):
+        """
+        :param number: номер страницы, с 0
+        :param size: счетов на странице
+        :param descending: True - от больших балансов к меньшим
+        :return: список счетов страницы
+        """
+        self._sync()
+        if descending:
+            stop = len(self._keys) - number * size
+            selected = self._keys.slice(max(stop - size, 0), max(stop, 0))[::-1]
+        else:
+            selected = self._keys.slice(number * size, (number + 1) * size)
+        return [self.ledger.account(key & 0xFFFFFFFF) for key in selected]
+
+    def pages(self, size=20):
+        return -(-len(self) // size)
+
+
+def top_balances(accounts, k=10):
+    """
+    k счетов с наибольшим балансом
+    """
+    return heapq.nlargest(k, accounts, key=lambda account: account.balance_kop)
+
+
+def top_debtors(accounts, k=10):
+    """
+    k кредитных счетов с наибольшей задолженностью
+    """
+    debtors = (account for account in accounts if isinstance(account, CreditAccount) and account.balance_kop < 0)
+    return heapq.nsmallest(k, debtors, key=lambda account: account.balance_kop)
+
+
+def most_active(accounts, k=10):
+    """
+    k счетов с самой длинной историей операций. История архивных счетов, выгруженная в ColdStore, не учитывается.
+    """
+    return heapq.nlargest(k, accounts, key=lambda account: len(account._history_rows))
@@ -1,180 +1,15 @@
 EMPLOYEE_PASSWORD = "123"
 
-from abc import ABC, abstractmethod
-from datetime import datetime
-
-
-class AccountBase(ABC):
-    def __init__(self, name, passport8, phone_number, start_balance=0):
-        self.name = name
-        self.passport8 = passport8
-        self.phone_number = phone_number
-        self.balance = start_balance
-
-    @abstractmethod
-    def transfer(self, target_account, amount):
-        """
-        Перевод денег на счет другого клиента
-        :param target_account: счет клиента для перевода
-        :param amount: сумма перевода
-        :return:
-        """
-        pass
-
-    @abstractmethod
-    def deposit(self, amount):
-        """
-        Внесение суммы на текущий счет
-        :param amount: сумма
-        """
-        pass
-
-    @abstractmethod
-    def withdraw(self, amount):
-        """
-        Снятие суммы с текущего счета
-        :param amount: сумма
-        """
-        pass
-
-    @abstractmethod
-    def full_info(self):
-        """
-        Полная информация о счете в формате: "Иванов Иван Петрович баланс: 100 руб. паспорт: 12345678 т.89002000203"
-        """
-        return f"..."
-
-    @abstractmethod
-    def __repr__(self):
-        """
-        :return: Информацию о счете в виде строки в формате "Иванов И.П. баланс: 100 руб."
-        """
-        return f"..."
-
-
-class Operation:
-    TRANSFER = "transfer"
-    WITHDRAW = "withdraw"
-    DEPOSIT = "deposit"
-
-    def __init__(self, type, amount, target=None, fee=0):
-        self.date = datetime.now()
-        self.type = type
-        self.amount = amount
-        self.target = target
-        self.fee = fee  # fee summ
-
-    def __repr__(self):
-        target = self.target.name if self.target else ""
-        return f"({self.date}) {self.type}: sum: {self.amount} {target}"
-
-
-class Account(AccountBase):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.history = []
-        self.__fee = 2  # 2%
-        # self.name = name
-        self.passport8 = self._validate_passport(args[1])
-        self.phone_number = self._validate_phone(args[2])
-        self._archive = False
-
-
-    def _validate_phone(self, phone):
-        import re
-        pattern = re.compile(r'\+7\d{3}-\d{3}-\d{2}-\d{2}')
-        if re.search(pattern, phone):
-            return phone
-        raise ValueError('Номер телефона указан в неверном формате.')
-
-    def _validate_passport(self, passport):
-        try:
-            passport = int(passport)
-        except ValueError:
-            raise ValueError('Номер паспорта должен быть только из цифр.')
-        if 10000000 <= passport <= 99999999:
-            return passport
-        raise ValueError('В номере паспорта должно быть 8 цифр.')
-
-    @property
-    def fee(self):
-        return self.__fee
-
-    def _in_archive(self):
-        return self._archive
-
-    def transfer(self, target_account, amount):
-        self.withdraw(amount, is_transfer=True)
-        target_account.deposit(amount, is_transfer=True)
-        op_transfer_to = Operation(Operation.TRANSFER, amount, target_account, amount * (self.fee / 100))
-        op_transfer_from = Operation(Operation.TRANSFER, amount, self, amount * (self.fee / 100))
-        self.history.append(op_transfer_to)
-        target_account.history.append(op_transfer_from)
-
-    def _check_balance(self, amount):
-        return amount * (1 + (self.fee / 100)) > self.balance
-
-    def withdraw(self, amount, is_transfer=False):
-        if self._check_balance(amount):
-            raise ValueError('Недостаточно средств на счете.')
-        if self._in_archive():
-            raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
-        self.balance -= amount * (1 + (self.fee / 100))
-        if not is_transfer:
-            self.history.append(
-                Operation(Operation.WITHDRAW, amount, fee=amount * (self.fee / 100))
-            )
-
-    def deposit(self, amount, is_transfer=False):
-        if self._in_archive():
-            raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
-        self.balance += amount
-        if not is_transfer:
-            op_deposit = Operation(Operation.DEPOSIT, amount)
-            self.history.append(op_deposit)
-
-    def full_info(self):
-
-        return f"{self.name} баланс: {self.balance}. Паспорт: {self.passport8}. тел.: {self.phone_number}"
-
-    def __repr__(self):
-        return f"{self.name} баланс: {self.balance}."
-
-    def get_history(self):
-        return "\n".join(map(str, self.history))
-
-    def to_archive(self):
-        if self.balance >= 0:
-            self.balance = 0
-            self._archive = True
-            return
-        raise ValueError('Нельзя убрать счет с отрицательным балансом в архив.')
-
-    def restore(self):
-        self._archive = False
-
-
-class CreditAccount(Account):
-    def __init__(self, *args, negative_limit=1000, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.negative_limit = negative_limit
-        self.base_transfer_fee = 2
-        self.negative_balance_transfer_fee = 5
-
-    @property
-    def fee(self):
-        if self.balance < 0:
-            return self.negative_balance_transfer_fee
-        return self.base_transfer_fee
+from pathlib import Path
 
-    def _check_balance(self, amount):
-        return amount * (1 + (self.fee / 100)) > self.balance + self.negative_limit
+from IBank import PHONE_PATTERN, Account, bank_stats
+from IBank_listing import BalanceIndex, most_active, top_balances, top_debtors
+from IBank_storage import Storage
 
-    def __repr__(self):
-        return '<K> ' + super().__repr__()
+DATA_DIR = Path(__file__).parent / 'ibank_data'
+PAGE_SIZE = 20
 
-    def full_info(self):
-        return '<K> ' + super().full_info()
+balance_index = None  # создается при первом просмотре списка счетов
 
 
 def close_account():
@@ -182,18 +17,84 @@ def close_account():
     Закрыть счет клиента.
     Считаем, что оставшиеся на счету деньги были выданы клиенту наличными, при закрытии счета
     """
-    pass
+    try:
+        passport = int(input("Номер паспорта: "))
+    except ValueError:
+        print("Номер паспорта должен быть только из цифр.")
+        return
+    account = accounts.get_by_passport(passport)
+    if account is None:
+        print("Счет с таким номером паспорта не найден.")
+        return
+    accounts.remove(account)
+    print(f"Счет закрыт. Выдано наличными: {account.balance}")
 
 
 def view_accounts_list():
     """
-        Отображение всех клиентов банка в виде нумерованного списка
-        """
-    for nom, acc in enumerate(accounts):
-        print(nom, acc)
+    Отображение клиентов банка постранично, от большего баланса к меньшему
+    """
+    global balance_index
+    if balance_index is None:
+        balance_index = BalanceIndex(accounts)
+    page = 0
+    while True:
+        pages = balance_index.pages(PAGE_SIZE)
+        if not pages:
+            print("Счетов нет.")
+            return
+        page = min(page, pages - 1)
+        for nom, acc in enumerate(balance_index.page(page, PAGE_SIZE), start=page * PAGE_SIZE + 1):
+            print(nom, acc)
+        print(f"Страница {page + 1} из {pages}. Enter - следующая, p - предыдущая, номер - перейти, q - выход")
+        choice = input(":").strip()
+        if choice == "q":
+            return
+        elif choice == "p":
+            page = max(page - 1, 0)
+        elif choice.isdigit():
+            page = max(int(choice) - 1, 0)
+        elif page + 1 < pages:
+            page += 1
+        else:
+            return
+
+
+def view_top_accounts(count=10):
+    """
+    Топ счетов: наибольшие балансы, наибольшие долги по кредитным счетам, самые активные
+    """
+    for title, top in (("Наибольшие балансы", top_balances(accounts, count)),
+                       ("Наибольшие долги по кредитным счетам", top_debtors(accounts, count)),
+                       ("Больше всего операций", most_active(accounts, count))):
+        print(f"{title}:")
+        for nom, acc in enumerate(top, start=1):
+            print(nom, acc)
 
 def view_account_by_passport():
-    pass
+    try:
+        passport = int(input("Номер паспорта: "))
+    except ValueError:
+        print("Номер паспорта должен быть только из цифр.")
+        return
+    account = accounts.get_by_passport(passport)
+    if account is None:
+        print("Счет с таким номером паспорта не найден.")
+        return
+    print(account.full_info())
+
+
+def view_bank_stats():
+    """
+    Сводка по банку: суммы и количества счетов без перебора счетов
+    """
+    stats = bank_stats()
+    print(f"Открытых счетов: {stats['accounts']}")
+    print(f"Деньги клиентов на счетах: {stats['balances']}")
+    print(f"Внесено пополнениями: {stats['deposited']}")
+    print(f"Получено комиссий: {stats['fees']}")
+    print(f"Счетов с отрицательным балансом: {stats['negative']}")
+    print(f"Счетов в архиве: {stats['archived']}")
 
 
 def view_client_account():
@@ -223,14 +124,13 @@ def transfer(account):
     """
     Перевести на счет другого клиента по номеру телефона
     """
-    import re
     try:
         amount = int(input('Сколько планируете перевести? '))
     except:
         print("Введена некорректная сумма. Возврат в предыдущее меню.")
         return
     phone = input('Введите номер получателя по маске: +7***-***-**-**\n')
-    if re.search(r'\+7\d{3}-\d{3}-\d{2}-\d{2}', phone):
+    if PHONE_PATTERN.search(phone):
         target_account = search_by_phone(phone)
         if target_account:
             try:
@@ -249,12 +149,10 @@ def create_new_account():
     passport = input("Номер паспорта: ")
     phone_number = input("Номер телефона: ")
     amount = int(input("Сколько класть на счет: "))
-    # TODO: тут создаем новый аккаунт пользователя account = ...
-    #   и добавляем его в accounts.append(account)
-
-    accounts.append(
-        Account(name, passport, phone_number, amount)
-    )
+    try:
+        accounts.add(Account(name, passport, phone_number, amount))
+    except ValueError as e:
+        print(e)
 
 
 def client_menu(account):
@@ -286,7 +184,9 @@ def employee_menu():
         print("2. Закрыть счет")
         print("3. Посмотреть список счетов")
         print("4. Посмотреть счет по номеру паспорта")
-        print("5. Exit")
+        print("5. Сводка по банку")
+        print("6. Топ счетов")
+        print("7. Exit")
         choice = input(":")
         if choice == "1":
             create_new_account()
@@ -297,6 +197,10 @@ def employee_menu():
         elif choice == "4":
             view_account_by_passport()
         elif choice == "5":
+            view_bank_stats()
+        elif choice == "6":
+            view_top_accounts()
+        elif choice == "7":
             return
 
 
@@ -319,11 +223,7 @@ def client_access(accounts):
         passport = int(input("Номер паспорта: "))
     except ValueError:
         return False
-    for account in accounts:
-        if passport == account.passport8:
-            return account
-
-    return False
+    return accounts.get_by_passport(passport) or False
 
 
 def start_menu():
@@ -351,12 +251,13 @@ def start_menu():
             print("Указан некорректный пункт меню, повторите выбор...")
 
 def search_by_phone(phone):
-    for acc in accounts:
-        if acc.phone_number == phone:
-            return acc
-    return None
+    return accounts.get_by_phone(phone)
 
 
 if __name__ == "__main__":
-    accounts = []
-    start_menu()
+    storage = Storage(DATA_DIR)
+    accounts = storage.open()
+    try:
+        start_menu()
+    finally:
+        storage.close()
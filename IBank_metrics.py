@@ -0,0 +1,186 @@
+"""
+Инструментирование операций счетов: число вызовов, суммарное и максимальное время по типам операций,
+число отказов по причинам.
+Включается явно: enable() подменяет методы Account на обертки с замером, disable() возвращает исходные.
+Пока замер выключен, методы счетов исполняются без каких-либо проверок - накладных расходов нет.
+    import IBank_metrics
+    IBank_metrics.enable()
+    ...
+    IBank_metrics.metrics.snapshot()
+    IBank_metrics.metrics.write_prometheus('ibank.prom')
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+from IBank import Account
+
+# Причины отказов по тексту ValueError, который выбрасывают методы счета
+REASONS = {
+    'Недостаточно средств на счете.': 'insufficient_funds',
+    'Аккаунт в архиве. Все действия приостановлены.': 'archived',
+    'Номер телефона указан в неверном формате.': 'invalid_phone',
+    'Номер паспорта должен быть только из цифр.': 'invalid_passport',
+    'В номере паспорта должно быть 8 цифр.': 'invalid_passport',
+    'Превышен лимит операций за период.': 'velocity_limit',
+}
+# Инструментируемые методы: имя операции в метриках -> имя метода Account
+OPERATIONS = {
+    'transfer': 'transfer_kop',
+    'withdraw': 'withdraw_kop',
+    'deposit': 'deposit_kop',
+    'validate_phone': '_validate_phone',
+    'validate_passport': '_validate_passport',
+}
+# Методы, которые transfer_kop() вызывает с is_transfer=True: такие вызовы учитываются только как перевод
+PARTS_OF_TRANSFER = ('withdraw', 'deposit')
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}  # операция -> [вызовов, суммарное время в нс, максимальное время в нс]
+        self._rejections = {}  # (операция, причина) -> число отказов
+
+    def record(self, operation, elapsed_ns):
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                self._operations[operation] = [1, elapsed_ns, elapsed_ns]
+                return
+            stats[0] += 1
+            stats[1] += elapsed_ns
+            if elapsed_ns > stats[2]:
+                stats[2] = elapsed_ns
+
+    def reject(self, operation, error):
+        key = (operation, REASONS.get(str(error), 'other'))
+        with self._lock:
+            self._rejections[key] = self._rejections.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self._rejections.clear()
+
+    def snapshot(self):
+        """
+        :return: {'operations': {операция: {'calls', 'seconds_total', 'seconds_max'}},
+                  'rejections': {операция: {причина: число}}}
+        """
+        with self._lock:
+            operations = {
+                operation: {'calls': calls, 'seconds_total': total / 10 ** 9, 'seconds_max': maximum / 10 ** 9}
+                for operation, (calls, total, maximum) in self._operations.items()
+            }
+            rejections = {}
+            for (operation, reason), count in self._rejections.items():
+                rejections.setdefault(operation, {})[reason] = count
+        return {'operations': operations, 'rejections': rejections}
+
+    def prometheus(self):
+        """
+        Метрики в текстовом формате Prometheus
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, kind, help, key in (
+                ('ibank_operation_calls_total', 'counter', 'Число вызовов операции', 'calls'),
+                ('ibank_operation_seconds_total', 'counter', 'Суммарное время операции', 'seconds_total'),
+                ('ibank_operation_seconds_max', 'gauge', 'Максимальное время операции', 'seconds_max')):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for operation, stats in sorted(snapshot['operations'].items()):
+                lines.append(f'{name}{{operation="{operation}"}} {stats[key]}')
+        lines.append('# HELP ibank_rejections_total Число отказов по причинам')
+        lines.append('# TYPE ibank_rejections_total counter')
+        for operation, reasons in sorted(snapshot['rejections'].items()):
+            for reason, count in sorted(reasons.items()):
+                lines.append(f'ibank_rejections_total{{operation="{operation}",reason="{reason}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Записывает метрики в файл (например, для textfile collector в node_exporter).
+        Файл заменяется целиком, поэтому читатель не увидит недописанный файл.
+        """
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+_originals = {}
+
+
+def _timed(operation, method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if kwargs.get('request_id') is not None:
+            # Метод с request_id сам вызывает себя без него - замер попадет во вложенный вызов,
+            # а повтор запроса, отвеченный из RequestCache, не считается вызовом
+            return method(self, *args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return method(self, *args, **kwargs)
+        except ValueError as error:
+            metrics.reject(operation, error)
+            raise
+        finally:
+            metrics.record(operation, time.perf_counter_ns() - start)
+    return wrapper
+
+
+def _timed_part_of_transfer(operation, method):
+    timed = _timed(operation, method)
+
+    @wraps(method)
+    def wrapper(self, amount, is_transfer=False, **kwargs):
+        if is_transfer:
+            return method(self, amount, is_transfer, **kwargs)
+        return timed(self, amount, **kwargs)
+    return wrapper
+
+
+def enable():
+    """
+    Включает замер для всех счетов
+    """
+    if _originals:
+        return
+    for operation, name in OPERATIONS.items():
+        method = getattr(Account, name)
+        _originals[name] = method
+        make_wrapper = _timed_part_of_transfer if operation in PARTS_OF_TRANSFER else _timed
+        setattr(Account, name, make_wrapper(operation, method))
+
+
+def disable():
+    """
+    Выключает замер и возвращает исходные методы. Накопленные метрики сохраняются.
+    """
+    for name, method in _originals.items():
+        setattr(Account, name, method)
+    _originals.clear()
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def start_dumping(path, interval=15):
+    """
+    Периодически записывает метрики в файл в фоновом потоке
+    :return: threading.Event, установка которого останавливает запись
+    """
+    stop = threading.Event()
+
+    def dump():
+        while not stop.wait(interval):
+            metrics.write_prometheus(path)
+        metrics.write_prometheus(path)
+
+    threading.Thread(target=dump, name='ibank-metrics', daemon=True).start()
+    return stop
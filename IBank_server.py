@@ -0,0 +1,150 @@
+"""
+Сетевой интерфейс банка на asyncio.
+Протокол: по одному JSON-объекту на строку в обе стороны.
+Запрос:  {"id": 1, "op": "deposit", "passport": 12345678, "amount": 100}
+Суммы передаются в рублях, балансы в ответах - строкой с копейками ("100.50").
+Ответ:   {"id": 1, "ok": true, "result": ...} или {"id": 1, "ok": false, "error": "..."}
+В deposit/withdraw/transfer можно передать "request_id": повтор запроса с тем же request_id (например, после
+таймаута) не проводит операцию второй раз.
+Клиент может отправлять запросы не дожидаясь ответов (конвейер), ответы приходят в порядке запросов.
+Все операции выполняются в потоке цикла событий, поэтому дополнительные блокировки не нужны.
+    python IBank_server.py --port 8888
+"""
+import argparse
+import asyncio
+import json
+
+from IBank import Account, AccountRegistry, CreditAccount
+
+
+class BankServer:
+    def __init__(self, registry=None):
+        self.registry = AccountRegistry() if registry is None else registry
+        self.handlers = {
+            'create': self.create,
+            'deposit': self.deposit,
+            'withdraw': self.withdraw,
+            'transfer': self.transfer,
+            'history': self.history,
+            'list': self.list_accounts,
+        }
+
+    def _account(self, request):
+        account = self.registry.get_by_passport(int(request['passport']))
+        if account is None:
+            raise ValueError('Счет с таким номером паспорта не найден.')
+        return account
+
+    def create(self, request):
+        args = (request['name'], request['passport'], request['phone'], request.get('amount', 0))
+        if request.get('credit'):
+            account = CreditAccount(*args, negative_limit=request.get('negative_limit', 1000))
+        else:
+            account = Account(*args)
+        self.registry.add(account)
+        return account.full_info()
+
+    def deposit(self, request):
+        account = self._account(request)
+        account.deposit(request['amount'], request_id=request.get('request_id'))
+        return str(account.balance)
+
+    def withdraw(self, request):
+        account = self._account(request)
+        account.withdraw(request['amount'], request_id=request.get('request_id'))
+        return str(account.balance)
+
+    def transfer(self, request):
+        """
+        Перевод другому клиенту по номеру телефона, как в меню клиента
+        """
+        account = self._account(request)
+        target_account = self.registry.get_by_phone(request['phone'])
+        if target_account is None:
+            raise ValueError('Аккаунт с таким номером не найден.')
+        account.transfer(target_account, request['amount'], request_id=request.get('request_id'))
+        return str(account.balance)
+
+    def history(self, request):
+        return [str(operation) for operation in self._account(request).history]
+
+    def list_accounts(self, request):
+        return [repr(account) for account in self.registry]
+
+    def dispatch(self, line):
+        """
+        Выполняет один запрос
+        :param line: строка запроса
+        :return: ответ (dict)
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            handler = self.handlers.get(request.get('op'))
+            if handler is None:
+                raise ValueError(f"Неизвестная операция: {request.get('op')}")
+            return {'id': request_id, 'ok': True, 'result': handler(request)}
+        except KeyError as e:
+            return {'id': request_id, 'ok': False, 'error': f'Не указано поле {e}'}
+        except (ValueError, TypeError, AttributeError) as e:
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = self.dispatch(line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8888):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(server, host, port):
+    tcp_server = await server.start(host, port)
+    print(f"IBank слушает {', '.join(str(sock.getsockname()) for sock in tcp_server.sockets)}")
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main():
+    from IBank_menu import DATA_DIR
+    from IBank_storage import Storage
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--data', default=DATA_DIR)
+    parser.add_argument('--metrics', help='файл для метрик в формате Prometheus (по умолчанию замер выключен)')
+    parser.add_argument('--metrics-interval', type=float, default=15)
+    args = parser.parse_args()
+
+    stop_dumping = None
+    if args.metrics:
+        import IBank_metrics
+        IBank_metrics.enable()
+        stop_dumping = IBank_metrics.start_dumping(args.metrics, args.metrics_interval)
+    storage = Storage(args.data)
+    server = BankServer(storage.open())
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        storage.close()
+        if stop_dumping is not None:
+            stop_dumping.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Шардированный режим банка: счета распределены по N процессам по номеру паспорта,
+каждый процесс держит свой журнал и балансы своих счетов. ShardedBank направляет операции в нужный шард.
+Операции передаются пакетами: ShardedBank.execute() рассылает каждому шарду его часть пакета одним сообщением,
+и шарды обрабатывают их параллельно.
+Перевод между шардами проходит в две фазы:
+    1. шард отправителя резервирует сумму с комиссией (списывает и запоминает), шард получателя проверяет счет;
+    2. если обе стороны готовы - обе фиксируют перевод, иначе зарезервированное возвращается отправителю.
+Пока перевод не зафиксирован, деньги не доступны ни отправителю, ни получателю.
+Шарды хранят данные только в памяти (без WAL), после close() данные теряются.
+    with ShardedBank(4) as bank:
+        bank.execute([('create', ['Account', 'Ivan', 12345678, '+7900-800-11-22', None], 100000), ...])
+"""
+import multiprocessing
+from itertools import count
+
+from IBank import AccountRegistry, Ledger, Operation, check_amount
+from IBank_storage import _make_account
+
+
+def shard_of(passport8, shards):
+    """
+    Номер шарда счета
+    """
+    return hash(int(passport8)) % shards
+
+
+class ShardWorker:
+    """
+    Счета одного шарда. Работает в процессе шарда.
+    """
+
+    def __init__(self):
+        self.ledger = Ledger()
+        self.registry = AccountRegistry()
+        self._reserved = {}  # id перевода -> (счет отправителя, сумма, комиссия)
+        self._incoming = {}  # id перевода -> (счет получателя, сумма)
+        self.handlers = {
+            'create': self.create,
+            'deposit': self.deposit,
+            'withdraw': self.withdraw,
+            'transfer': self.transfer,
+            'balance': self.balance,
+            'reserve': self.reserve,
+            'prepare': self.prepare,
+            'commit': self.commit,
+            'abort': self.abort,
+            'stats': self.stats,
+        }
+
+    def _account(self, passport8):
+        account = self.registry.get_by_passport(passport8)
+        if account is None:
+            raise ValueError('Счет с таким номером паспорта не найден.')
+        return account
+
+    def create(self, info, balance_kop):
+        self.registry.add(_make_account(info, balance_kop, self.ledger))
+
+    def deposit(self, passport8, amount):
+        self._account(passport8).deposit_kop(amount)
+
+    def withdraw(self, passport8, amount):
+        return self._account(passport8).withdraw_kop(amount)
+
+    def transfer(self, passport8, target_passport8, amount):
+        self._account(passport8).transfer_kop(self._account(target_passport8), amount)
+
+    def balance(self, passport8):
+        return self._account(passport8).balance_kop
+
+    def reserve(self, xid, passport8, amount):
+        """
+        Фаза 1 перевода на стороне отправителя: списывает сумму с комиссией
+        :return: комиссия в копейках
+        """
+        account = self._account(passport8)
+        fee = account.withdraw_kop(amount, is_transfer=True)
+        self._reserved[xid] = (account, amount, fee)
+        return fee
+
+    def prepare(self, xid, passport8, amount):
+        """
+        Фаза 1 перевода на стороне получателя: проверяет, что счет может принять перевод
+        """
+        check_amount(amount)
+        account = self._account(passport8)
+        if account._archive:
+            raise ValueError('Аккаунт в архиве. Все действия приостановлены.')
+        self._incoming[xid] = (account, amount)
+
+    def commit(self, xid, fee):
+        """
+        Фаза 2: фиксирует перевод. Обе половины записываются в историю с комиссией, как в Ledger.append_transfer(),
+        контрагент из другого шарда не указывается.
+        """
+        if xid in self._reserved:
+            account, amount, fee = self._reserved.pop(xid)
+        else:
+            account, amount = self._incoming.pop(xid)
+            account.deposit_kop(amount, is_transfer=True)
+        account._record(Operation.TRANSFER, amount, fee=fee)
+
+    def abort(self, xid):
+        if xid in self._reserved:
+            account, amount, fee = self._reserved.pop(xid)
+            account._refund_kop(amount, fee)
+        else:
+            self._incoming.pop(xid, None)
+
+    def stats(self):
+        return self.ledger.stats.as_dict()
+
+    def run(self, operations):
+        """
+        :return: список (успех, результат или текст ошибки) по операциям пакета
+        """
+        results = []
+        for operation in operations:
+            try:
+                results.append((True, self.handlers[operation[0]](*operation[1:])))
+            except Exception as e:
+                # Ошибка одной операции (в т.ч. неверные аргументы) не должна останавливать процесс шарда
+                results.append((False, str(e)))
+        return results
+
+
+def _serve(conn):
+    worker = ShardWorker()
+    while True:
+        operations = conn.recv()
+        if operations is None:
+            break
+        conn.send(worker.run(operations))
+    conn.close()
+
+
+class ShardedBank:
+    """
+    Маршрутизатор операций по шардам
+    """
+
+    def __init__(self, shards=None):
+        shards = shards or multiprocessing.cpu_count()
+        self._conns = []
+        self._processes = []
+        for _ in range(shards):
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+        self._xids = count()
+
+    def __len__(self):
+        return len(self._conns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def shard(self, passport8):
+        return shard_of(passport8, len(self._conns))
+
+    def _round(self, batches):
+        """
+        Отправляет пакеты всем шардам и ждет ответы. Шарды обрабатывают свои пакеты одновременно.
+        """
+        for conn, batch in zip(self._conns, batches):
+            if batch:
+                conn.send(batch)
+        return [conn.recv() if batch else [] for conn, batch in zip(self._conns, batches)]
+
+    def execute(self, operations):
+        """
+        Выполняет пакет операций. Операции одного шарда выполняются в порядке пакета;
+        зачисление перевода из другого шарда происходит после всех операций пакета.
+        :param operations: кортежи
+            ('create', данные счета как в IBank_storage, начальный баланс в копейках),
+            ('deposit', паспорт, сумма), ('withdraw', паспорт, сумма), ('balance', паспорт),
+            ('transfer', паспорт отправителя, паспорт получателя, сумма). Суммы в копейках.
+        :return: список (успех, результат или текст ошибки) в порядке операций
+        """
+        batches = [[] for _ in self._conns]
+        places = []
+        for operation in operations:
+            kind = operation[0]
+            shard = self.shard(operation[1][2] if kind == 'create' else operation[1])
+            if kind == 'transfer':
+                _, passport8, target_passport8, amount = operation
+                target_shard = self.shard(target_passport8)
+                if target_shard != shard:
+                    xid = next(self._xids)
+                    batches[shard].append(('reserve', xid, passport8, amount))
+                    batches[target_shard].append(('prepare', xid, target_passport8, amount))
+                    places.append((shard, len(batches[shard]) - 1, target_shard, len(batches[target_shard]) - 1, xid))
+                    continue
+            batches[shard].append(operation)
+            places.append((shard, len(batches[shard]) - 1))
+
+        results = self._round(batches)
+        second = [[] for _ in self._conns]
+        out = []
+        for place in places:
+            if len(place) == 2:
+                shard, index = place
+                out.append(results[shard][index])
+                continue
+            shard, index, target_shard, target_index, xid = place
+            reserved, prepared = results[shard][index], results[target_shard][target_index]
+            if reserved[0] and prepared[0]:
+                second[shard].append(('commit', xid, reserved[1]))
+                second[target_shard].append(('commit', xid, reserved[1]))
+                out.append((True, None))
+                continue
+            if reserved[0]:
+                second[shard].append(('abort', xid))
+            if prepared[0]:
+                second[target_shard].append(('abort', xid))
+            out.append(prepared if reserved[0] else reserved)
+        if any(second):
+            self._round(second)
+        return out
+
+    def create(self, name, passport8, phone_number, balance_kop=0, negative_limit_kop=None):
+        """
+        Открывает счет в шарде
+        :param negative_limit_kop: кредитный лимит в копейках; если указан, открывается CreditAccount
+        """
+        class_name = 'Account' if negative_limit_kop is None else 'CreditAccount'
+        return self._single(('create', [class_name, name, passport8, phone_number, negative_limit_kop], balance_kop))
+
+    def _single(self, operation):
+        ok, result = self.execute([operation])[0]
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    def deposit(self, passport8, amount):
+        return self._single(('deposit', passport8, amount))
+
+    def withdraw(self, passport8, amount):
+        return self._single(('withdraw', passport8, amount))
+
+    def transfer(self, passport8, target_passport8, amount):
+        return self._single(('transfer', passport8, target_passport8, amount))
+
+    def balance(self, passport8):
+        return self._single(('balance', passport8))
+
+    def stats(self):
+        """
+        Сводка по всем шардам (суммы как в IBank.bank_stats())
+        """
+        total = {}
+        for (ok, stats), in self._round([[('stats',)] for _ in self._conns]):
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(None)
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self._conns = []
+        self._processes = []
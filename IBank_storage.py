@@ -0,0 +1,319 @@
+"""
+Сохранение состояния банка на диск: журнал предзаписи (WAL) и периодические снимки балансов.
+
+Каждое событие счета (открытие, пополнение, снятие, перевод, архивация, восстановление, ...)
+дописывается в WAL. Записи сбрасываются на диск (fsync) группами: не реже чем раз в group_size
+записей или раз в group_interval секунд (по времени - фоновым потоком, в том числе когда новых записей нет).
+Раз в snapshot_every событий пишется снимок балансов, после чего WAL обрезается.
+При запуске загружается снимок и проигрывается только хвост WAL.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from IBank import Account, AccountRegistry, CreditAccount, Operation, default_ledger
+
+ACCOUNT_CLASSES = {cls.__name__: cls for cls in (Account, CreditAccount)}
+
+
+def _account_info(account):
+    """
+    Данные, по которым счет создается заново при восстановлении
+    """
+    negative_limit = account.negative_limit_kop if isinstance(account, CreditAccount) else None
+    return [type(account).__name__, account.name, account.passport8, account.phone_number, negative_limit]
+
+
+def _make_account(info, balance_kop, ledger):
+    class_name, name, passport8, phone_number, negative_limit_kop = info
+    account = ACCOUNT_CLASSES[class_name](name, passport8, phone_number, ledger=ledger)
+    account._set_balance_kop(balance_kop)
+    if negative_limit_kop is not None:
+        account.negative_limit_kop = negative_limit_kop
+    return account
+
+
+class WriteAheadLog:
+    """
+    Журнал предзаписи.
+    Запись: номер (lsn), код события, паспорт счета, паспорт контрагента (0 - нет), сумма в копейках,
+    время операции в наносекундах (при восстановлении операция получает в истории это время).
+    Для событий CREATE и CHANGE_PHONE за записью следует JSON с данными счета.
+    """
+    RECORD = struct.Struct('<QBqqqq')
+    PAYLOAD = struct.Struct('<I')
+    EVENTS = (Operation.CREATE, Operation.CLOSE, Operation.DEPOSIT, Operation.WITHDRAW, Operation.TRANSFER,
+              Operation.ARCHIVE, Operation.RESTORE, Operation.CHANGE_PHONE, Operation.INTEREST, Operation.PENALTY)
+    WITH_PAYLOAD = (Operation.CREATE, Operation.CHANGE_PHONE)
+
+    def __init__(self, path, lsn=0, group_size=256, group_interval=0.05):
+        self.path = Path(path)
+        self.lsn = lsn
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self._file = open(self.path, 'ab')
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='ibank-wal', daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        """
+        Сбрасывает записи, которые ждут дольше group_interval. Без этого при простое последние
+        подтвержденные записи оставались бы в буфере до следующей записи.
+        """
+        while not self._stop.wait(self.group_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_sync >= self.group_interval:
+                    self._sync()
+
+    def append(self, event, account, amount=0, target=None, timestamp=0):
+        """
+        Дописывает событие в журнал
+        :param timestamp: время операции в наносекундах
+        :return: номер записи (lsn)
+        """
+        target = target.passport8 if target is not None else 0
+        with self._lock:
+            self.lsn += 1
+            self._file.write(self.RECORD.pack(self.lsn, self.EVENTS.index(event), account.passport8, target, amount,
+                                              timestamp))
+            if event in self.WITH_PAYLOAD:
+                payload = json.dumps(_account_info(account), ensure_ascii=False).encode()
+                self._file.write(self.PAYLOAD.pack(len(payload)))
+                self._file.write(payload)
+            self._pending += 1
+            if self._pending >= self.group_size or time.monotonic() - self._last_sync >= self.group_interval:
+                self._sync()
+            return self.lsn
+
+    def sync(self):
+        """
+        Сбрасывает накопленные записи на диск
+        """
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def truncate(self):
+        """
+        Очищает журнал (после записи снимка). Нумерация записей продолжается.
+        """
+        with self._lock:
+            self._file.truncate(0)
+            self._sync()
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    @classmethod
+    def read(cls, path):
+        """
+        Читает записи журнала. Недописанная последняя запись (сбой во время записи) отбрасывается.
+        :return: список записей (lsn, событие, паспорт, паспорт контрагента, сумма, время, данные счета)
+            и длина корректной части файла
+        """
+        records = []
+        valid_size = 0
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return records, valid_size
+        offset = 0
+        while offset + cls.RECORD.size <= len(data):
+            lsn, code, passport8, target, amount, timestamp = cls.RECORD.unpack_from(data, offset)
+            offset += cls.RECORD.size
+            event = cls.EVENTS[code]
+            info = None
+            if event in cls.WITH_PAYLOAD:
+                if offset + cls.PAYLOAD.size > len(data):
+                    break
+                size, = cls.PAYLOAD.unpack_from(data, offset)
+                offset += cls.PAYLOAD.size
+                if offset + size > len(data):
+                    break
+                info = json.loads(data[offset:offset + size])
+                offset += size
+            records.append((lsn, event, passport8, target, amount, timestamp, info))
+            valid_size = offset
+        return records, valid_size
+
+
+class Snapshot:
+    """
+    Снимок состояния счетов в одном файле:
+    заголовок, балансы в копейках (int64), признаки архива (по байту на счет), данные счетов в JSON построчно.
+    Балансы читаются через mmap без копирования файла в память.
+    """
+    MAGIC = b'IBANKSNP'
+    HEADER = struct.Struct('<8sQQQ')  # magic, lsn, количество счетов, смещение данных счетов
+
+    @classmethod
+    def write(cls, path, registry, lsn):
+        path = Path(path)
+        accounts = list(registry)
+        balances = array('q', (account.balance_kop for account in accounts))
+        archived = bytes(account._in_archive() for account in accounts)
+        info = '\n'.join(json.dumps(_account_info(account), ensure_ascii=False) for account in accounts).encode()
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, lsn, len(accounts), cls.HEADER.size + 9 * len(accounts)))
+            f.write(balances.tobytes())
+            f.write(archived)
+            f.write(info)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, ledger=default_ledger):
+        """
+        :return: хранилище восстановленных счетов и lsn, на котором сделан снимок
+        """
+        registry = AccountRegistry()
+        path = Path(path)
+        if not path.exists():
+            return registry, 0
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, lsn, count, info_offset = cls.HEADER.unpack_from(mm)
+            if magic != cls.MAGIC:
+                raise ValueError(f'{path} не является снимком IBank.')
+            archived_offset = cls.HEADER.size + 8 * count
+            infos = mm[info_offset:].decode().splitlines()
+            with memoryview(mm) as view, view[cls.HEADER.size:archived_offset].cast('q') as balances:
+                for info, balance, in_archive in zip(infos, balances, mm[archived_offset:info_offset]):
+                    account = _make_account(json.loads(info), balance, ledger)
+                    account._set_archive(bool(in_archive))
+                    registry.add(account)
+        return registry, lsn
+
+
+class Storage:
+    """
+    Хранилище состояния банка в каталоге path.
+    Подключается к журналу операций (ledger.wal) и получает от счетов все события.
+    """
+    SNAPSHOT = 'snapshot.bin'
+    WAL = 'wal.log'
+
+    def __init__(self, path, ledger=default_ledger, snapshot_every=100000, group_size=256, group_interval=0.05):
+        self.path = Path(path)
+        self.ledger = ledger
+        self.snapshot_every = snapshot_every
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.registry = None
+        self._wal = None
+        self._since_snapshot = 0
+
+    def open(self):
+        """
+        Восстанавливает счета из последнего снимка и хвоста WAL и начинает запись новых событий
+        :return: AccountRegistry с восстановленными счетами
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        wal_path = self.path / self.WAL
+        self.ledger.wal = None
+        self.registry, lsn = Snapshot.load(self.path / self.SNAPSHOT, self.ledger)
+        records, valid_size = WriteAheadLog.read(wal_path)
+        # Операции из WAL уже прошли проверку лимитов, а при проигрывании они идут подряд без пауз
+        self.ledger.limits_enabled = False
+        try:
+            for record in records:
+                if record[0] > lsn:
+                    self._replay(*record)
+                    lsn = record[0]
+                    self._since_snapshot += 1
+        finally:
+            self.ledger.limits_enabled = True
+            self.ledger.replay_timestamp = None
+        if wal_path.exists():
+            os.truncate(wal_path, valid_size)
+        self._wal = WriteAheadLog(wal_path, lsn, self.group_size, self.group_interval)
+        self.ledger.wal = self
+        return self.registry
+
+    def _replay(self, lsn, event, passport8, target, amount, timestamp, info):
+        # Операция получает в журнале исходное время, а не время восстановления
+        self.ledger.replay_timestamp = timestamp
+        if event == Operation.CREATE:
+            self.registry.add(_make_account(info, amount, self.ledger))
+            return
+        account = self.registry.get_by_passport(passport8)
+        if event == Operation.DEPOSIT:
+            account.deposit_kop(amount)
+        elif event == Operation.WITHDRAW:
+            account.withdraw_kop(amount)
+        elif event == Operation.TRANSFER:
+            account.transfer_kop(self.registry.get_by_passport(target), amount)
+        elif event in (Operation.INTEREST, Operation.PENALTY):
+            account.charge_kop(event, amount)
+        elif event == Operation.ARCHIVE:
+            account.to_archive()
+        elif event == Operation.RESTORE:
+            account.restore()
+        elif event == Operation.CHANGE_PHONE:
+            self.registry.change_phone(account, info[3])
+        elif event == Operation.CLOSE:
+            self.registry.remove(account)
+
+    def append(self, event, account, amount=0, target=None, timestamp=0):
+        if event == Operation.CREATE:
+            # При открытии счета в сумме сохраняется начальный баланс
+            amount = account.balance_kop
+        self._wal.append(event, account, amount, target, timestamp)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every and not self.ledger.thread_safe:
+            # В многопоточном режиме снимок делается только явным вызовом snapshot()
+            self.snapshot()
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Массовая загрузка счетов без записи каждого события в WAL.
+        По окончании пишется снимок, в который попадают все загруженные счета.
+        """
+        self.ledger.wal = None
+        try:
+            yield self.registry
+        finally:
+            self.ledger.wal = self
+            self.snapshot()
+
+    def snapshot(self):
+        """
+        Записывает снимок текущих балансов и обрезает WAL.
+        В многопоточном режиме на время записи блокируются все счета (в порядке id, как в Account.transfer),
+        чтобы в снимок не попала операция, еще не записанная в WAL.
+        """
+        with ExitStack() as stack:
+            if self.ledger.thread_safe:
+                stack.enter_context(self.registry._lock)
+                for account in sorted(self.registry, key=lambda account: account.id):
+                    stack.enter_context(account._lock)
+            self._wal.sync()
+            Snapshot.write(self.path / self.SNAPSHOT, self.registry, self._wal.lsn)
+            self._wal.truncate()
+            self._since_snapshot = 0
+
+    def close(self):
+        self.snapshot()
+        self._wal.close()
+        self.ledger.wal = None
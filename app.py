@@ -1,19 +1,41 @@
+import hashlib
+import io
+import json
+import os
 import random
+import threading
+from collections import OrderedDict
+from functools import wraps
 from pathlib import Path
 from flask import Flask, abort, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 
 BASE_DIR = Path(__file__).parent
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{BASE_DIR / 'test.db'}"
+# DATABASE_URL позволяет запустить приложение на другой базе (например, в бенчмарках)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'test.db'}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+# Наибольший размер страницы для параметра limit
+MAX_PAGE_SIZE = 1000
+# Наибольшее число цитат в /quotes/random?count=
+MAX_RANDOM_QUOTES = 100
+# Объем кэша ответов GET в байтах
+app.config.setdefault('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024)
+# Строк в одной пачке массового импорта (параметр batch_size) и наибольшее допустимое значение
+app.config.setdefault('BULK_BATCH_SIZE', 1000)
+MAX_BULK_BATCH_SIZE = 10000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+
 class AuthorModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(32))
@@ -46,16 +68,315 @@ class QuoteModel(db.Model):
         d["author"] = self.author.to_dict()
         return d
 
+def int_arg(name, minimum, maximum=None):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        abort(400, f"{name} must be between {minimum} and {maximum}" if maximum else f"{name} must be >= {minimum}")
+    return value
+
+
+def keyset_page(query, model):
+    """
+    Страница по курсору: WHERE id > after_id ORDER BY id LIMIT limit. В отличие от OFFSET, база не перебирает
+    пропущенные строки, поэтому дальние страницы стоят столько же, сколько первая.
+    Без параметров limit и after_id возвращает весь список, как раньше.
+    :return: список объектов или {"items": [...], "next_cursor": id последнего объекта или None на последней странице}
+    """
+    limit = int_arg('limit', 1, MAX_PAGE_SIZE)
+    after_id = int_arg('after_id', 0)
+    if limit is None and after_id is None:
+        return [item.to_dict() for item in query.all()]
+    limit = limit or MAX_PAGE_SIZE
+    # Лишняя строка показывает, есть ли следующая страница
+    items = query.filter(model.id > (after_id or 0)).order_by(model.id).limit(limit + 1).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return {"items": [item.to_dict() for item in items[:limit]], "next_cursor": next_cursor}
+
+
+class RandomQuotes:
+    """
+    Случайные цитаты без ORDER BY RANDOM(), который перебирает всю таблицу.
+    Хранит границы id и число цитат, выбирает случайные id в этих границах и загружает их одним запросом
+    WHERE id IN (...) по первичному ключу. id удаленных цитат (дыры) не находятся - поэтому id берется с запасом
+    пропорционально доле дыр, но не больше MAX_PROBE_IDS. Недостающие цитаты добираются по одной запросом
+    WHERE id >= ? ORDER BY id LIMIT 1 от случайного id - он находит цитату при любой доле дыр.
+    Границы и число обновляются событиями вставки и удаления QuoteModel и перечитываются из базы,
+    если цитат оказалось меньше, чем в кэше.
+    """
+    # Наибольшее число id в запросе IN (...)
+    MAX_PROBE_IDS = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bounds = None  # (наименьший id, наибольший id, число цитат)
+
+    def refresh(self):
+        low, high, count = db.session.query(func.min(QuoteModel.id), func.max(QuoteModel.id),
+                                            func.count(QuoteModel.id)).one()
+        with self._lock:
+            self._bounds = (low, high, count) if count else None
+
+    def inserted(self, quote_id):
+        with self._lock:
+            if self._bounds is not None:
+                low, high, count = self._bounds
+                self._bounds = (min(low, quote_id), max(high, quote_id), count + 1)
+
+    def deleted(self, quote_id):
+        with self._lock:
+            if self._bounds is not None:
+                low, high, count = self._bounds
+                # Границы не сужаются: удаленный крайний id - такая же дыра, как остальные
+                self._bounds = (low, high, count - 1) if count > 1 else None
+
+    def bounds(self):
+        if self._bounds is None:
+            self.refresh()
+        return self._bounds
+
+    def sample(self, n):
+        """
+        :return: до n разных случайных цитат (меньше, только если в базе меньше n цитат)
+        """
+        bounds = self.bounds()
+        if bounds is None:
+            return []
+        low, high, count = bounds
+        need = min(n, count)
+        span = high - low + 1
+        probes = min(span, self.MAX_PROBE_IDS, -(-2 * need * span // count))
+        query = QuoteModel.query.options(joinedload(QuoteModel.author))
+        quotes = query.filter(QuoteModel.id.in_(random.sample(range(low, high + 1), probes))).all()
+        random.shuffle(quotes)
+        found = {quote.id: quote for quote in quotes[:need]}
+        while len(found) < need:
+            rest = query.filter(QuoteModel.id.notin_(list(found))).order_by(QuoteModel.id)
+            # Ближайшая справа от случайного id, а правее нее цитат нет - первая по порядку
+            quote = rest.filter(QuoteModel.id >= random.randint(low, high)).first() or rest.first()
+            if quote is None:
+                # Цитат меньше, чем в кэше - кэш устарел
+                self.refresh()
+                break
+            found[quote.id] = quote
+        return list(found.values())
+
+
+random_quotes = RandomQuotes()
+
+
+@event.listens_for(QuoteModel, 'after_insert')
+def quote_inserted(mapper, connection, quote):
+    random_quotes.inserted(quote.id)
+
+
+@event.listens_for(QuoteModel, 'after_delete')
+def quote_deleted(mapper, connection, quote):
+    random_quotes.deleted(quote.id)
+
+
+class ResponseCache:
+    """
+    Кэш JSON-ответов GET-эндпоинтов с ETag. Ключ - эндпоинт и параметры запроса.
+    Каждый ответ помечен тегами данных, из которых он собран ('quotes', 'author:1', 'author_quotes:1'),
+    обработчики записи после commit вызывают invalidate() с тегами измененных данных.
+    Объем ограничен max_bytes, при переполнении вытесняются давно не запрошенные ответы (LRU).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ключ -> (тело, etag, теги)
+        self._keys_by_tag = {}  # тег -> множество ключей
+        self._size = 0
+        # Номер изменения: ответ, собранный до invalidate(), не попадает в кэш после него
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evicted = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, self._generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, self._generation
+
+    def put(self, key, body, tags, generation):
+        """
+        :return: etag ответа
+        """
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._lock:
+            if generation != self._generation or key in self._entries or len(body) > self.max_bytes:
+                return etag
+            self._entries[key] = (body, etag, tags)
+            self._size += len(body)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+        return etag
+
+    def _remove(self, key):
+        body, etag, tags = self._entries.pop(key)
+        self._size -= len(body)
+        for tag in tags:
+            keys = self._keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "not_modified": self.not_modified,
+                    "evicted": self.evicted}
+
+
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_BYTES'])
+
+
+def cached(*tags):
+    """
+    Кэширует ответы 200 эндпоинта и отвечает 304 на If-None-Match с текущим ETag.
+    :param tags: теги данных ответа; в теге можно указать параметр пути, например 'author:{author_id}'
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            entry, generation = response_cache.get(key)
+            if entry is None:
+                response = app.make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = response_cache.put(key, body, {tag.format(**kwargs) for tag in tags}, generation)
+            else:
+                body, etag, _ = entry
+                response = app.response_class(body, mimetype='application/json')
+            response.set_etag(etag)
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                response_cache.record_not_modified()
+            return response
+        return wrapper
+    return decorator
+
+
+def bulk_rows():
+    """
+    Строки тела массового импорта: JSON-массив или NDJSON (Content-Type: application/x-ndjson).
+    NDJSON читается из потока построчно, без загрузки всего тела в память.
+    :return: итератор (номер строки с 0, объект строки, текст ошибки разбора или None)
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        number = 0
+        # request.stream читает строку по байту; буфер читает тело большими кусками
+        for line in io.BufferedReader(request.stream, 64 * 1024):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError:
+                yield number, None, "Invalid JSON"
+            number += 1
+        return
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        abort(400, "Body must be a JSON array or NDJSON")
+    for number, row in enumerate(rows):
+        yield number, row, None
+
+
+def bulk_import(table, prepare):
+    """
+    Массовая вставка строк в table пачками по batch_size: один INSERT с executemany и один commit на пачку.
+    :param prepare: функция (пачка [(номер, строка)], список ошибок) -> [(номер, значения для вставки)];
+        строки с ошибками prepare пропускает и дописывает в список ошибок
+    :return: {"inserted": число вставленных строк, "errors": [{"row": номер, "error": текст}]}
+    """
+    batch_size = int_arg('batch_size', 1, MAX_BULK_BATCH_SIZE) or app.config['BULK_BATCH_SIZE']
+    inserted = 0
+    errors = []
+    batch = []
+
+    def flush():
+        prepared = prepare(batch, errors)
+        if not prepared:
+            return 0
+        try:
+            db.session.execute(table.insert(), [values for _, values in prepared])
+            db.session.commit()
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            # orig - исходная ошибка драйвера базы, есть только у DBAPIError
+            message = f"Batch failed: {getattr(error, 'orig', None) or error}"
+            errors.extend({"row": number, "error": message} for number, _ in prepared)
+            return 0
+        return len(prepared)
+
+    for number, row, error in bulk_rows():
+        if error is not None:
+            errors.append({"row": number, "error": error})
+            continue
+        batch.append((number, row))
+        if len(batch) == batch_size:
+            inserted += flush()
+            batch = []
+    if batch:
+        inserted += flush()
+    errors.sort(key=lambda error: error["row"])
+    return {"inserted": inserted, "errors": errors}
+
+
+def string_field(row, name, max_length):
+    """
+    :return: текст ошибки или None, если row[name] - непустая строка не длиннее max_length
+    """
+    if not isinstance(row, dict) or not isinstance(row.get(name), str) or not row[name]:
+        return f"{name} must be a non-empty string"
+    if len(row[name]) > max_length:
+        return f"{name} must be at most {max_length} characters"
+    return None
+
+
 # AUTHORS API
 @app.route('/authors')
 def get_authors():
-    authors = AuthorModel.query.all()
-    if authors is None:
-        abort(404, f"There is no any quote")
-    return jsonify([author.to_dict() for author in authors])
+    return jsonify(keyset_page(AuthorModel.query, AuthorModel))
 
 
 @app.route('/authors/<int:author_id>')
+@cached('author:{author_id}')
 def get_author_by_id(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
@@ -68,12 +389,14 @@ def delete_author_by_id(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
         abort(404, "Author not found")
-    quotes = QuoteModel.query.filter(QuoteModel.author.has(name=author.name)).all()
+    deleted = author.to_dict()
+    quotes = QuoteModel.query.filter_by(author_id=author.id).all()
     for quote in quotes:
         db.session.delete(quote)
     db.session.delete(author)
     db.session.commit()
-    return jsonify(author.to_dict()), 200
+    response_cache.invalidate(f'author:{author_id}', f'author_quotes:{author_id}', 'quotes')
+    return jsonify(deleted), 200
 
 
 @app.route('/authors', methods=['POST'])
@@ -84,6 +407,26 @@ def add_new_author():
     db.session.commit()
     return jsonify(author.to_dict()), 201
 
+@app.route('/authors/bulk', methods=['POST'])
+def add_authors_bulk():
+    """
+    Тело - строки {"name": ...}
+    """
+    max_length = AuthorModel.name.type.length
+
+    def prepare(batch, errors):
+        values = []
+        for number, row in batch:
+            error = string_field(row, "name", max_length)
+            if error is None:
+                values.append((number, {"name": row["name"]}))
+            else:
+                errors.append({"row": number, "error": error})
+        return values
+
+    return jsonify(bulk_import(AuthorModel.__table__, prepare)), 200
+
+
 @app.route('/authors/<int:id>', methods=['PUT'])
 def change_author(id):
     return {}
@@ -101,20 +444,21 @@ def show_quote(author_id, quote_id):
 
 
 @app.route("/author/<int:author_id>/quotes")
+@cached('author:{author_id}', 'author_quotes:{author_id}')
 def get_all_quotes_of_author(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
         abort(404, "Author not found")
-    quotes = QuoteModel.query.filter(QuoteModel.author.has(name=author.name)).all()
+    # Автор цитат уже загружен выше - quote.author берется из сессии без запросов
+    quotes = QuoteModel.query.filter_by(author_id=author.id).all()
     return jsonify([quote.to_dict() for quote in quotes])
 
 @app.route("/quotes/")
 @app.route("/quotes")
+@cached('quotes')
 def show_all_quotes():
-    quotes = QuoteModel.query.all()
-    if quotes is None:
-        abort(404, f"There is no any quote")
-    return jsonify([quote.to_dict() for quote in quotes])
+    # to_dict() обращается к quote.author: без joinedload это был бы отдельный SELECT на каждую цитату
+    return jsonify(keyset_page(QuoteModel.query.options(joinedload(QuoteModel.author)), QuoteModel))
 
 
 @app.route("/author/<int:author_id>/quotes/<int:quote_id>", methods=['DELETE'])
@@ -124,12 +468,13 @@ def delete(author_id, quote_id):
         abort(404, "Quote not found")
     if quote.author_id != author_id:
         abort(404, f"Цитата с id={quote_id} принадлежит не автору с id={author_id}")
+    # Ответ собирается до удаления: после commit удаленная цитата отвязана от сессии
+    # и не может загрузить автора (DetachedInstanceError)
+    deleted = quote.to_dict()
     db.session.delete(quote)
     db.session.commit()
-    # FIXME: Цитату находит и удаляет, но крашится при возврате цитаты из-за DetachedInstanceError:
-    #  Parent instance <QuoteModel at 0x7f24b4336d90> is not bound to a Session; lazy load operation
-    #  of attribute 'author' cannot proceed
-    return jsonify(quote.to_dict()), 200
+    response_cache.invalidate(f'author_quotes:{author_id}', 'quotes')
+    return jsonify(deleted), 200
 
 
 @app.route("/author/<int:author_id>/quotes/<int:quote_id>", methods=['PUT'])
@@ -145,9 +490,11 @@ def edit_quote(author_id, quote_id):
         new_text = new_data.get("text")
     if quote is None or author is None:
         abort(404, "No such author or quote")
+    old_author_id = quote.author_id
     quote.author = author
     quote.text = new_text or quote.text
     db.session.commit()
+    response_cache.invalidate(f'author_quotes:{old_author_id}', f'author_quotes:{author.id}', 'quotes')
     return jsonify(quote.to_dict()), 200
 
 
@@ -163,14 +510,69 @@ def create_quote(author_id):
         abort(400, "There must be author and text for quote")
     db.session.add(q)
     db.session.commit()
+    response_cache.invalidate(f'author_quotes:{author_id}', 'quotes')
     return jsonify(q.to_dict()), 201
 
 
+@app.route("/quotes/bulk", methods=['POST'])
+def create_quotes_bulk():
+    """
+    Тело - строки {"author": имя автора, "text": ...}. Авторы ищутся по имени одним запросом на пачку,
+    найденные имена запоминаются для следующих пачек. Автор должен существовать, и имя не должно повторяться.
+    """
+    max_length = QuoteModel.text.type.length
+    name_length = AuthorModel.name.type.length
+    author_ids = {}  # имя -> список id авторов с этим именем
+    touched = set()
+
+    def prepare(batch, errors):
+        values = []
+        valid = []
+        for number, row in batch:
+            error = string_field(row, "author", name_length) or string_field(row, "text", max_length)
+            if error is None:
+                valid.append((number, row))
+            else:
+                errors.append({"row": number, "error": error})
+        new_names = {row["author"] for _, row in valid} - author_ids.keys()
+        if new_names:
+            for name in new_names:
+                author_ids[name] = []
+            for author_id, name in db.session.query(AuthorModel.id, AuthorModel.name).filter(
+                    AuthorModel.name.in_(new_names)):
+                author_ids[name].append(author_id)
+        for number, row in valid:
+            ids = author_ids[row["author"]]
+            if len(ids) != 1:
+                error = "not found" if not ids else "is ambiguous: several authors have this name"
+                errors.append({"row": number, "error": f"Author {row['author']!r} {error}"})
+                continue
+            values.append((number, {"author_id": ids[0], "text": row["text"]}))
+            touched.add(ids[0])
+        return values
+
+    report = bulk_import(QuoteModel.__table__, prepare)
+    if report["inserted"]:
+        # Вставка мимо ORM: события QuoteModel не срабатывают
+        random_quotes.refresh()
+        response_cache.invalidate('quotes', *(f'author_quotes:{author_id}' for author_id in touched))
+    return jsonify(report), 200
+
+
 @app.route("/quotes/random")
 def show_random_quote():
-    # TODO: Перейти на ORM
-    quote = random.choice(quotes)
-    return jsonify(quote)
+    count = int_arg('count', 1, MAX_RANDOM_QUOTES)
+    quotes = random_quotes.sample(count or 1)
+    if not quotes:
+        abort(404, "There is no any quote")
+    if count is None:
+        return jsonify(quotes[0].to_dict())
+    return jsonify([quote.to_dict() for quote in quotes])
+
+
+@app.route("/cache/stats")
+def show_cache_stats():
+    return jsonify(response_cache.stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,6 @@
+"""
+Бенчмарки IBank.
+Запускаются из корня репозитория как модули, например:
+    python -m benchmarks.registry
+Общий нагрузочный прогон с отчетом JSON - benchmarks.suite (генератор нагрузки - benchmarks.workload).
+"""
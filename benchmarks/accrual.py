@@ -0,0 +1,56 @@
+"""
+Закрытие дня по кредитным счетам: цикл по счетам с charge_kop() против IBank_accrual.accrue()
+с разным числом процессов. Проверки сумм, совпадения балансов и сводки по банку - в tests/test_accrual.py.
+    python -m benchmarks.accrual --accounts 1000000 --workers 0 1 2 4
+"""
+import argparse
+import random
+import time
+
+from IBank import CreditAccount, Ledger, Operation
+from IBank_accrual import accrue, daily_charges
+from benchmarks.registry import phone_number
+
+
+def make_bank(count, seed=1):
+    rnd = random.Random(seed)
+    ledger = Ledger()
+    for i in range(count):
+        account = CreditAccount(f"Client{i}", 10000000 + i, phone_number(i), negative_limit=1000, ledger=ledger)
+        # Большая часть счетов в минусе, часть - у самого кредитного лимита
+        account._set_balance_kop(rnd.randint(-100000, 20000))
+    return ledger
+
+
+def loop_accrue(ledger):
+    for account in ledger.accounts:
+        interest, penalty = daily_charges(account.balance_kop, account.negative_limit_kop,
+                                          account.INTEREST_BP, account._fee_table[1])
+        if interest:
+            account.charge_kop(Operation.INTEREST, interest)
+        if penalty:
+            account.charge_kop(Operation.PENALTY, penalty)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10 ** 6)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--shards', type=int, default=None)
+    args = parser.parse_args()
+
+    ledger = make_bank(args.accounts)
+    start = time.perf_counter()
+    loop_accrue(ledger)
+    print(f"цикл по счетам: {time.perf_counter() - start:.2f} сек.")
+
+    for workers in args.workers:
+        ledger = make_bank(args.accounts)
+        report = accrue(ledger.accounts, workers, args.shards, ledger)
+        slowest = max(elapsed for _, _, elapsed in report['shards'])
+        print(f"процессов: {workers:>2}  шардов: {len(report['shards']):>3}  "
+              f"всего: {report['elapsed']:.2f} сек.  самый долгий шард: {slowest:.3f} сек.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Пакет переводов: apply_transfers() против transfer_kop() по одному.
+Проверки совпадения кодов и балансов - в tests/test_batch.py.
+    python -m benchmarks.batch --accounts 1000 --transfers 100000
+"""
+import argparse
+import random
+import time
+
+from IBank import Ledger
+from IBank_batch import ACCEPTED, INSUFFICIENT_FUNDS, apply_transfers
+from benchmarks.registry import make_accounts
+
+
+def make_batch(accounts, count, seed=1):
+    rnd = random.Random(seed)
+    return [(rnd.randrange(accounts), rnd.randrange(accounts), rnd.randint(1, 5000)) for _ in range(count)]
+
+
+def transfer_one_by_one(batch, accounts):
+    """
+    :return: коды результатов, как у apply_transfers()
+    """
+    codes = []
+    for s, t, amount in batch:
+        try:
+            accounts[s].transfer_kop(accounts[t], amount)
+            codes.append(ACCEPTED)
+        except ValueError:
+            codes.append(INSUFFICIENT_FUNDS)
+    return codes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--transfers', type=int, default=100000)
+    args = parser.parse_args()
+    batch = make_batch(args.accounts, args.transfers)
+
+    accounts = make_accounts(args.accounts, Ledger())
+    start = time.perf_counter()
+    transfer_one_by_one(batch, accounts)
+    print(f"по одному: {time.perf_counter() - start:.3f} сек.")
+
+    ledger = Ledger()
+    make_accounts(args.accounts, ledger)
+    start = time.perf_counter()
+    apply_transfers(batch, ledger)
+    print(f"пакетом:   {time.perf_counter() - start:.3f} сек.")
+
+
+if __name__ == "__main__":
+    main()
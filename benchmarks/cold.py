@@ -0,0 +1,51 @@
+"""
+Память процесса до и после переноса архивных счетов в ColdStore.
+    python -m benchmarks.cold --accounts 10000 --history 100 --archived 0.9
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from IBank import Ledger
+from IBank_cold import ColdStore
+from benchmarks.registry import make_accounts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--history', type=int, default=100, help='операций на счет')
+    parser.add_argument('--archived', type=float, default=0.9, help='доля счетов, уходящих в архив')
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    ledger = Ledger()
+    ledger.cold = ColdStore()
+    accounts = make_accounts(args.accounts, ledger)
+    for _ in range(args.history):
+        for account in accounts:
+            account.deposit_kop(100)
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    archived = accounts[:int(len(accounts) * args.archived)]
+    for account in archived:
+        account.withdraw_kop(account.balance_kop * 100 // 102)
+        account.to_archive()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    print(f"счетов: {args.accounts}, операций на счет: {args.history}")
+    print(f"память до архивации: {before / 2 ** 20:.1f} МБ, после: {after / 2 ** 20:.1f} МБ")
+    print(f"архивация {len(archived)} счетов: {elapsed:.2f} сек.")
+
+    start = time.perf_counter()
+    for account in archived[:1000]:
+        account.restore()
+    print(f"восстановление {min(len(archived), 1000)} счетов: {time.perf_counter() - start:.2f} сек.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Переводы из нескольких потоков на счетах с блокировками (Ledger(thread_safe=True)).
+Выводит пропускную способность в зависимости от числа потоков. Проверка сохранения денег - в tests/test_concurrency.py.
+    python -m benchmarks.concurrency --threads 1 2 4 8
+"""
+import argparse
+import random
+import threading
+import time
+
+from IBank import Ledger
+from benchmarks.registry import make_accounts
+
+
+def worker(accounts, count, seed, barrier):
+    rnd = random.Random(seed)
+    barrier.wait()
+    for _ in range(count):
+        source, target = rnd.choice(accounts), rnd.choice(accounts)
+        try:
+            source.transfer(target, rnd.randint(1, 50))
+        except ValueError:
+            pass
+
+
+def run(threads, accounts_count, transfers):
+    ledger = Ledger(thread_safe=True)
+    accounts = make_accounts(accounts_count, ledger)
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(accounts, transfers // threads, seed, barrier))
+            for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return transfers / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--transfers', type=int, default=200000)
+    args = parser.parse_args()
+    for threads in args.threads:
+        rate = run(threads, args.accounts, args.transfers)
+        print(f"потоков: {threads:>3}  переводов/сек: {rate:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Потоковая выгрузка выписки: скорость и пиковая память при росте истории.
+Проверка, что пиковая память не растет с длиной истории, - в tests/test_export.py.
+    python -m benchmarks.export --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import IBank_export
+from benchmarks.history import make_account
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument('--chunk-rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    print(f"{'операций':>10} {'формат':>10} {'строк/сек':>12} {'пик памяти, КБ':>15}")
+    for suffix in ('.csv', '.jsonl', '.csv.gz'):
+        for size in args.sizes:
+            account = make_account(size, 1000, datetime(2020, 1, 1))
+            statement = os.path.join(path, 'statement' + suffix)
+
+            start = time.perf_counter()
+            IBank_export.write(IBank_export.iter_rows(account), statement, chunk_rows=args.chunk_rows)
+            elapsed = time.perf_counter() - start
+
+            # Память меряется отдельным проходом: tracemalloc сильно замедляет выгрузку
+            tracemalloc.start()
+            IBank_export.write(IBank_export.iter_rows(account), statement, chunk_rows=args.chunk_rows)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{size:>10} {suffix:>10} {size / elapsed:>12,.0f} {peak / 1024:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
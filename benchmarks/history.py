@@ -0,0 +1,58 @@
+"""
+Выписка за один день по счету с длинной историей: Account.history_between() против фильтрации всей истории.
+История заполняется напрямую в столбцы журнала (по ops_per_day операций в день), поэтому длина истории
+растет, а объем одного дня - нет.
+    python -m benchmarks.history --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from IBank import Account, Ledger, Operation, to_timestamp
+
+
+def make_account(size, ops_per_day, start):
+    ledger = Ledger()
+    account = Account("Client", 10000000, "+7900-000-00-00", ledger=ledger)
+    step = 24 * 3600 * 10 ** 9 // ops_per_day
+    first = to_timestamp(start)
+    ledger.types.extend(array('b', [Ledger.TYPE_CODES[Operation.DEPOSIT], Ledger.TYPE_CODES[Operation.WITHDRAW]])
+                        * (size // 2 + 1))
+    del ledger.types[size:]
+    ledger.amounts.extend(array('q', [10000]) * size)
+    ledger.fees.extend(array('q', [0]) * size)
+    ledger.targets.extend(array('q', [Ledger.NO_TARGET]) * size)
+    ledger.timestamps.extend(range(first, first + size * step, step))
+    account._history_rows.extend(range(size))
+    return account
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument('--ops-per-day', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    start = datetime(2020, 1, 1)
+    print(f"{'операций':>10} {'за день':>8} {'history_between, мс':>20} {'перебор, мс':>12}")
+    for size in args.sizes:
+        account = make_account(size, args.ops_per_day, start)
+        day = start + timedelta(days=size // args.ops_per_day // 2)
+        next_day = day + timedelta(days=1)
+
+        begin = time.perf_counter()
+        for _ in range(args.repeat):
+            found = list(account.history_between(day, next_day, types=[Operation.DEPOSIT]))
+        indexed = (time.perf_counter() - begin) / args.repeat
+
+        begin = time.perf_counter()
+        scanned = [op for op in account.history if day <= op.date < next_day and op.type == Operation.DEPOSIT]
+        full_scan = time.perf_counter() - begin
+        assert len(found) == len(scanned)
+        print(f"{size:>10} {len(found):>8} {indexed * 1000:>20.3f} {full_scan * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
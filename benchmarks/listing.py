@@ -0,0 +1,64 @@
+"""
+Страница счетов по балансу: сортировка всех счетов на каждый запрос против BalanceIndex,
+который между запросами получает только изменившиеся счета. Проверки страниц - в tests/test_listing.py.
+    python -m benchmarks.listing --accounts 1000000 --operations 1000
+"""
+import argparse
+import random
+import time
+
+from IBank import AccountRegistry, Ledger
+from IBank_listing import BalanceIndex
+from benchmarks.registry import make_accounts
+
+
+def sorted_page(registry, number, size):
+    ordered = sorted(registry, key=lambda account: (account.balance_kop, account.id), reverse=True)
+    return ordered[number * size:(number + 1) * size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10 ** 6)
+    parser.add_argument('--operations', type=int, default=1000, help='операций между запросами страницы')
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+
+    ledger = Ledger()
+    accounts = make_accounts(args.accounts, ledger)
+    registry = AccountRegistry(accounts)
+    start = time.perf_counter()
+    index = BalanceIndex(registry, ledger)
+    print(f"счетов: {args.accounts}, построение индекса: {time.perf_counter() - start:.2f} сек.")
+
+    sort_time = index_time = 0
+    for _ in range(args.requests):
+        for _ in range(args.operations):
+            account = rnd.choice(accounts)
+            try:
+                if rnd.random() < 0.5:
+                    account.deposit_kop(rnd.randint(1, 100000))
+                else:
+                    account.transfer_kop(rnd.choice(accounts), rnd.randint(1, 5000))
+            except ValueError:
+                pass
+        # Закрытие и открытие счетов тоже должно попадать в индекс
+        closed = rnd.choice(accounts)
+        if closed in registry:
+            registry.remove(closed)
+        number = rnd.randrange(3)
+
+        start = time.perf_counter()
+        sorted_page(registry, number, args.page_size)
+        sort_time += time.perf_counter() - start
+        start = time.perf_counter()
+        index.page(number, args.page_size)
+        index_time += time.perf_counter() - start
+    print(f"страница: сортировка {sort_time / args.requests * 1000:.1f} мс, "
+          f"индекс {index_time / args.requests * 1000:.2f} мс (после {args.operations} операций)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Накладные расходы IBank_metrics: смешанные операции без замера, с включенным и снова выключенным замером.
+Проверки счетчиков - в tests/test_metrics.py.
+    python -m benchmarks.metrics --operations 1000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import IBank_metrics
+from benchmarks.money import make_bank, make_workload
+
+
+def run(workload):
+    rejected = 0
+    start = time.perf_counter()
+    for kind, account, target, amount in workload:
+        try:
+            if kind == 'deposit':
+                account.deposit_kop(amount)
+            elif kind == 'withdraw':
+                account.withdraw_kop(amount)
+            else:
+                account.transfer_kop(target, amount)
+        except ValueError:
+            rejected += 1
+    return time.perf_counter() - start, rejected
+
+
+def measure(operations, accounts):
+    workload = make_workload(make_bank(accounts), operations)
+    return run(workload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operations', type=int, default=10 ** 6)
+    parser.add_argument('--accounts', type=int, default=1000)
+    args = parser.parse_args()
+
+    baseline, _ = measure(args.operations, args.accounts)
+    print(f"без замера:          {baseline:.2f} сек.")
+
+    IBank_metrics.enable()
+    enabled, _ = measure(args.operations, args.accounts)
+    IBank_metrics.disable()
+    print(f"замер включен:       {enabled:.2f} сек. ({(enabled / baseline - 1) * 100:+.1f}%)")
+
+    disabled, _ = measure(args.operations, args.accounts)
+    print(f"замер выключен:      {disabled:.2f} сек. ({(disabled / baseline - 1) * 100:+.1f}%)")
+
+    with tempfile.TemporaryDirectory() as path:
+        dump = Path(path) / 'ibank.prom'
+        IBank_metrics.metrics.write_prometheus(dump)
+        print(dump.read_text(encoding='utf-8'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Миллион смешанных операций (пополнение, снятие, перевод) на Account и CreditAccount.
+    python -m benchmarks.money --operations 1000000
+"""
+import argparse
+import random
+import time
+
+from IBank import Account, CreditAccount, Ledger
+from benchmarks.registry import phone_number
+
+
+def make_bank(count):
+    ledger = Ledger()
+    accounts = []
+    for i in range(count):
+        account_class = CreditAccount if i % 2 else Account
+        accounts.append(account_class(f"Client{i}", 10000000 + i, phone_number(i), 10000, ledger=ledger))
+    return accounts
+
+
+def make_workload(accounts, count, seed=1):
+    rnd = random.Random(seed)
+    kinds = rnd.choices(('deposit', 'withdraw', 'transfer'), weights=(4, 3, 3), k=count)
+    return [(kind, rnd.choice(accounts), rnd.choice(accounts), rnd.randint(1, 500)) for kind in kinds]
+
+
+def run(workload):
+    """
+    Операции через рублевый интерфейс: deposit/withdraw/transfer
+    """
+    rejected = 0
+    start = time.perf_counter()
+    for kind, account, target, amount in workload:
+        try:
+            if kind == 'deposit':
+                account.deposit(amount)
+            elif kind == 'withdraw':
+                account.withdraw(amount)
+            else:
+                account.transfer(target, amount)
+        except ValueError:
+            rejected += 1
+    return time.perf_counter() - start, rejected
+
+
+def run_kopecks(workload):
+    """
+    Те же операции в копейках: deposit_kop/withdraw_kop/transfer_kop
+    """
+    rejected = 0
+    start = time.perf_counter()
+    for kind, account, target, amount in workload:
+        amount *= 100
+        try:
+            if kind == 'deposit':
+                account.deposit_kop(amount)
+            elif kind == 'withdraw':
+                account.withdraw_kop(amount)
+            else:
+                account.transfer_kop(target, amount)
+        except ValueError:
+            rejected += 1
+    return time.perf_counter() - start, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--operations', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    for title, runner in (("рубли", run), ("копейки", run_kopecks)):
+        accounts = make_bank(args.accounts)
+        elapsed, rejected = runner(make_workload(accounts, args.operations))
+        print(f"{title}: операций: {args.operations}, отказов: {rejected}, "
+              f"{elapsed:.2f} сек., {args.operations / elapsed:,.0f} операций/сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Массовый импорт app.py: POST /quotes/bulk (NDJSON) против POST /author/<id>/quotes на каждую цитату.
+Проверки отчета об ошибках строк, сброса кэша ответов и границ RandomQuotes - в tests/test_quotes.py.
+    python -m benchmarks.quotes_bulk --quotes 500000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=500000)
+    parser.add_argument('--authors', type=int, default=1000)
+    parser.add_argument('--single', type=int, default=1000, help='цитат, вставляемых по одной')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    authors = [{'name': f'Author{i}'} for i in range(args.authors)]
+    client.post('/authors/bulk', json=authors)
+
+    start = time.perf_counter()
+    for i in range(args.single):
+        client.post(f'/author/{i % args.authors + 1}/quotes', json={'text': f'Single{i}'})
+    single = (time.perf_counter() - start) / args.single
+    print(f"по одной: {single * 10 ** 6:.0f} мкс на цитату, "
+          f"{args.quotes} цитат - примерно {single * args.quotes:.0f} сек.")
+
+    lines = [json.dumps({'author': f'Author{i % args.authors}', 'text': f'Quote{i}'}) for i in range(args.quotes)]
+    body = '\n'.join(lines) + '\n'
+    start = time.perf_counter()
+    report = client.post(f'/quotes/bulk?batch_size={args.batch_size}', data=body,
+                         content_type='application/x-ndjson').get_json()
+    elapsed = time.perf_counter() - start
+    print(f"NDJSON, пачки по {args.batch_size}: {args.quotes} цитат за {elapsed:.1f} сек., "
+          f"{elapsed / args.quotes * 10 ** 6:.1f} мкс на цитату")
+    print(f"вставлено: {report['inserted']}, ошибок строк: {len(report['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
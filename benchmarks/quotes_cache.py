@@ -0,0 +1,48 @@
+"""
+Кэш ответов app.py: время GET /quotes без кэша, из кэша и с 304 по ETag.
+Проверки ETag, сброса кэша при записи и вытеснения - в tests/test_quotes.py.
+    python -m benchmarks.quotes_cache --quotes 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.quotes_queries import fill
+
+
+def timed_get(client, url, repeat, headers=None):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url, headers=headers)
+    return (time.perf_counter() - start) / repeat, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import AuthorModel, QuoteModel, app, db, response_cache
+
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        fill(db, AuthorModel, QuoteModel, max(args.quotes // 100, 1), args.quotes)
+
+    uncached = 0
+    for _ in range(args.repeat):
+        response_cache.clear()
+        uncached += timed_get(client, '/quotes', 1)[0]
+    uncached /= args.repeat
+    hit, response = timed_get(client, '/quotes', args.repeat)
+    not_modified, _ = timed_get(client, '/quotes', args.repeat, {'If-None-Match': response.headers['ETag']})
+    print(f"GET /quotes ({args.quotes} цитат): без кэша {uncached * 1000:.1f} мс, из кэша {hit * 1000:.2f} мс, "
+          f"304 {not_modified * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
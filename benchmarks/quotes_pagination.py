@@ -0,0 +1,66 @@
+"""
+Страница цитат на разной глубине: OFFSET против курсора (WHERE id > ? ORDER BY id LIMIT ?, как в /quotes?after_id=).
+Выводит время обхода /quotes по курсорам до конца таблицы. Проверки страниц - в tests/test_quotes.py.
+    python -m benchmarks.quotes_pagination --quotes 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.quotes_queries import fill
+
+
+def best_of(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=10 ** 6)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from sqlalchemy.orm import joinedload
+    from app import AuthorModel, QuoteModel, app, db
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        fill(db, AuthorModel, QuoteModel, max(args.quotes // 100, 1), args.quotes)
+        print(f"цитат: {args.quotes}, заполнение: {time.perf_counter() - start:.1f} сек.")
+
+        query = QuoteModel.query.options(joinedload(QuoteModel.author)).order_by(QuoteModel.id)
+        for depth in (0, args.quotes // 10, args.quotes // 2, args.quotes - args.page_size):
+            # Цитаты вставлены подряд с id от 1, поэтому на глубине depth курсор равен depth
+            offset_time, _ = best_of(
+                lambda: [q.to_dict() for q in query.offset(depth).limit(args.page_size)], args.repeat)
+            keyset_time, _ = best_of(
+                lambda: [q.to_dict() for q in query.filter(QuoteModel.id > depth).limit(args.page_size)], args.repeat)
+            print(f"глубина {depth:>8}: OFFSET {offset_time * 1000:8.2f} мс, курсор {keyset_time * 1000:6.2f} мс")
+
+    client = app.test_client()
+    after_id, pages = None, 0
+    start = time.perf_counter()
+    while True:
+        url = f'/quotes?limit={args.page_size}' + (f'&after_id={after_id}' if after_id is not None else '')
+        page = client.get(url).get_json()
+        pages += 1
+        after_id = page['next_cursor']
+        if after_id is None:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"обход /quotes по курсорам: {pages} страниц, {elapsed / pages * 1000:.2f} мс на страницу")
+
+
+if __name__ == "__main__":
+    main()
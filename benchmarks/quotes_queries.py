@@ -0,0 +1,70 @@
+"""
+Число SQL-запросов и время списочных эндпоинтов app.py в зависимости от числа цитат.
+Приложение запускается на временной базе sqlite. Проверка отсутствия N+1 - в tests/test_quotes.py.
+    python -m benchmarks.quotes_queries --sizes 10,1000,10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def count_queries(engine):
+    """
+    Подключает счетчик выполненных SQL-запросов
+    :return: список, в который дописывается каждый запрос
+    """
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def fill(db, AuthorModel, QuoteModel, authors, quotes):
+    """
+    Заполняет базу: quotes цитат, распределенных по authors авторам
+    """
+    db.session.execute(AuthorModel.__table__.delete())
+    db.session.execute(QuoteModel.__table__.delete())
+    db.session.execute(AuthorModel.__table__.insert(), [{'id': i + 1, 'name': f'Author{i}'} for i in range(authors)])
+    db.session.execute(QuoteModel.__table__.insert(),
+                       [{'author_id': i % authors + 1, 'text': f'Quote{i}'} for i in range(quotes)])
+    db.session.commit()
+    # Запись мимо обработчиков API - кэш ответов о ней не знает
+    from app import response_cache
+    response_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,1000,10000', help='числа цитат через запятую')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import AuthorModel, QuoteModel, app, db
+
+    with app.app_context():
+        db.create_all()
+        statements = count_queries(db.engine)
+    client = app.test_client()
+    urls = ('/quotes', '/authors', '/author/1/quotes')
+    for size in sizes:
+        with app.app_context():
+            fill(db, AuthorModel, QuoteModel, max(size // 10, 1), size)
+        for url in urls:
+            statements.clear()
+            start = time.perf_counter()
+            client.get(url)
+            elapsed = time.perf_counter() - start
+            print(f"цитат: {size:>7}  {url:<18} запросов: {len(statements)}  {elapsed * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Случайные цитаты: ORDER BY RANDOM() против RandomQuotes из app.py (границы id в кэше и выборка по первичному ключу).
+Время выборки на сплошной таблице и на таблице с дырами в id. Проверки выборки - в tests/test_quotes.py.
+    python -m benchmarks.quotes_random --quotes 1000000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.quotes_pagination import best_of
+from benchmarks.quotes_queries import count_queries, fill
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=10 ** 6)
+    parser.add_argument('--count', type=int, default=10, help='цитат в одном запросе')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from sqlalchemy import func
+    from app import AuthorModel, QuoteModel, app, db, random_quotes
+
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        fill(db, AuthorModel, QuoteModel, max(args.quotes // 100, 1), args.quotes)
+        random_quotes.refresh()
+        statements = count_queries(db.engine)
+
+        order_time, _ = best_of(lambda: QuoteModel.query.order_by(func.random()).limit(args.count).all(), args.repeat)
+        sample_time, _ = best_of(lambda: random_quotes.sample(args.count), args.repeat)
+        print(f"цитат: {args.quotes}, выборка {args.count}: ORDER BY RANDOM() {order_time * 1000:.1f} мс, "
+              f"RandomQuotes {sample_time * 1000:.2f} мс")
+
+        statements.clear()
+        client.get(f'/quotes/random?count={args.count}')
+        print(f"/quotes/random?count={args.count}: запросов к базе {len(statements)}")
+
+        # Дыры: остается каждая десятая цитата. Удаление мимо ORM - кэш не знает о нем и должен восстановиться сам
+        db.session.execute(QuoteModel.__table__.delete().where(QuoteModel.id % 10 != 0))
+        db.session.commit()
+        left = args.quotes // 10
+        sample_time, _ = best_of(lambda: random_quotes.sample(args.count), args.repeat)
+        print(f"осталось цитат: {left}, выборка {args.count}: {sample_time * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Сравнение поиска счета по паспорту/телефону:
+перебор списка accounts против индексов AccountRegistry.
+"""
+import random
+import time
+
+from IBank import Account, AccountRegistry
+
+
+def phone_number(i):
+    """
+    :return: телефон i-го тестового клиента в формате счета, например +7000-000-00-05
+    """
+    digits = f"{i:010d}"
+    return f"+7{digits[:3]}-{digits[3:6]}-{digits[6:8]}-{digits[8:]}"
+
+
+def make_accounts(count, ledger=None):
+    accounts = []
+    for i in range(count):
+        accounts.append(Account(f"Client{i}", 10000000 + i, phone_number(i), 100, ledger=ledger))
+    return accounts
+
+
+def list_search_by_passport(accounts, passport):
+    for account in accounts:
+        if account.passport8 == passport:
+            return account
+    return None
+
+
+def list_search_by_phone(accounts, phone):
+    for account in accounts:
+        if account.phone_number == phone:
+            return account
+    return None
+
+
+def measure(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def run(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), lookups=100):
+    print(f"{'счетов':>10} {'список, мкс':>14} {'реестр, мкс':>14}")
+    for size in sizes:
+        accounts = make_accounts(size)
+        registry = AccountRegistry(accounts)
+        sample = random.sample(accounts, lookups)
+        passports = [acc.passport8 for acc in sample]
+        phones = [acc.phone_number for acc in sample]
+
+        list_time = (measure(lambda p: list_search_by_passport(accounts, p), passports) +
+                     measure(lambda p: list_search_by_phone(accounts, p), phones)) / 2
+        registry_time = (measure(registry.get_by_passport, passports) +
+                         measure(registry.get_by_phone, phones)) / 2
+        print(f"{size:>10} {list_time * 10 ** 6:>14.2f} {registry_time * 10 ** 6:>14.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,43 @@
+"""
+Стоимость операции с request_id (IBank.RequestCache) по сравнению с операцией без него.
+Проверки повторов, TTL и политик lru/fifo - в tests/test_requests.py.
+    python -m benchmarks.requests --operations 1000000 --maxsize 100000
+"""
+import argparse
+import random
+import time
+
+from IBank import Ledger, RequestCache
+from benchmarks.registry import make_accounts
+
+
+def measure(accounts, operations, with_request_id, rnd):
+    pairs = [(rnd.choice(accounts), rnd.choice(accounts)) for _ in range(operations)]
+    start = time.perf_counter()
+    if with_request_id:
+        for request_id, (source, target) in enumerate(pairs):
+            source.transfer_kop(target, 1, request_id=request_id)
+    else:
+        for source, target in pairs:
+            source.transfer_kop(target, 1)
+    return (time.perf_counter() - start) / operations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operations', type=int, default=10 ** 6)
+    parser.add_argument('--maxsize', type=int, default=10 ** 5)
+    parser.add_argument('--accounts', type=int, default=1000)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+
+    ledger = Ledger()
+    ledger.requests = RequestCache(maxsize=args.maxsize)
+    accounts = make_accounts(args.accounts, ledger)
+    plain = measure(accounts, args.operations // 10, False, rnd)
+    deduplicated = measure(accounts, args.operations // 10, True, rnd)
+    print(f"перевод: {plain * 10 ** 6:.2f} мкс, с request_id: {deduplicated * 10 ** 6:.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Время перезапуска банка: полное проигрывание WAL против снимка + хвоста WAL.
+    python -m benchmarks.restart --accounts 1000000 --operations 10000000
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from IBank import Ledger
+from IBank_storage import Storage
+from benchmarks.registry import make_accounts
+
+
+def run_operations(accounts, count):
+    for _ in range(count):
+        account = random.choice(accounts)
+        kind = random.random()
+        try:
+            if kind < 0.4:
+                account.deposit(random.randint(1, 1000))
+            elif kind < 0.7:
+                account.withdraw(random.randint(1, 100))
+            else:
+                account.transfer(random.choice(accounts), random.randint(1, 100))
+        except ValueError:
+            pass
+
+
+def restart(path):
+    start = time.perf_counter()
+    storage = Storage(path, Ledger(), snapshot_every=float('inf'))
+    registry = storage.open()
+    elapsed = time.perf_counter() - start
+    return storage, registry, elapsed
+
+
+def crash(storage):
+    """
+    Останавливает хранилище без финального снимка, как при аварийном завершении
+    """
+    storage._wal.close()
+    storage.ledger.wal = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10 ** 6)
+    parser.add_argument('--operations', type=int, default=10 ** 7)
+    parser.add_argument('--tail', type=float, default=0.01, help='доля операций после последнего снимка')
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    try:
+        storage, registry, _ = restart(path)
+        accounts = make_accounts(args.accounts, storage.ledger)
+        for account in accounts:
+            registry.add(account)
+        run_operations(accounts, args.operations)
+        crash(storage)
+
+        storage, registry, elapsed = restart(path)
+        print(f"Только WAL ({args.operations} операций): {elapsed:.2f} сек.")
+        storage.snapshot()
+        run_operations(list(registry), int(args.operations * args.tail))
+        crash(storage)
+
+        storage, registry, elapsed = restart(path)
+        print(f"Снимок + хвост WAL ({int(args.operations * args.tail)} операций): {elapsed:.2f} сек.")
+        crash(storage)
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
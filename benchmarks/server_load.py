@@ -0,0 +1,91 @@
+"""
+Нагрузочный клиент для IBank_server: много соединений, запросы отправляются конвейером.
+По умолчанию поднимает сервер в этом же процессе на свободном порту.
+    python -m benchmarks.server_load --connections 100 --requests 1000 --pipeline 32
+    python -m benchmarks.server_load --host 127.0.0.1 --port 8888
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from IBank_server import BankServer
+from benchmarks.registry import phone_number
+
+
+def make_requests(accounts, count, rnd):
+    requests = []
+    for i in range(count):
+        passport = 10000000 + rnd.randrange(accounts)
+        kind = rnd.random()
+        if kind < 0.4:
+            request = {'op': 'deposit', 'passport': passport, 'amount': rnd.randint(1, 1000)}
+        elif kind < 0.6:
+            request = {'op': 'withdraw', 'passport': passport, 'amount': rnd.randint(1, 100)}
+        else:
+            phone = phone_number(rnd.randrange(accounts))
+            request = {'op': 'transfer', 'passport': passport, 'phone': phone, 'amount': rnd.randint(1, 100)}
+        request['id'] = i
+        requests.append(json.dumps(request).encode() + b'\n')
+    return requests
+
+
+async def client(host, port, requests, pipeline):
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    for start in range(0, len(requests), pipeline):
+        chunk = requests[start:start + pipeline]
+        writer.writelines(chunk)
+        await writer.drain()
+        for _ in chunk:
+            errors += not json.loads(await reader.readline())['ok']
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def create_accounts(host, port, count):
+    requests = []
+    for i in range(count):
+        requests.append(json.dumps({'id': i, 'op': 'create', 'name': f"Client{i}", 'passport': 10000000 + i,
+                                    'phone': phone_number(i), 'amount': 1000, 'credit': i % 2 == 1}).encode() + b'\n')
+    await client(host, port, requests, 256)
+
+
+async def run(args):
+    tcp_server = None
+    host, port = args.host, args.port
+    if port is None:
+        tcp_server = await BankServer().start(host, 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+    try:
+        await create_accounts(host, port, args.accounts)
+        rnd = random.Random(1)
+        workload = [make_requests(args.accounts, args.requests, rnd) for _ in range(args.connections)]
+        start = time.perf_counter()
+        errors = await asyncio.gather(*(client(host, port, requests, args.pipeline) for requests in workload))
+        elapsed = time.perf_counter() - start
+    finally:
+        if tcp_server is not None:
+            tcp_server.close()
+            await tcp_server.wait_closed()
+    total = args.connections * args.requests
+    print(f"соединений: {args.connections}, конвейер: {args.pipeline}, запросов: {total}")
+    print(f"{total / elapsed:,.0f} запросов/сек, отказов: {sum(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='порт запущенного сервера; без него сервер поднимается локально')
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000, help='запросов на соединение')
+    parser.add_argument('--pipeline', type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Пропускная способность переводов в шардированном режиме (IBank_shards) в зависимости от числа шардов,
+в сравнении с переводами в одном процессе. Проверка сохранения денег - в tests/test_shards.py.
+    python -m benchmarks.shards --shards 1 2 4 8 --transfers 1000000 --batch 10000
+"""
+import argparse
+import random
+import time
+
+from IBank import Ledger
+from IBank_shards import ShardedBank
+from benchmarks.registry import make_accounts, phone_number
+
+START_BALANCE = 10000  # коп.
+
+
+def make_transfers(accounts, count, seed=1):
+    rnd = random.Random(seed)
+    passports = [10000000 + i for i in range(accounts)]
+    return [('transfer', rnd.choice(passports), rnd.choice(passports), rnd.randint(1, 500)) for _ in range(count)]
+
+
+def run_single(accounts, transfers):
+    by_passport = {account.passport8: account for account in make_accounts(accounts, Ledger())}
+    start = time.perf_counter()
+    for _, passport8, target_passport8, amount in transfers:
+        try:
+            by_passport[passport8].transfer_kop(by_passport[target_passport8], amount)
+        except ValueError:
+            pass
+    return len(transfers) / (time.perf_counter() - start)
+
+
+def open_accounts(bank, accounts, batch):
+    for start in range(0, accounts, batch):
+        bank.execute([('create', ['Account', f"Client{i}", 10000000 + i, phone_number(i), None], START_BALANCE)
+                      for i in range(start, min(start + batch, accounts))])
+
+
+def run_sharded(shards, accounts, transfers, batch):
+    with ShardedBank(shards) as bank:
+        open_accounts(bank, accounts, batch)
+        start = time.perf_counter()
+        for offset in range(0, len(transfers), batch):
+            bank.execute(transfers[offset:offset + batch])
+        return len(transfers) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--accounts', type=int, default=100000)
+    parser.add_argument('--transfers', type=int, default=10 ** 6)
+    parser.add_argument('--batch', type=int, default=10000)
+    args = parser.parse_args()
+
+    transfers = make_transfers(args.accounts, args.transfers)
+    print(f"один процесс:  переводов/сек: {run_single(args.accounts, transfers):>12,.0f}")
+    for shards in args.shards:
+        rate = run_sharded(shards, args.accounts, transfers, args.batch)
+        print(f"шардов: {shards:>3}    переводов/сек: {rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Сводка по банку: время bank_stats() в сравнении с пересчетом с нуля после случайных операций
+(в т.ч. пакетных переводов, архивации в ColdStore и закрытия счетов). Проверки сводки - в tests/test_stats.py.
+    python -m benchmarks.stats --accounts 10000 --operations 200000
+"""
+import argparse
+import random
+import time
+
+from IBank import AccountRegistry, CreditAccount, Ledger, bank_stats, recompute_stats
+from IBank_batch import apply_transfers
+from IBank_cold import ColdStore
+from benchmarks.registry import make_accounts, phone_number
+
+
+def random_operations(accounts, count, rnd):
+    for _ in range(count):
+        account = rnd.choice(accounts)
+        action = rnd.random()
+        try:
+            if action < 0.3:
+                account.deposit_kop(rnd.randint(1, 10000))
+            elif action < 0.55:
+                account.withdraw_kop(rnd.randint(1, 20000))
+            elif action < 0.98:
+                account.transfer_kop(rnd.choice(accounts), rnd.randint(1, 20000))
+            elif account._archive:
+                account.restore()
+            else:
+                account.to_archive()
+        except ValueError:
+            pass
+
+
+def make_bank(count, ledger):
+    """
+    :return: count обычных счетов и по кредитному счету на каждые 10 обычных
+    """
+    accounts = make_accounts(count, ledger)
+    for i in range(0, count, 10):
+        accounts.append(CreditAccount(f"Credit{i}", 20000000 + i, phone_number(9990000000 + i), negative_limit=500,
+                                      ledger=ledger))
+    return accounts
+
+
+def random_batch(accounts, count, rnd):
+    return [(rnd.randrange(len(accounts)), rnd.randrange(len(accounts)), rnd.randint(1, 20000)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--operations', type=int, default=200000)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+
+    ledger = Ledger()
+    ledger.cold = ColdStore()
+    accounts = make_bank(args.accounts, ledger)
+    registry = AccountRegistry(accounts)
+    random_operations(accounts, args.operations, rnd)
+    apply_transfers(random_batch(accounts, args.operations, rnd), ledger)
+    for account in accounts[::100]:
+        registry.remove(account)
+
+    start = time.perf_counter()
+    stats = bank_stats(ledger)
+    stats_time = time.perf_counter() - start
+    start = time.perf_counter()
+    recompute_stats(ledger)
+    recompute_time = time.perf_counter() - start
+    print(f"счетов: {len(accounts)}, строк журнала: {len(ledger)}")
+    print(stats)
+    print(f"bank_stats(): {stats_time * 10 ** 6:.1f} мкс, пересчет с нуля: {recompute_time * 10 ** 3:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
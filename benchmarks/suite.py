@@ -0,0 +1,154 @@
+"""
+Нагрузочный прогон IBank: операции из benchmarks.workload через API счетов и реестра.
+Отчет в JSON: пропускная способность, задержки p50/p95/p99 по типам операций и пиковая память.
+Отчеты разных версий сравниваются через --baseline.
+    python -m benchmarks.suite --accounts 100000 --operations 200000 --skew 1.1 --report report.json
+    python -m benchmarks.suite --baseline report.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from array import array
+
+from benchmarks.workload import DEFAULT_MIX, OPERATIONS, generate, make_bank, parse_mix
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, percent):
+    """
+    Процентиль по ближайшему рангу
+    """
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[rank - 1]
+
+
+def run(registry, workload):
+    """
+    Выполняет операции и замеряет время каждой
+    :return: словарь операция -> (время операций в нс, число отклоненных операций), общее время в секундах
+    """
+    accounts = list(registry)
+    durations = {kind: array('q') for kind in OPERATIONS}
+    rejected = dict.fromkeys(OPERATIONS, 0)
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    for kind, source, target, amount in workload:
+        account = accounts[source]
+        began = clock()
+        try:
+            if kind == 'deposit':
+                account.deposit(amount)
+            elif kind == 'withdraw':
+                account.withdraw(amount)
+            elif kind == 'transfer':
+                account.transfer(accounts[target], amount)
+            elif kind == 'history':
+                account.get_history()
+            else:
+                registry.get_by_passport(accounts[target].passport8)
+        except ValueError:
+            rejected[kind] += 1
+        durations[kind].append(clock() - began)
+    elapsed = time.perf_counter() - start
+    return {kind: (durations[kind], rejected[kind]) for kind in OPERATIONS}, elapsed
+
+
+def peak_memory(args, mix):
+    """
+    Пиковая память прогона (счета + операции). Меряется отдельным проходом: tracemalloc сильно замедляет операции
+    """
+    tracemalloc.start()
+    registry = make_bank(args.accounts, args.credit_share)
+    run(registry, generate(args.accounts, args.operations, mix, args.skew, seed=args.seed))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def make_report(args, mix):
+    registry = make_bank(args.accounts, args.credit_share)
+    workload = generate(args.accounts, args.operations, mix, args.skew, seed=args.seed)
+    results, elapsed = run(registry, workload)
+    operations = {}
+    for kind, (durations, rejected) in results.items():
+        if not durations:
+            continue
+        ordered = sorted(durations)
+        stats = {'count': len(ordered), 'rejected': rejected}
+        for percent in PERCENTILES:
+            stats[f'p{percent}_us'] = percentile(ordered, percent) / 1000
+        stats['max_us'] = ordered[-1] / 1000
+        operations[kind] = stats
+    report = {
+        'label': args.label,
+        'python': platform.python_version(),
+        'config': {'accounts': args.accounts, 'operations': args.operations, 'mix': mix, 'skew': args.skew,
+                   'credit_share': args.credit_share, 'seed': args.seed},
+        'elapsed_sec': elapsed,
+        'throughput_ops': args.operations / elapsed,
+        'operations': operations,
+        'peak_memory_kb': None,
+    }
+    if not args.no_memory:
+        report['peak_memory_kb'] = peak_memory(args, mix) // 1024
+    return report
+
+
+def compare(report, baseline):
+    """
+    Печатает изменения относительно отчета baseline (в процентах, минус - быстрее/меньше)
+    """
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+    print(f"сравнение с {baseline.get('label') or 'baseline'}:")
+    print(f"  пропускная способность: {change(report['throughput_ops'], baseline['throughput_ops'])}")
+    for kind, stats in report['operations'].items():
+        old = baseline['operations'].get(kind)
+        if old is None:
+            continue
+        changes = '  '.join(f"p{percent} {change(stats[f'p{percent}_us'], old[f'p{percent}_us'])}"
+                            for percent in PERCENTILES)
+        print(f"  {kind:>10}: {changes}")
+    if report['peak_memory_kb'] and baseline.get('peak_memory_kb'):
+        print(f"  пиковая память: {change(report['peak_memory_kb'], baseline['peak_memory_kb'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=100000)
+    parser.add_argument('--operations', type=int, default=200000)
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help=f"веса операций, например deposit=30,transfer=70 (из {', '.join(OPERATIONS)})")
+    parser.add_argument('--skew', type=float, default=1.1, help='показатель Ципфа, 0 - без горячих счетов')
+    parser.add_argument('--credit-share', type=float, default=0.5, help='доля кредитных счетов')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help='метка версии в отчете')
+    parser.add_argument('--no-memory', action='store_true', help='не замерять пиковую память')
+    parser.add_argument('--report', help='файл для отчета JSON (по умолчанию - stdout)')
+    parser.add_argument('--baseline', help='отчет JSON предыдущей версии для сравнения')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    report = make_report(args, args.mix or DEFAULT_MIX)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if baseline is not None:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
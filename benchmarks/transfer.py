@@ -0,0 +1,25 @@
+"""
+Микробенчмарк одного перевода Account.transfer_kop() между двумя счетами.
+    python -m benchmarks.transfer
+"""
+import argparse
+import timeit
+
+from IBank import Account, CreditAccount, Ledger
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ledger = Ledger()
+    source = CreditAccount("Ivan", 12345678, "+7900-800-11-22", 10 ** 9, ledger=ledger)
+    target = Account("Petr", 12345679, "+7900-800-11-33", ledger=ledger)
+    times = timeit.repeat(lambda: source.transfer_kop(target, 100), number=args.number, repeat=args.repeat)
+    print(f"transfer_kop: {min(times) / args.number * 10 ** 9:.0f} нс на перевод (лучший из {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
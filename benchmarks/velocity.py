@@ -0,0 +1,40 @@
+"""
+Лимиты операций за период (IBank.VelocityLimit): стоимость снятия без лимитов, с лимитами
+и при длинной истории счета. Проверки окон на искусственных часах - в tests/test_velocity.py.
+    python -m benchmarks.velocity --operations 1000000
+"""
+import argparse
+import time
+
+from IBank import Account, Ledger, Operation, VelocityLimit
+from benchmarks.registry import make_accounts
+
+
+def measure(operations, limits):
+    Account.VELOCITY_LIMITS = limits
+    try:
+        account, = make_accounts(1, Ledger())
+        account.deposit_kop(10 ** 12)
+        start = time.perf_counter()
+        for _ in range(operations):
+            account.withdraw_kop(1)
+        return (time.perf_counter() - start) / operations
+    finally:
+        Account.VELOCITY_LIMITS = ()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--operations', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    plain = measure(args.operations, ())
+    limits = (VelocityLimit([Operation.WITHDRAW], 3600, max_count=10 ** 9),
+              VelocityLimit([Operation.WITHDRAW, Operation.TRANSFER], 86400, max_amount=10 ** 15))
+    limited = measure(args.operations, limits)
+    print(f"снятие без лимитов: {plain * 10 ** 6:.2f} мкс, с двумя лимитами: {limited * 10 ** 6:.2f} мкс "
+          f"(история счета - {args.operations} операций)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Генератор синтетической нагрузки для benchmarks.suite.
+Счета выбираются по закону Ципфа: небольшое число "горячих" счетов получает большую часть операций.
+"""
+import random
+from itertools import accumulate
+
+from IBank import Account, AccountRegistry, CreditAccount, Ledger
+from benchmarks.registry import phone_number
+
+OPERATIONS = ('deposit', 'withdraw', 'transfer', 'history', 'lookup')
+DEFAULT_MIX = {'deposit': 30, 'withdraw': 20, 'transfer': 40, 'history': 0.1, 'lookup': 9.9}
+
+
+def make_bank(count, credit_share=0.5, start_balance=10000, ledger=None):
+    """
+    :param credit_share: доля кредитных счетов
+    :return: реестр счетов
+    """
+    ledger = Ledger() if ledger is None else ledger
+    registry = AccountRegistry()
+    for i in range(count):
+        # Кредитный счет - каждый раз, когда i * credit_share переходит через целое: всего int(count * credit_share)
+        account_class = CreditAccount if int((i + 1) * credit_share) > int(i * credit_share) else Account
+        registry.add(account_class(f"Client{i}", 10000000 + i, phone_number(i), start_balance, ledger=ledger))
+    return registry
+
+
+def parse_mix(text):
+    """
+    Разбирает смесь операций вида "deposit=30,transfer=70"
+    :return: словарь операция -> вес
+    """
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f'Неизвестная операция: {name}. Допустимые: {", ".join(OPERATIONS)}')
+        mix[name] = float(weight)
+    return mix
+
+
+def zipf_weights(count, skew):
+    """
+    Накопленные веса рангов 1..count по закону Ципфа; skew=0 - равномерное распределение
+    """
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def generate(accounts_count, operations, mix=None, skew=1.1, max_amount=500, seed=1):
+    """
+    Заранее генерирует операции, чтобы в замер не попадало время генерации
+    :param accounts_count: число счетов банка
+    :param operations: число операций
+    :param mix: веса операций, по умолчанию DEFAULT_MIX
+    :param skew: показатель распределения Ципфа
+    :param max_amount: максимальная сумма операции в рублях
+    :return: список (операция, номер счета, номер счета-контрагента, сумма)
+    """
+    rnd = random.Random(seed)
+    mix = DEFAULT_MIX if mix is None else mix
+    kinds = rnd.choices(list(mix), weights=list(mix.values()), k=operations)
+    # Горячие счета разбросаны по реестру, а не собраны в его начале
+    by_rank = list(range(accounts_count))
+    rnd.shuffle(by_rank)
+    cum_weights = zipf_weights(accounts_count, skew)
+    sources = rnd.choices(by_rank, cum_weights=cum_weights, k=operations)
+    targets = rnd.choices(by_rank, cum_weights=cum_weights, k=operations)
+    amounts = [rnd.randint(1, max_amount) for _ in range(operations)]
+    return list(zip(kinds, sources, targets, amounts))
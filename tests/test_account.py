@@ -0,0 +1,23 @@
+"""
+Операции счета в копейках (IBank.Account)
+"""
+import pytest
+
+from IBank import Ledger, Operation, bank_stats
+from benchmarks.registry import make_accounts
+
+
+@pytest.mark.parametrize('amount', [-50000, 0])
+@pytest.mark.parametrize('operation', [
+    lambda account, target, amount: account.withdraw_kop(amount),
+    lambda account, target, amount: account.deposit_kop(amount),
+    lambda account, target, amount: account.transfer_kop(target, amount),
+    lambda account, target, amount: account.charge_kop(Operation.PENALTY, amount),
+], ids=['withdraw', 'deposit', 'transfer', 'charge'])
+def test_non_positive_amount_is_rejected(operation, amount):
+    ledger = Ledger()
+    account, target = make_accounts(2, ledger)
+    with pytest.raises(ValueError):
+        operation(account, target, amount)
+    assert (account.balance_kop, target.balance_kop, len(ledger)) == (10000, 10000, 0)
+    assert bank_stats(ledger)['fees'] == 0
@@ -0,0 +1,53 @@
+"""
+Начисление процентов и штрафов по кредитным счетам (IBank_accrual)
+"""
+import pytest
+
+from IBank import AccountRegistry, Ledger, check_stats
+from IBank_accrual import accrue, daily_charges
+from benchmarks.accrual import loop_accrue
+from benchmarks.accrual import make_bank as make_debtors
+from benchmarks.workload import make_bank
+
+
+@pytest.mark.parametrize('shards', [0, -1])
+def test_shards_must_be_positive(shards):
+    ledger = Ledger()
+    registry = make_bank(10, ledger=ledger)
+    with pytest.raises(ValueError):
+        accrue(registry, workers=0, shards=shards, ledger=ledger)
+
+
+@pytest.mark.parametrize('balance, expected', [
+    (0, (0, 0)),
+    (20000, (0, 0)),
+    (-10000, (10, 0)),  # в пределах лимита - только проценты: 100 руб. * 36.5% / 365
+    (-100000, (100, 1002)),  # сверх лимита 501 руб.: штраф 2%
+])
+def test_daily_charges(balance, expected):
+    assert daily_charges(balance, 50000, 3650, 200) == expected
+
+
+def make_ledger():
+    ledger = make_debtors(300)
+    # Часть счетов за кредитным лимитом - по ним начисляется и штраф
+    for account in ledger.accounts[::10]:
+        account._set_balance_kop(-150000)
+    return ledger
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_accrue_matches_loop_over_accounts(workers):
+    ledger = make_ledger()
+    charges = [daily_charges(account.balance_kop, account.negative_limit_kop, account.INTEREST_BP,
+                             account._fee_table[1]) for account in ledger.accounts]
+    loop_accrue(ledger)
+    expected = [account.balance_kop for account in ledger.accounts]
+
+    ledger = make_ledger()
+    registry = AccountRegistry(ledger.accounts)
+    report = accrue(registry, workers=workers, shards=4, ledger=ledger)
+    assert [account.balance_kop for account in ledger.accounts] == expected
+    assert (report['interest'], report['penalties']) == tuple(map(sum, zip(*charges)))
+    assert report['penalties'] > 0
+    assert check_stats(ledger, registry) == []
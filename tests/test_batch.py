@@ -0,0 +1,91 @@
+"""
+Пакетные переводы (IBank_batch)
+"""
+import pytest
+
+from IBank import Account, Ledger, Operation, VelocityLimit
+from IBank_storage import Storage
+from benchmarks.batch import make_batch, transfer_one_by_one
+from benchmarks.registry import make_accounts
+from tests.test_storage import crash
+
+pytest.importorskip('numpy')
+from IBank_batch import ACCEPTED, ARCHIVED, INSUFFICIENT_FUNDS, VELOCITY_LIMIT, apply_transfers  # noqa: E402
+
+ERROR_CODES = {
+    'Недостаточно средств на счете.': INSUFFICIENT_FUNDS,
+    'Аккаунт в архиве. Все действия приостановлены.': ARCHIVED,
+    'Превышен лимит операций за период.': VELOCITY_LIMIT,
+}
+
+
+def test_batch_transfers_survive_restart(tmp_path):
+    storage = Storage(tmp_path, Ledger())
+    registry = storage.open()
+    a, b, c = make_accounts(3, storage.ledger)
+    for account in (a, b, c):
+        registry.add(account)
+    codes = apply_transfers([(a.id, b.id, 5000), (b.id, c.id, 100000), (b.id, c.id, 1000)], storage.ledger)
+    assert codes.tolist() == [ACCEPTED, INSUFFICIENT_FUNDS, ACCEPTED]
+    a.deposit_kop(700)
+    expected = {account.passport8: (account.balance_kop, [(op.type, op.timestamp) for op in account.history])
+                for account in registry}
+    crash(storage)
+
+    restored = Storage(tmp_path, Ledger())
+    actual = {account.passport8: (account.balance_kop, [(op.type, op.timestamp) for op in account.history])
+              for account in restored.open()}
+    assert actual == expected
+    restored.close()
+
+
+def test_batch_applies_velocity_limits(monkeypatch):
+    monkeypatch.setattr(Account, 'VELOCITY_LIMITS',
+                        (VelocityLimit([Operation.TRANSFER], 3600, max_count=2, clock=lambda: 0),))
+    batch = [(0, 1, 100), (0, 2, 100), (1, 2, 100), (0, 1, 100), (3, 0, 100), (3, 2, 100), (3, 1, 100), (1, 0, 100)]
+
+    def make_ledger():
+        ledger = Ledger()
+        accounts = make_accounts(4, ledger)
+        accounts[2].to_archive()
+        return ledger, accounts
+
+    ledger, accounts = make_ledger()
+    expected = []
+    for s, t, amount in batch:
+        try:
+            accounts[s].transfer_kop(accounts[t], amount)
+            expected.append(ACCEPTED)
+        except ValueError as e:
+            expected.append(ERROR_CODES[str(e)])
+    assert VELOCITY_LIMIT in expected and ARCHIVED in expected
+
+    batch_ledger, batch_accounts = make_ledger()
+    assert apply_transfers(batch, batch_ledger).tolist() == expected
+    assert [acc.balance_kop for acc in batch_accounts] == [acc.balance_kop for acc in accounts]
+    # Окна после пакета те же, что после переводов по одному
+    assert [acc._windows and acc._windows[0].count for acc in batch_accounts] == \
+        [acc._windows and acc._windows[0].count for acc in accounts]
+
+
+def test_batch_matches_transfers_one_by_one():
+    batch = make_batch(200, 5000)
+    accounts = make_accounts(200, Ledger())
+    expected = transfer_one_by_one(batch, accounts)
+    assert INSUFFICIENT_FUNDS in expected
+    ledger = Ledger()
+    batch_accounts = make_accounts(200, ledger)
+    assert apply_transfers(batch, ledger).tolist() == expected
+    assert [acc.balance_kop for acc in batch_accounts] == [acc.balance_kop for acc in accounts]
+    assert [[(op.type, op.amount) for op in acc.history] for acc in batch_accounts] == \
+        [[(op.type, op.amount) for op in acc.history] for acc in accounts]
+
+
+@pytest.mark.parametrize('row', [(0, 1, -5000), (0, 1, 0), (-1, 0, 100), (0, 2, 100)])
+def test_invalid_rows_reject_whole_batch(row):
+    ledger = Ledger()
+    accounts = make_accounts(2, ledger)
+    with pytest.raises(ValueError):
+        apply_transfers([(0, 1, 100), row], ledger)
+    assert [account.balance_kop for account in accounts] == [10000, 10000]
+    assert len(ledger) == 0
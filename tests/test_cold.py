@@ -0,0 +1,51 @@
+"""
+Архивные счета в ColdStore и сжатие журнала (IBank_cold)
+"""
+import types
+
+from IBank import Ledger
+from IBank_cold import ColdStore
+from benchmarks.registry import make_accounts
+
+
+def summary(operations):
+    return [(operation.type, operation.amount, operation.timestamp) for operation in operations]
+
+
+def test_history_views_survive_compaction():
+    ledger = Ledger()
+    ledger.cold = ColdStore()
+    kept, archived = make_accounts(2, ledger)
+    for amount in range(1, 101):
+        archived.deposit_kop(amount)
+    for amount in range(1, 11):
+        kept.deposit_kop(amount)
+    view = kept.history
+    pending = kept.history_between()
+    first = next(pending)
+    expected = summary(kept.history)
+    rows = len(ledger)
+
+    # Строки архивного счета - больше половины журнала: журнал сжимается и строки kept перенумеровываются
+    archived.to_archive()
+    assert len(ledger) < rows
+    assert summary(view) == expected
+    assert summary([first, *pending]) == expected
+    assert summary(kept.history) == expected
+    kept.deposit_kop(11)
+    assert summary(kept.history)[:-1] == expected
+
+
+def test_cold_rows_are_streamed():
+    ledger = Ledger()
+    ledger.cold = ColdStore()
+    account, = make_accounts(1, ledger)
+    for amount in range(1, 2501):
+        account.deposit_kop(amount)
+    expected = summary(account.history)
+    account.to_archive()
+
+    assert isinstance(ledger.cold.rows(account), types.GeneratorType)
+    assert summary(account.history) == expected
+    assert summary([account.history[-1]]) == expected[-1:]
+    assert summary(account.history_between(limit=3, offset=1500)) == expected[1500:1503]
@@ -0,0 +1,67 @@
+"""
+Операции над счетами из нескольких потоков (Ledger(thread_safe=True))
+"""
+import random
+import threading
+
+import pytest
+
+from IBank import AccountRegistry, Ledger, Operation, check_stats
+from benchmarks.registry import make_accounts
+
+
+def transfer_fees(ledger):
+    # Каждый перевод записан в журнал дважды (отправителю и получателю) с одной и той же комиссией
+    return sum(fee for type, fee in zip(ledger.types, ledger.fees) if Ledger.TYPES[type] == Operation.TRANSFER) // 2
+
+
+def random_transfers(accounts, count, seed):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        try:
+            rnd.choice(accounts).transfer_kop(rnd.choice(accounts), rnd.randint(1, 5000))
+        except ValueError:
+            pass
+
+
+def test_transfers_from_threads_conserve_money():
+    ledger = Ledger(thread_safe=True)
+    accounts = make_accounts(20, ledger)
+    registry = AccountRegistry(accounts)
+    total_before = sum(account.balance_kop for account in accounts)
+    pool = [threading.Thread(target=random_transfers, args=(accounts, 5000, seed)) for seed in range(4)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    assert sum(account.balance_kop for account in accounts) == total_before - transfer_fees(ledger)
+    assert all(account.balance_kop >= 0 for account in accounts)
+    assert check_stats(ledger, registry) == []
+
+
+def test_batch_transfers_alongside_single_transfers():
+    pytest.importorskip('numpy')
+    from IBank_batch import apply_transfers
+
+    ledger = Ledger(thread_safe=True)
+    accounts = make_accounts(50, ledger)
+    registry = AccountRegistry(accounts)
+    total_before = sum(account.balance_kop for account in accounts)
+
+    def batches():
+        rnd = random.Random(0)
+        for _ in range(20):
+            apply_transfers([(rnd.randrange(50), rnd.randrange(50), rnd.randint(1, 5000)) for _ in range(1000)],
+                            ledger)
+
+    pool = [threading.Thread(target=batches)]
+    pool += [threading.Thread(target=random_transfers, args=(accounts, 5000, seed)) for seed in range(1, 4)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    assert sum(account.balance_kop for account in accounts) == total_before - transfer_fees(ledger)
+    assert all(account.balance_kop >= 0 for account in accounts)
+    assert check_stats(ledger, registry) == []
@@ -0,0 +1,45 @@
+"""
+Потоковая выгрузка выписки (IBank_export)
+"""
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+import IBank_export
+from IBank_cold import ColdStore
+from benchmarks.history import make_account
+
+SIZES = (2000, 20000)
+
+
+def export_peak(account, path):
+    """
+    :return: пиковая память выгрузки в байтах
+    """
+    tracemalloc.start()
+    try:
+        IBank_export.write(IBank_export.iter_rows(account), path, chunk_rows=1000)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.jsonl', '.csv.gz'])
+def test_export_memory_does_not_grow_with_history(tmp_path, suffix):
+    peaks = [export_peak(make_account(size, 1000, datetime(2020, 1, 1)), tmp_path / ('statement' + suffix))
+             for size in SIZES]
+    assert max(peaks) < 2 * min(peaks), peaks
+
+
+def test_archived_export_memory_does_not_grow_with_history(tmp_path):
+    peaks = []
+    for size in SIZES:
+        account = make_account(size, 1000, datetime(2020, 1, 1))
+        account._ledger.cold = ColdStore()
+        account.to_archive()
+        path = tmp_path / 'statement.csv'
+        peaks.append(export_peak(account, path))
+        with open(path) as f:
+            assert sum(1 for _ in f) == size + 1  # строка заголовка
+    assert max(peaks) < 2 * min(peaks), peaks
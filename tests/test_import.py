@@ -0,0 +1,46 @@
+"""
+Массовое открытие счетов из файла (IBank_import)
+"""
+import csv
+
+import pytest
+
+from IBank import AccountRegistry, Ledger, check_stats
+from IBank_import import import_clients, read_rows
+from benchmarks.registry import make_accounts, phone_number
+
+
+def write_clients(path, clients):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, ['name', 'passport', 'phone', 'balance', 'credit'])
+        writer.writeheader()
+        writer.writerows(clients)
+    return path
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_duplicates_are_rejected_before_opening_accounts(tmp_path, vectorized):
+    if vectorized:
+        pytest.importorskip('numpy')
+    ledger = Ledger()
+    registry = AccountRegistry(make_accounts(2, ledger))
+    clients = [
+        {'name': 'New', 'passport': 20000000, 'phone': phone_number(100), 'balance': '10.50'},
+        {'name': 'Same passport', 'passport': 10000000, 'phone': phone_number(101)},
+        {'name': 'Same phone', 'passport': 20000001, 'phone': phone_number(1)},
+        {'name': 'Twice in file', 'passport': 20000000, 'phone': phone_number(102)},
+        {'name': 'Bad balance', 'passport': 20000002, 'phone': phone_number(103), 'balance': 'abc'},
+        {'name': 'Credit', 'passport': 20000003, 'phone': phone_number(104), 'balance': '-5', 'credit': 'да'},
+    ]
+    rows = read_rows(write_clients(tmp_path / 'clients.csv', clients))
+    imported, rejected = import_clients(rows, registry, batch_size=4, vectorized=vectorized, ledger=ledger)
+    assert imported == 2
+    # Строка 2 - первая строка клиентов после заголовка
+    assert rejected == [(3, 'Счет с таким номером паспорта уже существует.'),
+                        (4, 'Счет с таким номером телефона уже существует.'),
+                        (5, 'Счет с таким номером паспорта уже существует.'),
+                        (6, "Неверная сумма: 'abc'.")]
+    # Отклоненные строки не оставляют счетов в журнале
+    assert len(ledger.accounts) == len(registry) == 4
+    assert registry.get_by_passport(20000000).balance_kop == 1050
+    assert check_stats(ledger, registry) == []
@@ -0,0 +1,56 @@
+"""
+Страницы счетов по балансу (IBank_listing.BalanceIndex)
+"""
+import random
+
+import pytest
+
+from IBank import AccountRegistry, Ledger
+from IBank_listing import BalanceIndex, top_balances
+from benchmarks.listing import sorted_page
+from benchmarks.registry import make_accounts
+
+
+def ids(accounts):
+    return [account.id for account in accounts]
+
+
+@pytest.mark.parametrize('operations', [5, 500])
+def test_pages_follow_operations_and_closing(operations):
+    # 5 операций - точечное обновление индекса, 500 - перестроение
+    rnd = random.Random(1)
+    ledger = Ledger()
+    accounts = make_accounts(300, ledger)
+    registry = AccountRegistry(accounts)
+    index = BalanceIndex(registry, ledger)
+    for _ in range(10):
+        for _ in range(operations):
+            account = rnd.choice(accounts)
+            try:
+                if rnd.random() < 0.5:
+                    account.deposit_kop(rnd.randint(1, 100000))
+                else:
+                    account.transfer_kop(rnd.choice(accounts), rnd.randint(1, 5000))
+            except ValueError:
+                pass
+        closed = rnd.choice(accounts)
+        if closed in registry:
+            registry.remove(closed)
+        for number in range(3):
+            assert ids(index.page(number, 20)) == ids(sorted_page(registry, number, 20))
+        assert len(index) == len(registry)
+    ascending = sorted(registry, key=lambda account: (account.balance_kop, account.id))
+    assert ids(index.page(0, 20, descending=False)) == ids(ascending[:20])
+    assert [a.balance_kop for a in index.page(0, 10)] == [a.balance_kop for a in top_balances(registry, 10)]
+
+
+def test_reopened_account_returns_to_index():
+    ledger = Ledger()
+    registry = AccountRegistry(make_accounts(10, ledger))
+    index = BalanceIndex(registry, ledger)
+    account = list(registry)[3]
+    registry.remove(account)
+    account.deposit_kop(10 ** 7)
+    assert account not in index.page(0, 10)
+    registry.add(account)
+    assert index.page(0, 1) == [account]
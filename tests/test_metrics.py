@@ -0,0 +1,47 @@
+"""
+Счетчики вызовов и отказов IBank_metrics
+"""
+import pytest
+
+import IBank_metrics
+from benchmarks.metrics import run
+from benchmarks.money import make_bank, make_workload
+
+
+@pytest.fixture
+def metrics():
+    IBank_metrics.metrics.reset()
+    IBank_metrics.enable()
+    yield IBank_metrics.metrics
+    IBank_metrics.disable()
+    IBank_metrics.metrics.reset()
+
+
+def test_counters_match_operations(metrics, tmp_path):
+    accounts = make_bank(50)
+    workload = make_workload(accounts, 5000)
+    # Отказы: снятие больше остатка обычного счета и операции с архивным счетом
+    workload += [('withdraw', accounts[0], None, 10 ** 9), ('transfer', accounts[2], accounts[0], 10 ** 9)]
+    accounts[4].to_archive()
+    workload += [('deposit', accounts[4], None, 100)]
+    _, rejected = run(workload)
+    assert rejected >= 3
+    snapshot = metrics.snapshot()
+    for kind in ('deposit', 'withdraw', 'transfer'):
+        assert snapshot['operations'][kind]['calls'] == sum(1 for operation in workload if operation[0] == kind)
+    assert sum(sum(reasons.values()) for reasons in snapshot['rejections'].values()) == rejected
+    assert snapshot['rejections']['deposit'] == \
+        {'archived': sum(1 for kind, account, _, _ in workload if kind == 'deposit' and account is accounts[4])}
+
+    dump = tmp_path / 'ibank.prom'
+    metrics.write_prometheus(dump)
+    calls = snapshot['operations']['transfer']['calls']
+    assert f'ibank_operation_calls_total{{operation="transfer"}} {calls}' in dump.read_text(encoding='utf-8')
+
+
+def test_disable_restores_methods(metrics):
+    account, _ = make_bank(2)
+    IBank_metrics.disable()
+    assert not IBank_metrics.is_enabled()
+    account.deposit_kop(100)
+    assert 'deposit' not in metrics.snapshot()['operations']
@@ -0,0 +1,246 @@
+"""
+API цитат (app.py) на временной базе sqlite
+"""
+import json
+import os
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('flask_sqlalchemy')
+
+
+@pytest.fixture(scope='module')
+def quotes_app(tmp_path_factory):
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('quotes') / 'quotes.db'}"
+    import app
+    with app.app.app_context():
+        app.db.create_all()
+    return app
+
+
+@pytest.fixture
+def client(quotes_app):
+    with quotes_app.app.app_context():
+        yield quotes_app.app.test_client()
+
+
+def clear_tables(quotes_app):
+    """
+    Удаляет всех авторов и цитаты мимо ORM и сбрасывает кэши приложения
+    """
+    db = quotes_app.db
+    db.session.execute(quotes_app.QuoteModel.__table__.delete())
+    db.session.execute(quotes_app.AuthorModel.__table__.delete())
+    db.session.commit()
+    quotes_app.response_cache.clear()
+    quotes_app.random_quotes.refresh()
+
+
+def insert_quotes(quotes_app, ids):
+    """
+    Заменяет цитаты в базе цитатами с заданными id (мимо ORM, как при ручной правке базы)
+    """
+    db, QuoteModel = quotes_app.db, quotes_app.QuoteModel
+    clear_tables(quotes_app)
+    db.session.execute(quotes_app.AuthorModel.__table__.insert(), [{'id': 1, 'name': 'Author'}])
+    db.session.execute(QuoteModel.__table__.insert(), [{'id': i, 'author_id': 1, 'text': f'Quote{i}'} for i in ids])
+    db.session.commit()
+    quotes_app.random_quotes.refresh()
+
+
+def test_random_quotes_from_sparse_ids(quotes_app, client):
+    ids = [1, 25000, 50000, 75000, 100000]
+    insert_quotes(quotes_app, ids)
+    assert sorted(quote.id for quote in quotes_app.random_quotes.sample(5)) == ids
+    response = client.get('/quotes/random?count=5')
+    assert response.status_code == 200
+    assert sorted(int(quote['id']) for quote in response.get_json()) == ids
+    for _ in range(20):
+        assert client.get('/quotes/random').status_code == 200
+
+
+def test_random_quotes_after_delete_behind_cache(quotes_app, client):
+    insert_quotes(quotes_app, range(1, 101))
+    db, QuoteModel = quotes_app.db, quotes_app.QuoteModel
+    db.session.execute(QuoteModel.__table__.delete().where(QuoteModel.id > 3))
+    db.session.commit()
+    # В кэше 100 цитат, в базе 3: выборка возвращает все оставшиеся и перечитывает границы
+    assert sorted(quote.id for quote in quotes_app.random_quotes.sample(10)) == [1, 2, 3]
+    assert quotes_app.random_quotes.bounds() == (1, 3, 3)
+
+
+def test_list_endpoints_make_constant_number_of_queries(quotes_app, client):
+    from benchmarks.quotes_queries import count_queries, fill
+
+    statements = count_queries(quotes_app.db.engine)
+    counts = {}
+    for size in (10, 1000):
+        fill(quotes_app.db, quotes_app.AuthorModel, quotes_app.QuoteModel, size // 10, size)
+        for url in ('/quotes', '/authors', '/author/1/quotes'):
+            statements.clear()
+            assert client.get(url).status_code == 200
+            counts.setdefault(url, set()).add(len(statements))
+    # Нет N+1: число запросов не зависит от числа цитат и авторов
+    assert all(len(seen) == 1 for seen in counts.values()), counts
+
+
+def test_bulk_authors_report_row_errors(quotes_app, client):
+    clear_tables(quotes_app)
+    authors = [{'name': f'Author{i}'} for i in range(5)]
+    report = client.post('/authors/bulk', json=authors + [{'name': ''}, {'title': 'x'}, 'Author']).get_json()
+    assert report['inserted'] == 5
+    assert [error['row'] for error in report['errors']] == [5, 6, 7]
+
+
+def test_bulk_quotes_from_ndjson(quotes_app, client):
+    clear_tables(quotes_app)
+    client.post('/authors/bulk', json=[{'name': f'Author{i}'} for i in range(3)])
+    client.post('/author/1/quotes', json={'text': 'single'})
+    assert len(client.get('/author/1/quotes').get_json()) == 1
+    lines = [json.dumps({'author': f'Author{i % 3}', 'text': f'Quote{i}'}) for i in range(10)]
+    bad = ['{"author": "Author1"', json.dumps({'author': 'Nobody', 'text': 'x'}), json.dumps({'author': 'Author1'})]
+    report = client.post('/quotes/bulk?batch_size=4', data='\n'.join(lines + bad) + '\n',
+                         content_type='application/x-ndjson').get_json()
+    assert report['inserted'] == 10
+    assert [error['row'] for error in report['errors']] == [10, 11, 12]
+
+    assert client.post('/quotes/bulk', json=[{'author': 'Author2', 'text': 'array'}]).get_json() == \
+        {'inserted': 1, 'errors': []}
+    assert quotes_app.random_quotes.bounds()[2] == quotes_app.QuoteModel.query.count() == 12
+    # Кэш ответов сброшен: Author0 (первый автор) получил цитаты 0, 3, 6, 9
+    assert len(client.get('/author/1/quotes').get_json()) == 5
+
+
+def test_failed_bulk_batch_reports_only_its_rows(quotes_app, client, monkeypatch):
+    from sqlalchemy.exc import SQLAlchemyError
+
+    clear_tables(quotes_app)
+
+    def commit():
+        raise SQLAlchemyError('commit failed')
+
+    monkeypatch.setattr(quotes_app.db.session, 'commit', commit)
+    response = client.post('/authors/bulk', json=[{'name': 'A'}, {'name': ''}, {'name': 'B'}])
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['inserted'] == 0
+    assert [(error['row'], error['error']) for error in report['errors']] == [
+        (0, 'Batch failed: commit failed'), (1, 'name must be a non-empty string'), (2, 'Batch failed: commit failed')]
+
+
+def fill_quotes(quotes_app, authors, quotes):
+    from benchmarks.quotes_queries import fill
+
+    fill(quotes_app.db, quotes_app.AuthorModel, quotes_app.QuoteModel, authors, quotes)
+    quotes_app.random_quotes.refresh()
+
+
+def test_cached_response_and_etag(quotes_app, client):
+    from benchmarks.quotes_queries import count_queries
+
+    fill_quotes(quotes_app, 10, 100)
+    statements = count_queries(quotes_app.db.engine)
+    first = client.get('/quotes')
+    statements.clear()
+    second = client.get('/quotes')
+    assert not statements, "ответ из кэша обращается к базе"
+    assert second.get_data() == first.get_data()
+    etag = second.headers['ETag']
+    assert client.get('/quotes', headers={'If-None-Match': etag}).status_code == 304
+
+
+@pytest.mark.parametrize('method, url, body, expected', [
+    ('post', '/author/1/quotes', {'text': 'new'}, {'/quotes', '/quotes?limit=10', '/author/1/quotes'}),
+    ('put', '/author/2/quotes/2', {'text': 'changed'}, {'/quotes', '/quotes?limit=10', '/author/2/quotes'}),
+    ('delete', '/author/1/quotes/1', None, {'/quotes', '/quotes?limit=10', '/author/1/quotes'}),
+    ('delete', '/authors/1', None, {'/quotes', '/quotes?limit=10', '/authors/1', '/author/1/quotes'}),
+])
+def test_writes_invalidate_only_affected_responses(quotes_app, client, method, url, body, expected):
+    urls = ('/quotes', '/quotes?limit=10', '/authors/1', '/author/1/quotes', '/author/2/quotes')
+    cache = quotes_app.response_cache
+    fill_quotes(quotes_app, 10, 100)
+    for u in urls:
+        client.get(u)
+    assert getattr(client, method)(url, json=body).status_code < 400
+    invalidated = set()
+    bodies = {}
+    for u in urls:
+        hits = cache.hits
+        bodies[u] = client.get(u).get_data()
+        if cache.hits == hits:
+            invalidated.add(u)
+    assert invalidated == expected
+    # Оставшиеся в кэше ответы совпадают с базой
+    cache.clear()
+    assert {u: client.get(u).get_data() for u in urls} == bodies
+
+
+def test_cache_evicts_least_recently_used_by_size(quotes_app, client, monkeypatch):
+    cache = quotes_app.response_cache
+    fill_quotes(quotes_app, 50, 500)
+    # Ответы авторов одного размера: в кэш помещаются три с половиной
+    max_bytes = len(client.get('/author/2/quotes').get_data()) * 7 // 2
+    cache.clear()
+    monkeypatch.setattr(cache, 'max_bytes', max_bytes)
+    for author_id in range(2, 50):
+        client.get(f'/author/{author_id}/quotes')
+    stats = cache.stats()
+    assert stats['bytes'] <= max_bytes and stats['entries'] == 3 and stats['evicted']
+    assert client.get('/cache/stats').get_json() == cache.stats()
+
+
+@pytest.mark.parametrize('page_size', [7, 100, 250])
+def test_cursor_pages_cover_table_like_offset(quotes_app, client, page_size):
+    fill_quotes(quotes_app, 10, 250)
+    # Дыра в id: курсор не должен зависеть от сплошной нумерации
+    client.delete('/author/1/quotes/11')
+    expected = client.get('/quotes').get_json()
+    seen, after_id, pages = [], None, 0
+    while True:
+        url = f'/quotes?limit={page_size}' + (f'&after_id={after_id}' if after_id is not None else '')
+        page = client.get(url).get_json()
+        pages += 1
+        assert len(page['items']) <= page_size
+        seen += page['items']
+        after_id = page['next_cursor']
+        if after_id is None:
+            break
+        assert after_id == int(page['items'][-1]['id'])
+    assert seen == expected
+    assert pages == -(-len(expected) // page_size)
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=100000', 'after_id=-1', 'limit=abc'])
+def test_bad_page_parameters(quotes_app, client, query):
+    assert client.get(f'/quotes?{query}').status_code == 400
+
+
+def test_random_sample_skips_holes_without_repeats(quotes_app, client):
+    fill_quotes(quotes_app, 10, 1000)
+    db, QuoteModel = quotes_app.db, quotes_app.QuoteModel
+    # Остается каждая десятая цитата; удаление мимо ORM - кэш о нем не знает
+    db.session.execute(QuoteModel.__table__.delete().where(QuoteModel.id % 10 != 0))
+    db.session.commit()
+    for _ in range(20):
+        ids = [quote.id for quote in quotes_app.random_quotes.sample(10)]
+        assert len(set(ids)) == 10 and not any(quote_id % 10 for quote_id in ids)
+
+
+def test_random_quotes_are_uniform(quotes_app, client):
+    fill_quotes(quotes_app, 1, 10)
+    hits = Counter(client.get('/quotes/random').get_json()['id'] for _ in range(2000))
+    assert set(hits) == {str(i) for i in range(1, 11)}
+    assert min(hits.values()) > 120, sorted(hits.items())
+    # count больше числа цитат - все цитаты
+    assert len(client.get('/quotes/random?count=100').get_json()) == 10
+
+
+def test_random_bounds_follow_api_writes(quotes_app, client):
+    fill_quotes(quotes_app, 1, 10)
+    new_id = client.post('/author/1/quotes', json={'text': 'new'}).get_json()['id']
+    assert quotes_app.random_quotes.bounds() == (1, 11, 11)
+    for quote_id in range(1, 11):
+        client.delete(f'/author/1/quotes/{quote_id}')
+    assert quotes_app.random_quotes.bounds()[2] == 1
+    assert client.get('/quotes/random').get_json()['id'] == new_id
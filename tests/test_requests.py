@@ -0,0 +1,78 @@
+"""
+Повторы операций с request_id (IBank.RequestCache)
+"""
+import random
+from collections import deque
+
+import pytest
+
+from IBank import Ledger, RequestCache
+from benchmarks.registry import make_accounts
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('policy, survives', [('lru', True), ('fifo', False)])
+def test_eviction_policy(policy, survives):
+    ledger = Ledger()
+    account, = make_accounts(1, ledger)
+    ledger.requests = RequestCache(maxsize=3, ttl=60, policy=policy, clock=FakeClock())
+    for request_id in 'abc':
+        account.deposit_kop(100, request_id=request_id)
+    account.deposit_kop(100, request_id='a')  # обращение к самой старой записи
+    account.deposit_kop(100, request_id='d')
+    assert ('a' in ledger.requests._entries) == survives
+
+
+def test_ttl_and_repeated_request():
+    clock = FakeClock()
+    ledger = Ledger()
+    account, = make_accounts(1, ledger)
+    ledger.requests = RequestCache(maxsize=3, ttl=60, clock=clock)
+    for request_id in 'abc':
+        account.deposit_kop(100, request_id=request_id)
+    clock.now += 60
+    account.deposit_kop(100, request_id='e')
+    assert list(ledger.requests._entries) == ['e']
+    balance = account.balance_kop
+    account.deposit_kop(100, request_id='e')
+    assert account.balance_kop == balance
+    # Идентификатор запроса уже занят другой операцией
+    with pytest.raises(ValueError):
+        account.withdraw_kop(100, request_id='e')
+
+
+def test_retries_do_not_change_balances():
+    """
+    Каждая операция повторяется после потока новых запросов: ответ на повтор приходит из кэша,
+    пока запись не вытеснена
+    """
+    rnd = random.Random(1)
+    maxsize = 100
+    ledger = Ledger()
+    accounts = make_accounts(20, ledger)
+    ledger.requests = RequestCache(maxsize=maxsize)
+    recent = deque()
+    for request_id in range(2000):
+        source, target, amount = rnd.choice(accounts), rnd.choice(accounts), rnd.randint(1, 500)
+        try:
+            source.transfer_kop(target, amount, request_id=request_id)
+        except ValueError:
+            pass
+        recent.append((request_id, source, target, amount))
+        if len(recent) > maxsize // 4:
+            # При lru повторенные записи остаются в кэше еще на maxsize обращений
+            retry_id, source, target, amount = recent.popleft()
+            balances = source.balance_kop, target.balance_kop, len(ledger)
+            try:
+                source.transfer_kop(target, amount, request_id=retry_id)
+            except ValueError:
+                pass
+            assert (source.balance_kop, target.balance_kop, len(ledger)) == balances
+        assert len(ledger.requests) <= maxsize
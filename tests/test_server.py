@@ -0,0 +1,20 @@
+"""
+Разбор запросов сетевого интерфейса (IBank_server.BankServer.dispatch)
+"""
+import json
+
+import pytest
+
+from IBank_server import BankServer
+
+
+@pytest.mark.parametrize('amount', ['abc', None, 'Infinity', 'NaN', '1e999999999', 0, '-5', '0.001'])
+def test_bad_amount_is_an_error_response(amount):
+    server = BankServer()
+    created = server.dispatch(json.dumps({'id': 1, 'op': 'create', 'name': 'Ivan', 'passport': 12345678,
+                                          'phone': '+7900-000-00-00', 'amount': 100}))
+    assert created['ok']
+    for op in ('deposit', 'withdraw'):
+        response = server.dispatch(json.dumps({'id': 2, 'op': op, 'passport': 12345678, 'amount': amount}))
+        assert response['id'] == 2 and not response['ok']
+    assert server.dispatch(json.dumps({'op': 'deposit', 'passport': 12345678, 'amount': '0.5'}))['result'] == '100.50'
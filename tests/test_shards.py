@@ -0,0 +1,52 @@
+"""
+Шардированный режим банка (IBank_shards)
+"""
+import pytest
+
+from IBank import to_kopecks
+from IBank_shards import ShardedBank, ShardWorker
+from benchmarks.shards import START_BALANCE, make_transfers, open_accounts
+
+
+def test_bad_operation_does_not_stop_shard():
+    with ShardedBank(1) as bank:
+        results = bank.execute([
+            ('create', ['Account', 'Ivan', 12345678, '+7900-800-11-22', None], 100000),
+            ('deposit', 12345678, '100'),
+            ('withdraw', 12345678),
+            ('deposit', 12345678, 500),
+            ('balance', 12345678),
+        ])
+    assert [ok for ok, _ in results] == [True, False, False, True, True]
+    assert results[-1] == (True, 100500)
+
+
+@pytest.mark.parametrize('amount', [-50000, 0])
+def test_non_positive_amounts_are_rejected(amount):
+    worker = ShardWorker()
+    worker.run([('create', ['Account', 'Ivan', 12345678, '+7900-800-11-22', None], 2000),
+                ('create', ['Account', 'Petr', 87654321, '+7900-800-11-33', None], 2000)])
+    results = worker.run([
+        ('withdraw', 12345678, amount),
+        ('deposit', 12345678, amount),
+        ('transfer', 12345678, 87654321, amount),
+        ('reserve', 1, 12345678, amount),
+        ('prepare', 2, 87654321, amount),
+    ])
+    assert not any(ok for ok, _ in results)
+    assert worker.run([('balance', 12345678), ('balance', 87654321)]) == [(True, 2000), (True, 2000)]
+    stats = worker.stats()
+    assert stats['deposited'] == 0 and stats['fees'] == 0
+
+
+def test_money_is_kept_across_shards():
+    # Остатки + комиссии = начальная сумма, в том числе после переводов между шардами
+    with ShardedBank(2) as bank:
+        open_accounts(bank, 100, 30)
+        transfers = make_transfers(100, 2000)
+        for offset in range(0, len(transfers), 500):
+            results = bank.execute(transfers[offset:offset + 500])
+            assert all(ok for ok, _ in results)
+        stats = bank.stats()
+    assert to_kopecks(stats['balances']) + to_kopecks(stats['fees']) == 100 * START_BALANCE
+    assert stats['fees']
@@ -0,0 +1,105 @@
+"""
+Сводка по банку (BankStats): учитываются только счета, открытые в AccountRegistry
+"""
+import random
+from decimal import Decimal
+
+import pytest
+
+from IBank import Account, AccountRegistry, Ledger, bank_stats, check_stats
+from IBank_cold import ColdStore
+from IBank_storage import Storage
+from benchmarks.registry import make_accounts
+from benchmarks.stats import make_bank, random_batch, random_operations
+from tests.test_storage import reopen
+
+
+def test_rejected_duplicates_are_not_counted():
+    ledger = Ledger()
+    registry = AccountRegistry(make_accounts(2, ledger))
+    duplicate = Account("Double", 10000000, "+7999-000-00-00", 1000, ledger=ledger)
+    with pytest.raises(ValueError):
+        registry.add(duplicate)
+    rejected = registry.add_many(make_accounts(1, ledger))
+    assert len(rejected) == 1
+    # Операции по счету вне реестра в остатки не входят, а пополнения - входят
+    duplicate.deposit(10)
+    stats = bank_stats(ledger)
+    assert (stats['accounts'], stats['balances'], stats['deposited']) == (2, Decimal('200.00'), Decimal('10.00'))
+    assert check_stats(ledger, registry) == []
+
+
+def test_closed_accounts_leave_stats():
+    ledger = Ledger()
+    registry = AccountRegistry(make_accounts(3, ledger))
+    first, second, third = registry
+    first.to_archive()
+    second.withdraw(50)
+    registry.remove(first)
+    registry.remove(second)
+    third.deposit(50)
+    stats = bank_stats(ledger)
+    assert (stats['accounts'], stats['balances'], stats['archived']) == (1, Decimal('150.00'), 0)
+    assert check_stats(ledger, registry) == []
+
+
+def test_stats_survive_restart(tmp_path):
+    storage = Storage(tmp_path, Ledger())
+    registry = storage.open()
+    for account in make_accounts(3, storage.ledger):
+        registry.add(account)
+    first, second, _ = registry
+    first.withdraw(50)
+    registry.remove(second)
+    expected = bank_stats(storage.ledger)
+    storage.close()
+
+    restored, ledger = reopen(tmp_path)
+    registry = restored.open()
+    actual = bank_stats(ledger)
+    assert [actual[key] for key in ('accounts', 'balances', 'negative', 'archived')] == \
+        [expected[key] for key in ('accounts', 'balances', 'negative', 'archived')]
+    assert check_stats(ledger, registry) == []
+    restored.close()
+
+
+def test_stats_follow_random_operations():
+    pytest.importorskip('numpy')
+    from IBank_batch import apply_transfers
+
+    rnd = random.Random(1)
+    ledger = Ledger()
+    ledger.cold = ColdStore()
+    accounts = make_bank(200, ledger)
+    registry = AccountRegistry(accounts)
+    random_operations(accounts, 5000, rnd)
+    assert check_stats(ledger, registry) == []
+    apply_transfers(random_batch(accounts, 5000, rnd), ledger)
+    assert check_stats(ledger, registry) == []
+    for account in accounts[::20]:
+        registry.remove(account)
+    assert check_stats(ledger, registry) == []
+
+
+def test_stats_survive_restart_after_random_operations(tmp_path):
+    rnd = random.Random(1)
+    storage = Storage(tmp_path, Ledger())
+    registry = storage.open()
+    for account in make_accounts(200, storage.ledger):
+        registry.add(account)
+    random_operations(list(registry), 2000, rnd)
+    storage.snapshot()
+    random_operations(list(registry), 2000, rnd)
+    for account in list(registry)[::20]:
+        registry.remove(account)
+    expected = bank_stats(storage.ledger)
+    storage.close()
+
+    restored, ledger = reopen(tmp_path)
+    registry = restored.open()
+    assert check_stats(ledger, registry) == []
+    # После перезапуска пополнения и комиссии считаются заново, остатки и счетчики счетов должны совпасть
+    actual = bank_stats(ledger)
+    assert [actual[key] for key in ('accounts', 'balances', 'negative', 'archived')] == \
+        [expected[key] for key in ('accounts', 'balances', 'negative', 'archived')]
+    restored.close()
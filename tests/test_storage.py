@@ -0,0 +1,57 @@
+"""
+Восстановление состояния банка из снимка и WAL (IBank_storage)
+"""
+import time
+
+from IBank import Ledger, Operation
+from IBank_storage import Storage, WriteAheadLog
+from benchmarks.registry import make_accounts
+
+
+def crash(storage):
+    """
+    Сбой процесса: записанное в WAL остается, снимок не пишется
+    """
+    storage._wal.sync()
+    storage.ledger.wal = None
+
+
+def reopen(path):
+    ledger = Ledger()
+    return Storage(path, ledger), ledger
+
+
+def test_replayed_operations_keep_their_time(tmp_path):
+    storage = Storage(tmp_path, Ledger())
+    registry = storage.open()
+    ivan, petr = make_accounts(2, storage.ledger)
+    registry.add(ivan)
+    registry.add(petr)
+    ivan.deposit_kop(500)
+    ivan.transfer_kop(petr, 100)
+    expected = [(operation.type, operation.timestamp) for operation in ivan.history]
+    crash(storage)
+
+    restored, ledger = reopen(tmp_path)
+    registry = restored.open()
+    ivan = registry.get_by_passport(ivan.passport8)
+    assert [(operation.type, operation.timestamp) for operation in ivan.history] == expected
+    assert [operation.type for operation in ivan.history] == [Operation.DEPOSIT, Operation.TRANSFER]
+    # Новые операции после восстановления получают текущее время
+    ivan.deposit_kop(100)
+    assert ivan.history[-1].timestamp > expected[-1][1]
+    restored.close()
+
+
+def test_idle_wal_is_flushed_within_group_interval(tmp_path):
+    storage = Storage(tmp_path, Ledger(), group_size=1000, group_interval=0.01)
+    registry = storage.open()
+    account, = make_accounts(1, storage.ledger)
+    registry.add(account)
+    account.deposit_kop(100)
+    account.deposit_kop(200)
+    # Новых записей нет: последние должны попасть в файл без следующего append()
+    time.sleep(0.2)
+    records, _ = WriteAheadLog.read(tmp_path / Storage.WAL)
+    assert [(record[1], record[4]) for record in records][-2:] == [(Operation.DEPOSIT, 100), (Operation.DEPOSIT, 200)]
+    storage.close()
@@ -0,0 +1,85 @@
+"""
+Лимиты операций за период (IBank.VelocityLimit, Account._check_velocity) на искусственных часах
+"""
+import pytest
+
+from IBank import Account, CreditAccount, Ledger, Operation, VelocityLimit, to_kopecks
+from benchmarks.registry import make_accounts
+from tests.test_requests import FakeClock
+
+LIMIT_ERROR = 'Превышен лимит операций за период.'
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def accounts(monkeypatch, clock):
+    monkeypatch.setattr(Account, 'VELOCITY_LIMITS', (
+        VelocityLimit([Operation.WITHDRAW], 3600, max_count=3, clock=clock),
+        VelocityLimit([Operation.TRANSFER], 3600, max_amount=to_kopecks(1000), clock=clock),
+    ))
+    account, target = make_accounts(2, Ledger())
+    account.deposit(100000)
+    return account, target
+
+
+def test_check_velocity_counts_only_allowed_operations(accounts):
+    account, _ = accounts
+    for _ in range(3):
+        account._check_velocity(Operation.WITHDRAW, 100)
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        account._check_velocity(Operation.WITHDRAW, 100)
+    assert [window.count for window in account._windows] == [3, 0]
+    # Операция другого типа не проверяется лимитом снятий
+    account._check_velocity(Operation.TRANSFER, 100)
+    assert [window.count for window in account._windows] == [3, 1]
+
+
+def test_window_slides(accounts, clock):
+    account, _ = accounts
+    for _ in range(3):
+        account.withdraw(1)
+        clock.now += 600
+    balance = account.balance_kop
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        account.withdraw(1)
+    assert account.balance_kop == balance
+    clock.now = 3600 + 60  # первое снятие (в момент 0) вышло из окна
+    account.withdraw(1)
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        account.withdraw(1)
+    clock.now += 3600
+    account.withdraw(1)
+
+
+def test_transfer_amount_limit_ignores_receiver(accounts):
+    account, target = accounts
+    account.transfer(target, 1000)
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        account.transfer(target, 1)
+    account.withdraw(1)  # снятия считаются отдельно от переводов
+    # Зачисление перевода не учитывается в лимитах получателя
+    assert target._windows is None
+    target.transfer(account, 1000)
+
+
+def test_limits_are_per_class(accounts, monkeypatch, clock):
+    account, _ = accounts
+    monkeypatch.setattr(CreditAccount, 'VELOCITY_LIMITS',
+                        (VelocityLimit([Operation.WITHDRAW], 60, max_count=1, clock=clock),))
+    credit = CreditAccount("Credit", 20000000, "+7999-000-00-00", 1000, ledger=account._ledger)
+    credit.withdraw(1)
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        credit.withdraw(1)
+    account.withdraw(1)  # у Account свои окна и правила
+
+
+def test_limits_disabled_in_ledger(accounts):
+    account, _ = accounts
+    account._ledger.limits_enabled = False
+    for _ in range(5):
+        account.withdraw(1)
+    assert account._windows is None
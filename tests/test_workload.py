@@ -0,0 +1,13 @@
+"""
+Генератор тестового банка для бенчмарков (benchmarks.workload)
+"""
+import pytest
+
+from IBank import CreditAccount
+from benchmarks.workload import make_bank
+
+
+@pytest.mark.parametrize('share, credits', [(0, 0), (0.3, 30), (0.5, 50), (0.7, 70), (1, 100)])
+def test_credit_share(share, credits):
+    registry = make_bank(100, credit_share=share)
+    assert sum(isinstance(account, CreditAccount) for account in registry) == credits